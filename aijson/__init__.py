@@ -6,6 +6,7 @@ from aijson.models.io import (
     DefaultModelInputs,
     BlobRepoInputs,
     FinalInvocationInputs,
+    CheckpointInputs,
     CacheControlOutputs,
 )
 from aijson.models.func import register_action
@@ -19,12 +20,17 @@ __all__ = [
     "PrivateAttr",
     "ShelveCacheRepo",
     "RedisCacheRepo",
+    "TieredCacheRepo",
+    "InMemoryLeaseRepo",
+    "RedisLeaseRepo",
     "RedisUrlInputs",
     "DefaultModelInputs",
     "BlobRepoInputs",
     "FinalInvocationInputs",
+    "CheckpointInputs",
     "CacheControlOutputs",
     "register_action",
 ]
 
-from aijson.repos.cache_repo import ShelveCacheRepo, RedisCacheRepo
+from aijson.repos.cache_repo import ShelveCacheRepo, RedisCacheRepo, TieredCacheRepo
+from aijson.repos.lease_repo import InMemoryLeaseRepo, RedisLeaseRepo
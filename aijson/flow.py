@@ -11,10 +11,11 @@ from aijson.log_config import get_logger
 from aijson.models.config.value_declarations import VarDeclaration
 from aijson.repos.blob_repo import InMemoryBlobRepo, BlobRepo
 from aijson.repos.cache_repo import ShelveCacheRepo, CacheRepo, asyncio
+from aijson.repos.lease_repo import LeaseRepo
 from aijson.utils.async_utils import merge_iterators
 from aijson.utils.loader_utils import load_config_file, load_config_text
 from aijson.utils.static_utils import check_config_consistency
-from aijson.models.primitives import ExecutableId
+from aijson.models.primitives import ExecutableId, StreamReplaySpeed
 
 
 class Flow:
@@ -25,6 +26,8 @@ class Flow:
         blob_repo: BlobRepo | type[BlobRepo] = InMemoryBlobRepo,
         temp_dir: None | str | TemporaryDirectory = None,
         _vars: None | dict[str, Any] = None,
+        lease_repo: None | LeaseRepo = None,
+        stream_replay_speed: None | StreamReplaySpeed = None,
     ):
         self.log = get_logger()
         self.variables = _vars or {}
@@ -52,6 +55,9 @@ class Flow:
                 temp_dir=temp_dir_path,
             )
 
+        self.lease_repo = lease_repo
+        self.stream_replay_speed = stream_replay_speed
+
         self.action_config = config
         self.action_service = ActionService(
             temp_dir=temp_dir_path,
@@ -59,11 +65,17 @@ class Flow:
             cache_repo=self.cache_repo,
             blob_repo=self.blob_repo,
             config=self.action_config,
+            lease_repo=self.lease_repo,
+            stream_replay_speed=self.stream_replay_speed,
         )
 
     async def close(self):
+        # background work of the action service still uses the repos
+        await self.action_service.close()
         await self.cache_repo.close()
         await self.blob_repo.close()
+        if self.lease_repo is not None:
+            await self.lease_repo.close()
         if isinstance(self.temp_dir, TemporaryDirectory):
             self.temp_dir.cleanup()
 
@@ -73,12 +85,16 @@ class Flow:
         text: str,
         cache_repo: CacheRepo | type[CacheRepo] = ShelveCacheRepo,
         blob_repo: BlobRepo | type[BlobRepo] = InMemoryBlobRepo,
+        lease_repo: None | LeaseRepo = None,
+        stream_replay_speed: None | StreamReplaySpeed = None,
     ):
         config = load_config_text(text)
         return Flow(
             config=config,
             cache_repo=cache_repo,
             blob_repo=blob_repo,
+            lease_repo=lease_repo,
+            stream_replay_speed=stream_replay_speed,
         )
 
     @classmethod
@@ -87,6 +103,8 @@ class Flow:
         file: str | Path,
         cache_repo: CacheRepo | type[CacheRepo] = ShelveCacheRepo,
         blob_repo: BlobRepo | type[BlobRepo] = InMemoryBlobRepo,
+        lease_repo: None | LeaseRepo = None,
+        stream_replay_speed: None | StreamReplaySpeed = None,
     ) -> "Flow":
         if isinstance(file, Path):
             file = file.as_posix()
@@ -95,6 +113,8 @@ class Flow:
             config=config,
             cache_repo=cache_repo,
             blob_repo=blob_repo,
+            lease_repo=lease_repo,
+            stream_replay_speed=stream_replay_speed,
         )
 
     def set_vars(self, **kwargs) -> "Flow":
@@ -105,6 +125,8 @@ class Flow:
             blob_repo=self.blob_repo,
             temp_dir=self.temp_dir,
             _vars=variables,
+            lease_repo=self.lease_repo,
+            stream_replay_speed=self.stream_replay_speed,
         )
 
     async def run_all(self) -> list[Any]:
@@ -144,11 +166,19 @@ class Flow:
             raise NotImplementedError("Only one dependency is supported for now")
         executable_id = list(dependencies)[0]
 
-        outputs = await self.action_service.run_executable(
+        prefetched_keys = await self.action_service.prefetch_cache(
             self.log,
             executable_id=executable_id,
             variables=self.variables,
         )
+        try:
+            outputs = await self.action_service.run_executable(
+                self.log,
+                executable_id=executable_id,
+                variables=self.variables,
+            )
+        finally:
+            self.action_service.discard_prefetched(prefetched_keys)
         context = {
             executable_id: outputs,
         }
@@ -196,19 +226,27 @@ class Flow:
             raise NotImplementedError("Only one dependency is supported for now")
         executable_id = list(dependencies)[0]
 
-        result = jinja2.Undefined()
-        async for outputs in self.action_service.stream_executable(
+        prefetched_keys = await self.action_service.prefetch_cache(
             self.log,
             executable_id=executable_id,
             variables=self.variables,
-        ):
-            context = {
-                executable_id: outputs,
-            }
-
-            result = await declaration.render(context)
-            if isinstance(result, jinja2.Undefined):
-                continue
-            yield result
+        )
+        result = jinja2.Undefined()
+        try:
+            async for outputs in self.action_service.stream_executable(
+                self.log,
+                executable_id=executable_id,
+                variables=self.variables,
+            ):
+                context = {
+                    executable_id: outputs,
+                }
+
+                result = await declaration.render(context)
+                if isinstance(result, jinja2.Undefined):
+                    continue
+                yield result
+        finally:
+            self.action_service.discard_prefetched(prefetched_keys)
         if isinstance(result, jinja2.Undefined):
             raise RuntimeError("Failed to render result")
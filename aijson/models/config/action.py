@@ -1,5 +1,6 @@
 import inspect
 import typing
+from datetime import timedelta
 
 import structlog
 from typing import ClassVar, Type, Any, Optional, TypeVar, Generic, AsyncIterator
@@ -79,9 +80,32 @@ class InternalActionBase(Generic[Inputs, Outputs], metaclass=ActionMeta):
     cache: bool = True
 
     #: The version of the action, used to persist cache across project changes.
-    # Optional, defaults to `None` (never cache across project changes).
+    # Optional, defaults to `None` (cache as long as the source of the action's module is unchanged).
     version: None | int = None
 
+    #: How long to keep the cached result of this action, in seconds.
+    #  Optional, defaults to the flow's `action_cache_expire` (by default, cache never expires).
+    cache_expire: None | int | timedelta = None
+
+    #: Whether to serve the last cached result when the cache misses (e.g., it expired or the action changed),
+    #  while refreshing it in the background. Optional, defaults to `False`.
+    cache_stale_while_revalidate: bool = False
+
+    #: How similar inputs must be to those of a cached result for it to be reused, compared by SimHash
+    #  of the normalized inputs: between 0.9 (at most 6 of 64 bits differing) and 1, as lower thresholds
+    #  match unrelated inputs. Optional, defaults to `None` (only identical inputs).
+    cache_similarity_threshold: None | float = None
+
+    #: How often to record the partial outputs of a run, in seconds, so an interrupted run
+    #  replays them when restarted (and resumes from them, with `CheckpointInputs`).
+    #  Optional, defaults to `None` (no checkpoints).
+    cache_checkpoint_interval: None | float = None
+
+    #: Whether to record the partial outputs of a run, with their timing, alongside its cached result,
+    #  so cache hits can replay the stream (see `stream_replay_speed` on the flow).
+    #  Optional, defaults to `False`.
+    cache_record_stream: bool = False
+
     ### Helpers
 
     async def request_read(
@@ -53,6 +53,10 @@ class ActionConfig(StrictModel):
     version: Literal["0.1"]  # TODO implement migrations
     default_model: ModelConfigDeclaration = OptionalModelConfig()  # type: ignore
     action_timeout: float = 360
+    action_cache_expire: int | None = Field(
+        None,
+        description="How long to keep cached action results, in seconds. Defaults to never expiring.",
+    )
     flow: "FlowConfig"
     default_output: ContextVarPath | None = None  # TODO `| ValueDeclaration`
 
@@ -2,6 +2,7 @@ import inspect
 import types
 import typing
 from collections.abc import AsyncIterator
+from datetime import timedelta
 from typing import Callable, Any, overload, TypeVar
 
 import pydantic
@@ -9,6 +10,7 @@ from pydantic import BaseModel
 from pydantic.fields import Field
 
 from aijson.models.config.action import Action, StreamingAction
+from aijson.utils.cache_utils import MIN_SIMILARITY_THRESHOLD
 from aijson.utils.subtype_utils import is_subtype
 
 
@@ -43,7 +45,19 @@ def _construct_decorator(
     description: str | None = None,
     cache: bool = True,
     version: int | None = None,
+    cache_expire: int | timedelta | None = None,
+    cache_stale_while_revalidate: bool = False,
+    cache_similarity_threshold: float | None = None,
+    cache_checkpoint_interval: float | None = None,
+    cache_record_stream: bool = False,
 ):
+    if cache_similarity_threshold is not None and not (
+        MIN_SIMILARITY_THRESHOLD <= cache_similarity_threshold <= 1
+    ):
+        raise ValueError(
+            f"cache_similarity_threshold must be between {MIN_SIMILARITY_THRESHOLD} and 1"
+        )
+
     def _(func: Callable):
         nonlocal name
         nonlocal description
@@ -92,6 +106,11 @@ def _construct_decorator(
             "description": description,
             "cache": cache,
             "version": version,
+            "cache_expire": cache_expire,
+            "cache_stale_while_revalidate": cache_stale_while_revalidate,
+            "cache_similarity_threshold": cache_similarity_threshold,
+            "cache_checkpoint_interval": cache_checkpoint_interval,
+            "cache_record_stream": cache_record_stream,
             "run": run,
             "_aijson__mapped_func": func,
         }
@@ -136,6 +155,11 @@ def register_action(
     description: str | None = None,
     cache: bool = True,
     version: int | None = None,
+    cache_expire: int | timedelta | None = None,
+    cache_stale_while_revalidate: bool = False,
+    cache_similarity_threshold: float | None = None,
+    cache_checkpoint_interval: float | None = None,
+    cache_record_stream: bool = False,
 ) -> Callable[
     [
         T,
@@ -151,6 +175,11 @@ def register_action(
     description: str | None = None,
     cache: bool = True,
     version: int | None = None,
+    cache_expire: int | timedelta | None = None,
+    cache_stale_while_revalidate: bool = False,
+    cache_similarity_threshold: float | None = None,
+    cache_checkpoint_interval: float | None = None,
+    cache_record_stream: bool = False,
 ):
     """
     Create a function decorator that register it as an action.
@@ -168,7 +197,28 @@ def register_action(
 
     version: int
     The version of the action, used to persist cache across project changes.
-    Optional, defaults to `None` (never cache across project changes).
+    Optional, defaults to `None` (cache as long as the source of the action's module is unchanged).
+
+    cache_expire: int | timedelta | None
+    How long to keep the cached result of this action, in seconds.
+    Optional, defaults to the flow's `action_cache_expire`.
+
+    cache_stale_while_revalidate: bool
+    Whether to serve the last cached result on a cache miss, while refreshing it in the background.
+    Defaults to `False`.
+
+    cache_similarity_threshold: float | None
+    How similar inputs must be to those of a cached result for it to be reused,
+    between 0.9 (SimHashes differing in at most 6 of 64 bits) and 1.
+    Optional, defaults to `None` (only identical inputs).
+
+    cache_checkpoint_interval: float | None
+    How often to record the partial outputs of a run, in seconds, so an interrupted run replays them when restarted.
+    Optional, defaults to `None` (no checkpoints).
+
+    cache_record_stream: bool
+    Whether to record the partial outputs of a run with their timing, so cache hits can replay the stream.
+    Defaults to `False`.
     """
 
     deco = _construct_decorator(
@@ -176,6 +226,11 @@ def register_action(
         description=description,
         cache=cache,
         version=version,
+        cache_expire=cache_expire,
+        cache_stale_while_revalidate=cache_stale_while_revalidate,
+        cache_similarity_threshold=cache_similarity_threshold,
+        cache_checkpoint_interval=cache_checkpoint_interval,
+        cache_record_stream=cache_record_stream,
     )
 
     if func is not None:
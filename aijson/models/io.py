@@ -1,5 +1,5 @@
 # re-export these from pydantic, in case we need to change them later
-from typing import ClassVar, TypeVar, Union
+from typing import Any, ClassVar, TypeVar, Union
 
 import pydantic
 from pydantic import ConfigDict
@@ -63,6 +63,16 @@ class FinalInvocationInputs(BaseModel):
     _finished: bool = PrivateAttr(default=False)
 
 
+class CheckpointInputs(BaseModel):
+    """
+    Base class for inputs of streaming actions that can resume from a checkpoint.
+    If the action sets `cache_checkpoint_interval` and a previous run with the same inputs was interrupted,
+    `_checkpoint` holds the last partial outputs it recorded.
+    """
+
+    _checkpoint: Any = PrivateAttr(default=None)
+
+
 class CacheControlOutputs(BaseModel):
     """
     Base class for outputs that control their caching.
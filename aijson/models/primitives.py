@@ -34,3 +34,7 @@ TemplateString = str
 HintLiteral = type[str]
 
 LinkHints = dict[ExecutablePath, HintLiteral]
+
+# how recorded streams are replayed on cache hits:
+# all at once, with their original timing, or sped up by a factor
+StreamReplaySpeed = Literal["instant", "original"] | float
@@ -1,32 +1,293 @@
 import asyncio
 import hashlib
+import json
 import logging
+import mmap
+import time
 import uuid
-from collections import defaultdict
+from datetime import timedelta
+from contextlib import AsyncExitStack, asynccontextmanager
 import os
+import re
+import shutil
+import tempfile
 
-from typing import Optional, Callable
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Optional, Callable
 
 import aioboto3
 import structlog
 import tenacity
 import types_aiobotocore_s3
 from boto3.exceptions import Boto3Error
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError
 
-from aijson.models.blob import Blob
+from aijson.models.blob import Blob, BlobId
+from aijson.repos.local_blob_cache import LocalBlobCache
 from aijson.utils.async_utils import Timer
-from aijson.utils.redis_utils import get_aioredis
+from aijson.utils.cache_utils import ByteBudgetCache, get_expire_seconds
+from aijson.utils.chunking_utils import get_content_chunk_boundaries
+from aijson.utils.misc_utils import hash_file
+from aijson.log_config import get_logger
+from aijson.utils.redis_utils import RedisWriteBuffer, get_aioredis
 from aijson.utils.secret_utils import get_secret
 
 Value = bytes
 
+# TTL refreshes remembered per repo, before dropping those older than `ttl_refresh_interval`
+_MAX_TTL_REFRESH_ENTRIES = 100_000
+
+# blobs remembered to exist per repo, before dropping expired entries (and then the oldest)
+_MAX_KNOWN_BLOBS = 100_000
+
+# marks values that are manifests of blobs saved as content-defined chunks
+_CHUNK_MANIFEST_MARKER = b"\x00aijson-chunk-manifest:"
+
+# chunks of a blob saved at once
+_CHUNK_SAVE_CONCURRENCY = 8
+
+
+def _encode_chunk_manifest(chunks: list[tuple[BlobId, int]]) -> bytes:
+    return _CHUNK_MANIFEST_MARKER + json.dumps(chunks).encode()
+
+
+def _decode_chunk_manifest(value: None | Value) -> None | list[tuple[BlobId, int]]:
+    if value is None or not value.startswith(_CHUNK_MANIFEST_MARKER):
+        return None
+    return [
+        (chunk_id, size)
+        for chunk_id, size in json.loads(value[len(_CHUNK_MANIFEST_MARKER) :])
+    ]
+
+
+# marks Redis values that are manifests of blobs stored in parts
+_REDIS_MANIFEST_MARKER = b"\x00aijson-blob-manifest:"
+# manifests are much smaller than this, so reading this much of a value tells whether it is one
+_REDIS_MANIFEST_HEAD_SIZE = 1024
+
+
+class _MissingBlobPartError(ValueError):
+    pass
+
+
+# S3 object tag recording when a blob was last used, in seconds since the epoch
+_S3_LAST_ACCESS_TAG = "aijson-last-access"
+
+# size of the chunks blobs are hashed, streamed and transferred in
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _read_range(path: str, offset: int, size: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def _copy_range(data: Any, start: int, end: int) -> bytes:
+    return bytes(data[start:end])
+
+
+def _write_at(path: str, offset: int, data: bytes) -> None:
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+
+async def _write_chunks(
+    path: str,
+    chunks: AsyncIterable[bytes],
+    hasher: Optional["hashlib._Hash"] = None,
+) -> None:
+    """
+    Write a stream of chunks to `path` (updating `hasher` with them, if given),
+    doing the file I/O in a thread.
+    """
+
+    def _write(f: Any, chunk: bytes) -> None:
+        if hasher is not None:
+            hasher.update(chunk)
+        f.write(chunk)
+
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(_write, f, chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def _write_atomic(path: str, write: Callable[[str], None]) -> None:
+    # write next to the destination and rename, so readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(partial_path)
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_value(value: bytes) -> Callable[[str], None]:
+    def _write(path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(value)
+
+    return _write
+
 
 class BlobRepo:
-    def __init__(self, temp_dir: str):
+    """
+    Stores blobs by the SHA-256 of their contents, so identical values are stored once.
+
+    With `content_chunking` set, blobs larger than `content_chunk_max_size` are split at content-defined
+    boundaries into chunks of `content_chunk_min_size` to `content_chunk_max_size` bytes
+    (`content_chunk_avg_size` on average), each stored once in the `<namespace>__chunks` namespace,
+    and the blob itself is stored as a list of its chunks.
+    Versions of a large value that differ in a few places then share most of their chunks.
+    Chunked blobs are reassembled transparently by any repo reading them, whether or not it chunks its own.
+    Deleting a blob leaves its chunks, which may be shared, for `BlobGarbageCollector` to collect.
+    """
+
+    def __init__(
+        self,
+        temp_dir: str,
+        exists_cache_ttl: float = 5,
+        retrieve_concurrency: int = 32,
+        local_cache: None | LocalBlobCache = None,
+        ttl: None | int | timedelta = None,
+        ttl_refresh_interval: None | float = None,
+        content_chunking: bool = False,
+        content_chunk_min_size: int = 256 * 1024,
+        content_chunk_avg_size: int = 1024 * 1024,
+        content_chunk_max_size: int = 4 * 1024 * 1024,
+    ):
         self.temp_dir = temp_dir
         self.default_namespace = "global"
         self.blob_paths = {}
+        # blobs recently seen to exist, with the monotonic time until which that is trusted
+        self.exists_cache_ttl = exists_cache_ttl
+        self._known_blobs: dict[tuple[str, BlobId], float] = {}
+        # default limit on concurrent retrievals in `multi_retrieve`
+        self.retrieve_concurrency = retrieve_concurrency
+        # read-through cache on local disk, for repos whose blobs live elsewhere
+        self.local_cache = local_cache
+        # blobs expire `ttl` after they were last used;
+        # using them extends that at most once per `ttl_refresh_interval` seconds (defaults to a quarter of `ttl`)
+        ttl_seconds = get_expire_seconds(ttl)
+        if (
+            ttl_seconds is not None
+            and ttl_refresh_interval is not None
+            and ttl_refresh_interval >= ttl_seconds
+        ):
+            raise ValueError(
+                f"ttl_refresh_interval ({ttl_refresh_interval}s) must be shorter than ttl ({ttl_seconds}s), "
+                "or blobs in constant use expire"
+            )
+        self.ttl = ttl
+        self.ttl_refresh_interval = ttl_refresh_interval
+        self._ttl_refreshed_at: dict[tuple[str, BlobId], float] = {}
+        self.content_chunking = content_chunking
+        self.content_chunk_min_size = content_chunk_min_size
+        self.content_chunk_avg_size = content_chunk_avg_size
+        self.content_chunk_max_size = content_chunk_max_size
+
+    def _remember_exists(self, blob: Blob, namespace: str) -> None:
+        if self.exists_cache_ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._known_blobs) >= _MAX_KNOWN_BLOBS:
+            self._known_blobs = {
+                key: deadline
+                for key, deadline in self._known_blobs.items()
+                if deadline > now
+            }
+            while len(self._known_blobs) >= _MAX_KNOWN_BLOBS:
+                del self._known_blobs[next(iter(self._known_blobs))]
+        # reinserted, so entries stay in the order they were last remembered
+        self._known_blobs.pop((namespace, blob.id), None)
+        self._known_blobs[(namespace, blob.id)] = now + self.exists_cache_ttl
+
+    def _is_known_to_exist(self, blob: Blob, namespace: str) -> bool:
+        deadline = self._known_blobs.get((namespace, blob.id))
+        if deadline is None:
+            return False
+        if deadline <= time.monotonic():
+            del self._known_blobs[(namespace, blob.id)]
+            return False
+        return True
+
+    def _get_ttl_seconds(self) -> None | float:
+        return get_expire_seconds(self.ttl)
+
+    def _get_ttl_refresh_interval(self) -> float:
+        if self.ttl_refresh_interval is not None:
+            return self.ttl_refresh_interval
+        ttl_seconds = self._get_ttl_seconds()
+        return 0 if ttl_seconds is None else ttl_seconds / 4
+
+    def _mark_ttl_refreshed(self, blob: Blob, namespace: str) -> None:
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        if len(self._ttl_refreshed_at) >= _MAX_TTL_REFRESH_ENTRIES:
+            refresh_interval = self._get_ttl_refresh_interval()
+            self._ttl_refreshed_at = {
+                key: refreshed_at
+                for key, refreshed_at in self._ttl_refreshed_at.items()
+                if now - refreshed_at < refresh_interval
+            }
+        self._ttl_refreshed_at[(namespace, blob.id)] = now
+
+    async def _refresh_ttl(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> None:
+        """
+        Extend the TTL of blobs that were just used, unless it was extended in the last `ttl_refresh_interval`.
+        """
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        refresh_interval = self._get_ttl_refresh_interval()
+        due_blobs = []
+        for blob in blobs:
+            refreshed_at = self._ttl_refreshed_at.get((namespace, blob.id))
+            if refreshed_at is None or now - refreshed_at >= refresh_interval:
+                self._mark_ttl_refreshed(blob, namespace)
+                due_blobs.append(blob)
+
+        async def _extend_ttl(blob: Blob) -> None:
+            try:
+                await self._extend_ttl(log, blob, namespace)
+            except Exception as e:
+                # try again next time
+                self._ttl_refreshed_at.pop((namespace, blob.id), None)
+                log.warning(
+                    "Blob TTL refresh error",
+                    blob=blob,
+                    namespace=namespace,
+                    exc_info=e,
+                )
+
+        await asyncio.gather(*[_extend_ttl(blob) for blob in due_blobs])
+
+    async def sweep(self, log: structlog.stdlib.BoundLogger) -> int:
+        """
+        Delete blobs whose TTL has passed, returning how many were deleted.
+        Backends that expire blobs natively have nothing to sweep.
+        """
+        return 0
 
     async def on_startup(self, log: structlog.stdlib.BoundLogger):
         pass
@@ -47,17 +308,20 @@ class BlobRepo:
         # hash `value` to make an id
         id_ = hashlib.sha256(value).hexdigest()
         blob = Blob(id=id_, file_extension=file_extension)
-        if await self.exists(log, blob, namespace):
+        if await self._reuse_existing(log, blob, namespace):
             return blob
 
         timer = Timer()
         timer.start()
-        blob = await self._save(
-            log=log,
-            blob=blob,
-            value=value,
-            namespace=namespace,
-        )
+        if self._should_chunk_content(value[: len(_CHUNK_MANIFEST_MARKER)], len(value)):
+            blob = await self._save_chunked(log, blob, value, namespace)
+        else:
+            blob = await self._save(
+                log=log,
+                blob=blob,
+                value=value,
+                namespace=namespace,
+            )
         timer.end()
         log.info(
             "Saved blob",
@@ -65,6 +329,8 @@ class BlobRepo:
             namespace=namespace,
             duration=timer.wall_time,
         )
+        self._remember_exists(blob, namespace)
+        self._mark_ttl_refreshed(blob, namespace)
         return blob
 
     async def _save(
@@ -76,6 +342,320 @@ class BlobRepo:
     ) -> Blob:
         raise NotImplementedError
 
+    async def _reuse_existing(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        namespace: str,
+    ) -> bool:
+        timer = Timer()
+        timer.start()
+        [exists] = await self._touch_existing(log, [blob], namespace)
+        timer.end()
+        log.info(
+            "Checked blob existence",
+            blob=blob,
+            namespace=namespace,
+            duration=timer.wall_time,
+        )
+        return exists
+
+    async def _touch_existing(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> list[bool]:
+        """
+        Check which of `blobs` are already stored, for a save to reuse them instead of writing them again,
+        and record a use of those that are: nothing refers to them yet, so they mustn't look unused
+        to `BlobGarbageCollector` (or expire) before whatever is being saved does.
+        """
+        exists = await self._exists_many(log, blobs, namespace)
+        existing_blobs = [blob for blob, exists_ in zip(blobs, exists) if exists_]
+        if existing_blobs:
+            # blobs deleted in between are written again
+            touched = await self._touch_many(log, existing_blobs, namespace)
+            existing_blobs = [
+                blob for blob, touched_ in zip(existing_blobs, touched) if touched_
+            ]
+        for blob in existing_blobs:
+            self._remember_exists(blob, namespace)
+        await self._refresh_ttl(log, existing_blobs, namespace)
+        existing_ids = {blob.id for blob in existing_blobs}
+        return [blob.id in existing_ids for blob in blobs]
+
+    async def _touch_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> list[bool]:
+        """
+        Record that blobs were just used, where `list_blobs` reads it from (regardless of `ttl`),
+        returning whether each exists.
+        """
+        raise NotImplementedError
+
+    async def save_file(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        path: str,
+        file_extension: None | str = None,
+        namespace: None | str = None,
+    ) -> Blob:
+        """
+        Save the contents of a file, hashing and uploading it chunk by chunk instead of reading it whole.
+        """
+        id_ = await asyncio.to_thread(hash_file, path, DEFAULT_CHUNK_SIZE)
+        return await self._save_path(log, id_, path, file_extension, namespace)
+
+    async def save_stream(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        chunks: AsyncIterable[bytes],
+        file_extension: None | str = None,
+        namespace: None | str = None,
+    ) -> Blob:
+        """
+        Save a stream of bytes, spooling it to a temporary file while hashing it.
+        """
+        spool_dir = os.path.join(self.temp_dir, "spool")
+        os.makedirs(spool_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=spool_dir)
+        os.close(fd)
+        try:
+            hasher = hashlib.sha256()
+            await _write_chunks(path, chunks, hasher)
+            return await self._save_path(
+                log, hasher.hexdigest(), path, file_extension, namespace
+            )
+        finally:
+            os.remove(path)
+
+    async def _save_path(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        id_: BlobId,
+        path: str,
+        file_extension: None | str,
+        namespace: None | str,
+    ) -> Blob:
+        if namespace is None:
+            namespace = self.default_namespace
+
+        blob = Blob(id=id_, file_extension=file_extension)
+        if await self._reuse_existing(log, blob, namespace):
+            return blob
+
+        timer = Timer()
+        timer.start()
+        size = os.path.getsize(path)
+        head = await asyncio.to_thread(
+            _read_range, path, 0, len(_CHUNK_MANIFEST_MARKER)
+        )
+        if self._should_chunk_content(head, size):
+            blob = await self._save_file_chunked(log, blob, path, namespace)
+        else:
+            blob = await self._save_file(log, blob, path, namespace)
+        timer.end()
+        log.info(
+            "Saved blob",
+            blob=blob,
+            namespace=namespace,
+            duration=timer.wall_time,
+        )
+        self._remember_exists(blob, namespace)
+        self._mark_ttl_refreshed(blob, namespace)
+        return blob
+
+    async def _save_file(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        path: str,
+        namespace: str,
+    ) -> Blob:
+        # repos that keep blobs whole read the file in one go
+        value = await asyncio.to_thread(_read_range, path, 0, -1)
+        return await self._save(log, blob, value, namespace)
+
+    @staticmethod
+    def get_chunk_namespace(namespace: str) -> str:
+        return f"{namespace}__chunks"
+
+    def _should_chunk_content(self, head: Value, size: int) -> bool:
+        # values that look like manifests are always chunked, so they are never mistaken for one
+        if head.startswith(_CHUNK_MANIFEST_MARKER):
+            return True
+        return self.content_chunking and size > self.content_chunk_max_size
+
+    async def _save_chunked(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        data: Any,
+        namespace: str,
+    ) -> Blob:
+        """
+        Save the chunks of `data` (any buffer) that aren't stored yet, then its manifest.
+        """
+        chunk_namespace = self.get_chunk_namespace(namespace)
+
+        def _split() -> list[tuple[BlobId, int, int]]:
+            boundaries = get_content_chunk_boundaries(
+                data,
+                self.content_chunk_min_size,
+                self.content_chunk_avg_size,
+                self.content_chunk_max_size,
+            )
+            chunks = []
+            start = 0
+            with memoryview(data) as view:
+                for end in boundaries:
+                    chunk_id = hashlib.sha256(view[start:end]).hexdigest()
+                    chunks.append((chunk_id, start, end))
+                    start = end
+            return chunks
+
+        chunks = await asyncio.to_thread(_split)
+        unique_chunks = {chunk_id: (start, end) for chunk_id, start, end in chunks}
+        chunk_blobs = [Blob(id=chunk_id) for chunk_id in unique_chunks]
+        # reused chunks are touched before the manifest referring to them is written,
+        # so a concurrent garbage collection sees them as recently used
+        exists = await self._touch_existing(log, chunk_blobs, chunk_namespace)
+        new_chunk_blobs = [
+            chunk_blob
+            for chunk_blob, chunk_exists in zip(chunk_blobs, exists)
+            if not chunk_exists
+        ]
+        semaphore = asyncio.Semaphore(_CHUNK_SAVE_CONCURRENCY)
+
+        async def _save_chunk(chunk_blob: Blob) -> None:
+            # copy each chunk only once it's its turn, so only a few are in memory
+            async with semaphore:
+                start, end = unique_chunks[chunk_blob.id]
+                # reading a mapped file's pages may block, so copy the chunk in a thread
+                value = await asyncio.to_thread(_copy_range, data, start, end)
+                await self._save(log, chunk_blob, value, chunk_namespace)
+            self._remember_exists(chunk_blob, chunk_namespace)
+            self._mark_ttl_refreshed(chunk_blob, chunk_namespace)
+
+        await asyncio.gather(
+            *[_save_chunk(chunk_blob) for chunk_blob in new_chunk_blobs]
+        )
+        # the manifest goes last, so the blob only exists once all its chunks do
+        manifest = _encode_chunk_manifest(
+            [(chunk_id, end - start) for chunk_id, start, end in chunks]
+        )
+        await self._save(log, blob, manifest, namespace)
+        log.debug(
+            "Saved blob in chunks",
+            blob=blob,
+            chunks=len(chunks),
+            new_chunks=len(new_chunk_blobs),
+        )
+        return blob
+
+    async def _save_file_chunked(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        path: str,
+        namespace: str,
+    ) -> Blob:
+        def _map() -> mmap.mmap:
+            with open(path, "rb") as f:
+                # the mapping stays valid after the file is closed
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        mapped = await asyncio.to_thread(_map)
+        try:
+            return await self._save_chunked(log, blob, mapped, namespace)
+        finally:
+            mapped.close()
+
+    async def get_chunks(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        namespace: None | str = None,
+    ) -> None | list[tuple[Blob, int]]:
+        """
+        Return the chunks (in the chunk namespace) and their sizes of a blob saved with content chunking,
+        or `None` if it wasn't (or doesn't exist).
+        """
+        if namespace is None:
+            namespace = self.default_namespace
+        head = await self._retrieve_range(
+            log, blob, 0, len(_CHUNK_MANIFEST_MARKER), namespace
+        )
+        if head != _CHUNK_MANIFEST_MARKER:
+            return None
+        manifest = _decode_chunk_manifest(await self._retrieve(log, blob, namespace))
+        if manifest is None:
+            return None
+        return [(Blob(id=chunk_id), size) for chunk_id, size in manifest]
+
+    async def _join_chunks(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        value: None | Value,
+        namespace: str,
+    ) -> None | Value:
+        """
+        Reassemble a blob from its chunks if `value` is its manifest.
+        """
+        manifest = _decode_chunk_manifest(value)
+        if manifest is None:
+            return value
+        chunk_namespace = self.get_chunk_namespace(namespace)
+        chunk_blobs = [Blob(id=chunk_id) for chunk_id, _ in manifest]
+        chunks = await self._multi_retrieve(
+            log, chunk_blobs, chunk_namespace, self.retrieve_concurrency
+        )
+        if any(chunk is None for chunk in chunks):
+            log.warning(
+                "Blob chunk missing",
+                namespace=namespace,
+            )
+            return None
+        await self._refresh_ttl(log, chunk_blobs, chunk_namespace)
+        return b"".join(chunks)  # type: ignore
+
+    async def _iter_chunks(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        chunks: list[tuple[Blob, int]],
+        namespace: str,
+        start: int = 0,
+        end: None | int = None,
+    ) -> AsyncIterator[Value]:
+        """
+        Read the bytes of a chunked blob from `start` to `end` (exclusive), chunk by chunk.
+        """
+        chunk_namespace = self.get_chunk_namespace(namespace)
+        chunk_start = 0
+        for chunk_blob, size in chunks:
+            chunk_end = chunk_start + size
+            if end is not None and chunk_start >= end:
+                break
+            if chunk_end > start:
+                value = await self._retrieve_range(
+                    log,
+                    chunk_blob,
+                    max(start - chunk_start, 0),
+                    None if end is None or end >= chunk_end else end - chunk_start,
+                    chunk_namespace,
+                )
+                if value is None:
+                    raise ValueError(f"Blob chunk {chunk_blob.id} does not exist")
+                yield value
+            chunk_start = chunk_end
+        await self._refresh_ttl(
+            log, [chunk_blob for chunk_blob, _ in chunks], chunk_namespace
+        )
+
     async def _extend_ttl(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -95,7 +675,15 @@ class BlobRepo:
 
         timer = Timer()
         timer.start()
-        value = await self._retrieve(log=log, blob=blob, namespace=namespace)
+        if self.local_cache is not None:
+            (value,) = await self._get_from_local_cache(log, [blob])
+            if value is None:
+                value = await self._retrieve(log=log, blob=blob, namespace=namespace)
+                value = await self._join_chunks(log, value, namespace)
+                await self._add_to_local_cache(log, blob, value)
+        else:
+            value = await self._retrieve(log=log, blob=blob, namespace=namespace)
+            value = await self._join_chunks(log, value, namespace)
         timer.end()
         log.info(
             "Retrieved blob",
@@ -103,6 +691,8 @@ class BlobRepo:
             namespace=namespace,
             duration=timer.wall_time,
         )
+        if value is not None:
+            await self._refresh_ttl(log, [blob], namespace)
         return value
 
     async def _retrieve(
@@ -118,19 +708,274 @@ class BlobRepo:
         log: structlog.stdlib.BoundLogger,
         blobs: list[Blob],
         namespace: None | str = None,
+        concurrency: None | int = None,
     ) -> list[None | Value]:
+        """
+        Retrieve several blobs, in order, with at most `concurrency` retrievals in flight
+        (defaults to `retrieve_concurrency`).
+        Blobs that don't exist or fail to be retrieved come back as `None`.
+        """
         if namespace is None:
             namespace = self.default_namespace
-        return await self._multi_retrieve(log, blobs, namespace)
+        if concurrency is None:
+            concurrency = self.retrieve_concurrency
+
+        timer = Timer()
+        timer.start()
+        if self.local_cache is not None:
+            values = await self._multi_retrieve_through_local_cache(
+                log, blobs, namespace, concurrency
+            )
+        else:
+            values = await self._multi_retrieve_joined(
+                log, blobs, namespace, concurrency
+            )
+        timer.end()
+        log.info(
+            "Retrieved blobs",
+            blobs=blobs,
+            namespace=namespace,
+            duration=timer.wall_time,
+        )
+        await self._refresh_ttl(
+            log,
+            [blob for blob, value in zip(blobs, values) if value is not None],
+            namespace,
+        )
+        return values
 
     async def _multi_retrieve(
         self,
         log: structlog.stdlib.BoundLogger,
         blobs: list[Blob],
         namespace: str,
+        concurrency: int,
     ) -> list[None | Value]:
         raise NotImplementedError
 
+    async def _multi_retrieve_joined(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+        concurrency: int,
+    ) -> list[None | Value]:
+        values = await self._multi_retrieve(log, blobs, namespace, concurrency)
+        # one at a time, as chunked blobs are large
+        return [await self._join_chunks(log, value, namespace) for value in values]
+
+    async def _multi_retrieve_through_local_cache(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+        concurrency: int,
+    ) -> list[None | Value]:
+        values = await self._get_from_local_cache(log, blobs)
+        missing_blobs = [blob for blob, value in zip(blobs, values) if value is None]
+        if not missing_blobs:
+            return values
+
+        fetched_values = await self._multi_retrieve_joined(
+            log, missing_blobs, namespace, concurrency
+        )
+        fetched = {}
+        for blob, value in zip(missing_blobs, fetched_values):
+            if value is not None and blob.id not in fetched:
+                fetched[blob.id] = value
+                await self._add_to_local_cache(log, blob, value)
+        return [
+            value if value is not None else fetched.get(blob.id)
+            for blob, value in zip(blobs, values)
+        ]
+
+    async def _get_from_local_cache(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+    ) -> list[None | Value]:
+        """
+        Read blobs from the local cache, treating any that can't be read as missing.
+        """
+        local_cache = self.local_cache
+        assert local_cache is not None
+        errors: list[tuple[Blob, OSError]] = []
+
+        def _get_cached() -> list[None | Value]:
+            values: list[None | Value] = []
+            for blob in blobs:
+                try:
+                    values.append(local_cache.get(blob.id))
+                except OSError as e:
+                    errors.append((blob, e))
+                    values.append(None)
+            return values
+
+        values = await asyncio.to_thread(_get_cached)
+        for blob, e in errors:
+            log.warning(
+                "Local blob cache error",
+                blob=blob,
+                exc_info=e,
+            )
+        return values
+
+    async def _add_to_local_cache(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        value: None | Value,
+    ) -> None:
+        if self.local_cache is None or value is None:
+            return
+        try:
+            await asyncio.to_thread(self.local_cache.put, blob.id, value)
+        except Exception as e:
+            log.warning(
+                "Local blob cache error",
+                blob=blob,
+                exc_info=e,
+            )
+
+    async def _gather_retrieve(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+        concurrency: int,
+        retrieve: None | Callable[[Blob], Awaitable[None | Value]] = None,
+    ) -> list[None | Value]:
+        """
+        Run `retrieve` (by default `_retrieve`) once per distinct blob, `concurrency` at a time.
+        """
+        if retrieve is None:
+
+            async def retrieve(blob: Blob) -> None | Value:
+                return await self._retrieve(log, blob, namespace)
+
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def _retrieve(blob: Blob) -> None | Value:
+            async with semaphore:
+                try:
+                    return await retrieve(blob)
+                except Exception as e:
+                    log.warning(
+                        "Blob retrieve error",
+                        blob=blob,
+                        namespace=namespace,
+                        exc_info=e,
+                    )
+                    return None
+
+        unique_blobs = list({blob.id: blob for blob in blobs}.values())
+        values = await asyncio.gather(*[_retrieve(blob) for blob in unique_blobs])
+        values_by_id = {blob.id: value for blob, value in zip(unique_blobs, values)}
+        return [values_by_id[blob.id] for blob in blobs]
+
+    async def retrieve_stream(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        namespace: None | str = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        """
+        Retrieve a blob chunk by chunk. Raises `ValueError` if it doesn't exist.
+        """
+        if namespace is None:
+            namespace = self.default_namespace
+
+        log.info(
+            "Streaming blob",
+            blob=blob,
+            namespace=namespace,
+        )
+        chunks = await self.get_chunks(log, blob, namespace)
+        if chunks is not None:
+            async for value in self._iter_chunks(log, chunks, namespace):
+                for offset in range(0, len(value), chunk_size):
+                    yield value[offset : offset + chunk_size]
+            return
+        async for chunk in self._retrieve_stream(log, blob, namespace, chunk_size):
+            yield chunk
+
+    async def _retrieve_stream(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        namespace: str,
+        chunk_size: int,
+    ) -> AsyncIterator[bytes]:
+        # repos that keep blobs whole can only slice them up
+        value = await self._retrieve(log, blob, namespace)
+        if value is None:
+            raise ValueError(f"Blob {blob} does not exist")
+        for offset in range(0, len(value), chunk_size):
+            yield value[offset : offset + chunk_size]
+
+    async def retrieve_range(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        start: int,
+        end: None | int = None,
+        namespace: None | str = None,
+    ) -> Optional[Value]:
+        """
+        Retrieve the bytes of a blob from `start` up to `end` (exclusive; defaults to the end of the blob).
+        """
+        if namespace is None:
+            namespace = self.default_namespace
+        if start < 0 or (end is not None and end < start):
+            raise ValueError(f"Invalid range: {start}-{end}")
+
+        timer = Timer()
+        timer.start()
+        chunks = await self.get_chunks(log, blob, namespace)
+        if chunks is None:
+            value = await self._retrieve_range(log, blob, start, end, namespace)
+        else:
+            try:
+                value = b"".join(
+                    [
+                        chunk
+                        async for chunk in self._iter_chunks(
+                            log, chunks, namespace, start, end
+                        )
+                    ]
+                )
+            except ValueError as e:
+                log.warning(
+                    "Blob chunk missing",
+                    namespace=namespace,
+                    exc_info=e,
+                )
+                value = None
+        timer.end()
+        log.info(
+            "Retrieved blob range",
+            blob=blob,
+            namespace=namespace,
+            start=start,
+            end=end,
+            duration=timer.wall_time,
+        )
+        return value
+
+    async def _retrieve_range(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        start: int,
+        end: None | int,
+        namespace: str,
+    ) -> Optional[Value]:
+        value = await self._retrieve(log, blob, namespace)
+        if value is None:
+            return None
+        return value[start:end]
+
     async def exists(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -151,7 +996,8 @@ class BlobRepo:
             duration=timer.wall_time,
         )
         if exists:
-            await self._extend_ttl(log, blob, namespace)
+            self._remember_exists(blob, namespace)
+            await self._refresh_ttl(log, [blob], namespace)
         return exists
 
     async def _exists(
@@ -159,6 +1005,54 @@ class BlobRepo:
     ) -> bool:
         raise NotImplementedError
 
+    async def exists_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: None | str = None,
+    ) -> list[bool]:
+        """
+        Check the existence of several blobs in one batch.
+        Blobs seen to exist in the last `exists_cache_ttl` seconds are not checked again.
+        """
+        if namespace is None:
+            namespace = self.default_namespace
+
+        unknown_blobs = [
+            blob for blob in blobs if not self._is_known_to_exist(blob, namespace)
+        ]
+
+        timer = Timer()
+        timer.start()
+        if unknown_blobs:
+            unknown_exists = await self._exists_many(log, unknown_blobs, namespace)
+        else:
+            unknown_exists = []
+        timer.end()
+        log.info(
+            "Checked blob existence",
+            blobs=blobs,
+            namespace=namespace,
+            duration=timer.wall_time,
+        )
+
+        for blob, exists in zip(unknown_blobs, unknown_exists):
+            if exists:
+                self._remember_exists(blob, namespace)
+
+        missing_ids = {
+            blob.id for blob, exists in zip(unknown_blobs, unknown_exists) if not exists
+        }
+        await self._refresh_ttl(
+            log, [blob for blob in blobs if blob.id not in missing_ids], namespace
+        )
+        return [blob.id not in missing_ids for blob in blobs]
+
+    async def _exists_many(
+        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        return [await self._exists(log, blob, namespace) for blob in blobs]
+
     async def download(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -173,7 +1067,10 @@ class BlobRepo:
 
         timer = Timer()
         timer.start()
-        path = await self._download(log, blob, namespace)
+        if self.local_cache is not None:
+            path = await self._download_through_local_cache(log, blob, namespace)
+        else:
+            path = await self._download_joined(log, blob, namespace)
         timer.end()
         log.info(
             "Downloaded blob",
@@ -183,6 +1080,7 @@ class BlobRepo:
         )
 
         self.blob_paths[id_] = path
+        await self._refresh_ttl(log, [blob], namespace)
         return path
 
     async def _download(
@@ -190,6 +1088,63 @@ class BlobRepo:
     ) -> str:
         raise NotImplementedError
 
+    async def _download_joined(
+        self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
+    ) -> str:
+        chunks = await self.get_chunks(log, blob, namespace)
+        if chunks is None:
+            return await self._download(log, blob, namespace)
+
+        # the stored blob is only its manifest, so write the reassembled one elsewhere
+        path = os.path.join(self.temp_dir, "assembled", namespace, blob.id)
+        if blob.file_extension:
+            path += f".{blob.file_extension}"
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            await _write_chunks(partial_path, self._iter_chunks(log, chunks, namespace))
+            os.replace(partial_path, path)
+        except BaseException:
+            os.remove(partial_path)
+            raise
+        return path
+
+    async def _download_through_local_cache(
+        self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
+    ) -> str:
+        local_cache = self.local_cache
+        assert local_cache is not None
+
+        path = os.path.join(self.temp_dir, "blobs", namespace, blob.id)
+        if blob.file_extension:
+            path += f".{blob.file_extension}"
+        try:
+            linked = await asyncio.to_thread(local_cache.link, blob.id, path)
+        except OSError as e:
+            log.warning(
+                "Local blob cache error",
+                blob=blob,
+                exc_info=e,
+            )
+            linked = False
+        if linked:
+            log.debug("Linked blob from local cache", blob=blob)
+            return path
+
+        path = await self._download_joined(log, blob, namespace)
+        try:
+            await asyncio.to_thread(local_cache.put_file, blob.id, path)
+        except Exception as e:
+            log.warning(
+                "Local blob cache error",
+                blob=blob,
+                exc_info=e,
+            )
+        return path
+
     async def delete(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -199,6 +1154,16 @@ class BlobRepo:
         if namespace is None:
             namespace = self.default_namespace
 
+        self._known_blobs.pop((namespace, blob.id), None)
+        if self.local_cache is not None:
+            try:
+                await asyncio.to_thread(self.local_cache.remove, blob.id)
+            except OSError as e:
+                log.warning(
+                    "Local blob cache error",
+                    blob=blob,
+                    exc_info=e,
+                )
         timer = Timer()
         timer.start()
         await self._delete(log, blob, namespace)
@@ -219,9 +1184,203 @@ class BlobRepo:
         # don't actually use this, it's just for testing
         raise NotImplementedError
 
+    async def delete_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: None | str = None,
+    ) -> None:
+        """
+        Delete blobs in bulk. Blobs that don't exist are skipped.
+        """
+        if namespace is None:
+            namespace = self.default_namespace
+        if not blobs:
+            return
+
+        for blob in blobs:
+            self._known_blobs.pop((namespace, blob.id), None)
+        if self.local_cache is not None:
+            local_cache = self.local_cache
+
+            def _remove_cached() -> None:
+                for blob in blobs:
+                    local_cache.remove(blob.id)
+
+            try:
+                await asyncio.to_thread(_remove_cached)
+            except OSError as e:
+                log.warning(
+                    "Local blob cache error",
+                    blobs=blobs,
+                    exc_info=e,
+                )
+        timer = Timer()
+        timer.start()
+        await self._delete_many(log, blobs, namespace)
+        timer.end()
+        log.info(
+            "Deleted blobs",
+            blobs=len(blobs),
+            namespace=namespace,
+            duration=timer.wall_time,
+        )
+
+    async def _delete_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> None:
+        raise NotImplementedError
+
+    async def list_blobs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: None | str = None,
+    ) -> AsyncIterator[tuple[Blob, None | float]]:
+        """
+        Iterate over the blobs stored in a namespace, each with when it was last written or used
+        (in seconds since the epoch), if the backend knows.
+        """
+        if namespace is None:
+            namespace = self.default_namespace
+        async for entry in self._list_blobs(log, namespace):
+            yield entry
+
+    def _list_blobs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[tuple[Blob, None | float]]:
+        raise NotImplementedError
+
+
+class SpillingBlobStore:
+    """
+    Blobs of all namespaces, kept in memory up to `max_bytes`.
+    The least recently used ones spill to files in a temporary directory (removed when the process exits),
+    and are read back into memory when next retrieved.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024**2):
+        self._memory: ByteBudgetCache[tuple[str, BlobId], Value] = ByteBudgetCache(
+            max_bytes
+        )
+        # blobs evicted from memory, kept readable while they're written to disk
+        self._spilling: dict[tuple[str, BlobId], Value] = {}
+        self._spilled: dict[tuple[str, BlobId], str] = {}
+        self._spill_dir: None | tempfile.TemporaryDirectory = None
+        # when each blob was last written or touched, in seconds since the epoch
+        self._last_used: dict[tuple[str, BlobId], float] = {}
+
+    @property
+    def max_bytes(self) -> int:
+        return self._memory.max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, max_bytes: int) -> None:
+        # takes effect on the next `set`
+        self._memory.max_bytes = max_bytes
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory.total_bytes
+
+    def __contains__(self, key: tuple[str, BlobId]) -> bool:
+        return key in self._memory or key in self._spilling or key in self._spilled
+
+    def keys(self) -> list[tuple[str, BlobId]]:
+        return list(
+            dict.fromkeys([*self._memory.keys(), *self._spilling, *self._spilled])
+        )
+
+    def get_spilled_path(self, key: tuple[str, BlobId]) -> None | str:
+        return self._spilled.get(key)
+
+    def get_last_used(self, key: tuple[str, BlobId]) -> None | float:
+        return self._last_used.get(key)
+
+    def touch(self, key: tuple[str, BlobId]) -> bool:
+        if key not in self:
+            return False
+        self._last_used[key] = time.time()
+        return True
+
+    async def get(self, key: tuple[str, BlobId]) -> None | Value:
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+        value = self._spilling.get(key)
+        if value is not None:
+            return value
+        path = self._spilled.get(key)
+        if path is None:
+            return None
+        value = await asyncio.to_thread(_read_range, path, 0, -1)
+        if key in self._spilled:
+            await self._spill(self._memory.set(key, value, len(value)))
+        return value
+
+    async def set(self, key: tuple[str, BlobId], value: Value) -> None:
+        self._last_used[key] = time.time()
+        evicted = self._memory.set(key, value, len(value))
+        if key not in self._memory:
+            # larger than the whole budget
+            evicted.append((key, value))
+        await self._spill(evicted)
+
+    async def pop(self, key: tuple[str, BlobId]) -> None:
+        self._last_used.pop(key, None)
+        self._memory.pop(key)
+        self._spilling.pop(key, None)
+        path = self._spilled.pop(key, None)
+        if path is not None:
+            await asyncio.to_thread(_remove_file, path)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._spilling.clear()
+        self._spilled.clear()
+        self._last_used.clear()
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+
+    async def _spill(self, entries: list[tuple[tuple[str, BlobId], Value]]) -> None:
+        for key, value in entries:
+            if key in self._spilled or key in self._spilling:
+                # content-addressed, so a spilled copy is still current
+                continue
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.TemporaryDirectory(prefix="aijson-blobs-")
+            namespace, blob_id = key
+            path = os.path.join(self._spill_dir.name, namespace, blob_id)
+            self._spilling[key] = value
+            try:
+                await asyncio.to_thread(_write_atomic, path, _write_value(value))
+            except BaseException:
+                self._spilling.pop(key, None)
+                raise
+            if self._spilling.pop(key, None) is None:
+                # deleted while it was being written
+                await asyncio.to_thread(_remove_file, path)
+                continue
+            self._spilled[key] = path
+
 
 class InMemoryBlobRepo(BlobRepo):
-    _store = defaultdict(dict)
+    """
+    Keeps blobs in a store shared by all instances in the process,
+    which holds up to `max_bytes` of them in memory and spills the rest to disk.
+    As the store is shared, its budget is set for the whole process, with `set_max_bytes`.
+    """
+
+    _store = SpillingBlobStore()
+
+    @classmethod
+    def set_max_bytes(cls, max_bytes: int) -> None:
+        cls._store.max_bytes = max_bytes
 
     async def _save(
         self,
@@ -230,7 +1389,7 @@ class InMemoryBlobRepo(BlobRepo):
         value: Value,
         namespace: str,
     ) -> Blob:
-        InMemoryBlobRepo._store[namespace][blob.id] = value
+        await InMemoryBlobRepo._store.set((namespace, blob.id), value)
         return blob
 
     async def _extend_ttl(
@@ -244,17 +1403,499 @@ class InMemoryBlobRepo(BlobRepo):
     async def _retrieve(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
     ) -> Optional[Value]:
-        return InMemoryBlobRepo._store[namespace].get(blob.id, None)
+        return await InMemoryBlobRepo._store.get((namespace, blob.id))
 
     async def _multi_retrieve(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+        concurrency: int,
+    ) -> list[None | Value]:
+        return [
+            await InMemoryBlobRepo._store.get((namespace, blob.id)) for blob in blobs
+        ]
+
+    async def _exists(
+        self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
+    ) -> bool:
+        return (namespace, blob.id) in InMemoryBlobRepo._store
+
+    async def _exists_many(
+        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        return [(namespace, blob.id) in InMemoryBlobRepo._store for blob in blobs]
+
+    async def _touch_many(
         self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        return [InMemoryBlobRepo._store.touch((namespace, blob.id)) for blob in blobs]
+
+    async def _download(
+        self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
+    ) -> str:
+        # one file per blob, reused by later downloads
+        path = os.path.join(self.temp_dir, "blobs", namespace, blob.id)
+        if blob.file_extension is not None:
+            path += f".{blob.file_extension}"
+        if await asyncio.to_thread(os.path.exists, path):
+            return path
+
+        key = (namespace, blob.id)
+        spilled_path = InMemoryBlobRepo._store.get_spilled_path(key)
+        if spilled_path is not None:
+
+            def _copy_file(partial_path: str) -> None:
+                shutil.copyfile(spilled_path, partial_path)
+
+            await asyncio.to_thread(_write_atomic, path, _copy_file)
+            return path
+
+        value = await InMemoryBlobRepo._store.get(key)
+        if value is None:
+            raise ValueError(f"Blob {blob} does not exist")
+        await asyncio.to_thread(_write_atomic, path, _write_value(value))
+        return path
+
+    async def _delete(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        namespace: str,
+    ) -> None:
+        await InMemoryBlobRepo._store.pop((namespace, blob.id))
+
+    async def _delete_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> None:
+        for blob in blobs:
+            await InMemoryBlobRepo._store.pop((namespace, blob.id))
+
+    async def _list_blobs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[tuple[Blob, None | float]]:
+        for key in InMemoryBlobRepo._store.keys():
+            if key[0] == namespace:
+                yield Blob(id=key[1]), InMemoryBlobRepo._store.get_last_used(key)
+
+
+class RedisBlobRepo(BlobRepo):
+    """
+    Stores blobs in Redis, under `blob:<namespace>:<id>`.
+    With `ttl` set, keys expire natively, and using a blob pushes its expiry back.
+
+    Blobs larger than `chunk_size` are stored in parts of that size (`blob:<namespace>:<id>:part:<n>`),
+    with a small manifest under the blob's key, written once all parts are,
+    so no single command moves a large value and holds up the server for its other clients.
+    Parts are read and written in pipelined windows of `transfer_window` parts.
+
+    With `write_behind` set, saves are buffered and written in pipelined batches
+    of up to `write_batch_size` blobs and `write_batch_bytes` bytes, at most `write_delay` seconds later
+    (and on `close`). Blobs of batches that fail to be written are no longer assumed to exist.
+    """
+
+    def __init__(
+        self,
+        *args,
+        write_behind: bool = False,
+        write_batch_size: int = 500,
+        write_batch_bytes: int = 16 * 1024 * 1024,
+        write_delay: float = 0.05,
+        chunk_size: int = 1024 * 1024,
+        transfer_window: int = 8,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.redis = get_aioredis()
+        self.chunk_size = chunk_size
+        self.transfer_window = transfer_window
+        self.write_buffer = (
+            RedisWriteBuffer(
+                self.redis,
+                max_batch_size=write_batch_size,
+                max_delay=write_delay,
+                max_batch_bytes=write_batch_bytes,
+                on_error=self._forget_unwritten,
+            )
+            if write_behind
+            else None
+        )
+
+    def _forget_unwritten(self, keys: list[str]) -> None:
+        for key in keys:
+            namespace, _, blob_id = key.removeprefix("blob:").rpartition(":")
+            self._known_blobs.pop((namespace, blob_id), None)
+
+    async def close(self):
+        if self.write_buffer is not None:
+            await self.write_buffer.flush(get_logger())
+        await self.redis.aclose()
+
+    @staticmethod
+    def _get_key(blob: Blob, namespace: str) -> str:
+        return f"blob:{namespace}:{blob.id}"
+
+    @staticmethod
+    def _get_part_key(key: str, index: int) -> str:
+        return f"{key}:part:{index}"
+
+    def _is_buffered(self, key: str) -> bool:
+        return self.write_buffer is not None and key in self.write_buffer
+
+    def _should_chunk(self, value: Value) -> bool:
+        # values that look like manifests are chunked too, so they are never mistaken for one
+        return len(value) > self.chunk_size or value.startswith(_REDIS_MANIFEST_MARKER)
+
+    @staticmethod
+    def _parse_manifest(value: Value) -> None | tuple[int, int]:
+        """
+        Return the size and chunk size of a chunked blob, if `value` (or its head) is its manifest.
+        """
+        if not value.startswith(_REDIS_MANIFEST_MARKER):
+            return None
+        manifest = json.loads(value[len(_REDIS_MANIFEST_MARKER) :])
+        return manifest["size"], manifest["chunk_size"]
+
+    @staticmethod
+    def _get_part_count(size: int, chunk_size: int) -> int:
+        return -(-size // chunk_size)
+
+    async def _read_head(self, key: str) -> None | Value:
+        """
+        Read the start of a value, which is all of it if it's small or a manifest.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(key)
+            pipe.getrange(key, 0, _REDIS_MANIFEST_HEAD_SIZE - 1)
+            exists, head = await pipe.execute()
+        if not exists:
+            return None
+        return head
+
+    async def _save(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        value: Value,
+        namespace: str,
+    ) -> Blob:
+        key = self._get_key(blob, namespace)
+        if self._should_chunk(value):
+
+            async def _read_part(offset: int) -> Value:
+                return value[offset : offset + self.chunk_size]
+
+            await self._save_parts(log, key, len(value), _read_part)
+            return blob
+        if self.write_buffer is not None:
+            self.write_buffer.set(log, key, value, ex=self.ttl)
+            return blob
+        await self.redis.set(key, value, ex=self.ttl)
+        return blob
+
+    async def _save_file(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        path: str,
+        namespace: str,
+    ) -> Blob:
+        size = os.path.getsize(path)
+        if size <= self.chunk_size:
+            value = await asyncio.to_thread(_read_range, path, 0, size)
+            return await self._save(log, blob, value, namespace)
+
+        async def _read_part(offset: int) -> Value:
+            return await asyncio.to_thread(_read_range, path, offset, self.chunk_size)
+
+        await self._save_parts(log, self._get_key(blob, namespace), size, _read_part)
+        return blob
+
+    async def _save_parts(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        size: int,
+        read_part: Callable[[int], Awaitable[Value]],
+    ) -> None:
+        chunk_size = self.chunk_size
+        part_count = self._get_part_count(size, chunk_size)
+        # only one window of parts is read into memory at a time
+        for window_start in range(0, part_count, self.transfer_window):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for index in range(
+                    window_start, min(window_start + self.transfer_window, part_count)
+                ):
+                    pipe.set(
+                        self._get_part_key(key, index),
+                        await read_part(index * chunk_size),
+                        ex=self.ttl,
+                    )
+                await pipe.execute()
+        manifest = json.dumps({"size": size, "chunk_size": chunk_size})
+        # the manifest goes last, so the blob only exists once all its parts do
+        await self.redis.set(
+            key, _REDIS_MANIFEST_MARKER + manifest.encode(), ex=self.ttl
+        )
+        log.debug(
+            "Saved blob in parts",
+            key=key,
+            parts=part_count,
+        )
+
+    async def _read_parts(
+        self,
+        key: str,
+        size: int,
+        chunk_size: int,
+        start: int = 0,
+        end: None | int = None,
+    ) -> AsyncIterator[Value]:
+        """
+        Read the bytes of a chunked blob from `start` to `end` (exclusive), part by part.
+        """
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return
+        first_index = start // chunk_size
+        last_index = (end - 1) // chunk_size
+        for window_start in range(first_index, last_index + 1, self.transfer_window):
+            indexes = range(
+                window_start, min(window_start + self.transfer_window, last_index + 1)
+            )
+            ranges = [
+                (
+                    max(start - index * chunk_size, 0),
+                    min(end - index * chunk_size, chunk_size),
+                )
+                for index in indexes
+            ]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for index, (part_start, part_end) in zip(indexes, ranges):
+                    pipe.getrange(
+                        self._get_part_key(key, index), part_start, part_end - 1
+                    )
+                parts = await pipe.execute()
+            for index, (part_start, part_end), part in zip(indexes, ranges, parts):
+                if len(part) != part_end - part_start:
+                    raise _MissingBlobPartError(
+                        f"Part {index} of blob {key} is missing"
+                    )
+                yield part
+
+    async def _resolve(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        value: None | Value,
+    ) -> None | Value:
+        """
+        Assemble a chunked blob from its parts if `value` is its manifest.
+        """
+        if value is None:
+            return None
+        manifest = self._parse_manifest(value)
+        if manifest is None:
+            return value
+        try:
+            return b"".join([part async for part in self._read_parts(key, *manifest)])
+        except _MissingBlobPartError as e:
+            log.warning(
+                "Blob part missing",
+                key=key,
+                exc_info=e,
+            )
+            return None
+
+    async def _get_part_keys(self, keys: list[str]) -> list[str]:
+        """
+        Find the part keys of those of `keys` that are chunked blobs.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.getrange(key, 0, _REDIS_MANIFEST_HEAD_SIZE - 1)
+            heads = await pipe.execute()
+        part_keys = []
+        for key, head in zip(keys, heads):
+            manifest = self._parse_manifest(head)
+            if manifest is not None:
+                part_keys += [
+                    self._get_part_key(key, index)
+                    for index in range(self._get_part_count(*manifest))
+                ]
+        return part_keys
+
+    async def _extend_ttl(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        namespace: str,
+    ) -> None:
+        if self.ttl is None:
+            return
+        key = self._get_key(blob, namespace)
+        if self._is_buffered(key):
+            # the expiry is set when the write is flushed
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.expire(key, self.ttl)
+            pipe.getrange(key, 0, _REDIS_MANIFEST_HEAD_SIZE - 1)
+            _, head = await pipe.execute()
+        manifest = self._parse_manifest(head)
+        if manifest is None:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for index in range(self._get_part_count(*manifest)):
+                pipe.expire(self._get_part_key(key, index), self.ttl)
+            await pipe.execute()
+
+    async def _retrieve(
+        self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
+    ) -> Optional[Value]:
+        key = self._get_key(blob, namespace)
+        if self._is_buffered(key):
+            return self.write_buffer.get(key)  # type: ignore
+        return await self._resolve(log, key, await self.redis.get(key))
+
+    async def _multi_retrieve(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+        concurrency: int,
     ) -> list[None | Value]:
-        return [InMemoryBlobRepo._store[namespace][blob.id] for blob in blobs]
+        # a single MGET, so `concurrency` doesn't apply
+        keys = [self._get_key(blob, namespace) for blob in blobs]
+        # only fetch what isn't buffered
+        values = {
+            key: self.write_buffer.get(key)  # type: ignore
+            for key in keys
+            if self._is_buffered(key)
+        }
+        unbuffered_keys = [key for key in keys if key not in values]
+        if unbuffered_keys:
+            values.update(zip(unbuffered_keys, await self.redis.mget(*unbuffered_keys)))
+
+        # assemble chunked blobs, `concurrency` at a time
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _resolve(key: str) -> None | Value:
+            async with semaphore:
+                return await self._resolve(log, key, values[key])
+
+        return list(await asyncio.gather(*[_resolve(key) for key in keys]))
+
+    async def _retrieve_stream(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        namespace: str,
+        chunk_size: int,
+    ) -> AsyncIterator[bytes]:
+        key = self._get_key(blob, namespace)
+        if self._is_buffered(key):
+            async for chunk in super()._retrieve_stream(
+                log, blob, namespace, chunk_size
+            ):
+                yield chunk
+            return
+        head = await self._read_head(key)
+        if head is None:
+            raise ValueError(f"Blob {blob} does not exist")
+        manifest = self._parse_manifest(head)
+        if manifest is None:
+            # not chunked, so at most `self.chunk_size` bytes
+            value = head
+            if len(head) == _REDIS_MANIFEST_HEAD_SIZE:
+                value = await self.redis.get(key)
+                if value is None:
+                    raise ValueError(f"Blob {blob} does not exist")
+            for offset in range(0, len(value), chunk_size):
+                yield value[offset : offset + chunk_size]
+            return
+        # parts are streamed as they are stored
+        async for part in self._read_parts(key, *manifest):
+            yield part
+
+    async def _retrieve_range(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        start: int,
+        end: None | int,
+        namespace: str,
+    ) -> Optional[Value]:
+        key = self._get_key(blob, namespace)
+        if self._is_buffered(key):
+            return self.write_buffer.get(key)[start:end]  # type: ignore
+        head = await self._read_head(key)
+        if head is None:
+            return None
+        manifest = self._parse_manifest(head)
+        if manifest is not None:
+            try:
+                return b"".join(
+                    [
+                        part
+                        async for part in self._read_parts(key, *manifest, start, end)
+                    ]
+                )
+            except _MissingBlobPartError as e:
+                log.warning(
+                    "Blob part missing",
+                    key=key,
+                    exc_info=e,
+                )
+                return None
+        if len(head) < _REDIS_MANIFEST_HEAD_SIZE or (
+            end is not None and end <= _REDIS_MANIFEST_HEAD_SIZE
+        ):
+            return head[start:end]
+        if end is not None and end <= start:
+            return b""
+        return await self.redis.getrange(key, start, -1 if end is None else end - 1)
 
     async def _exists(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
     ) -> bool:
-        return blob.id in InMemoryBlobRepo._store[namespace]
+        key = self._get_key(blob, namespace)
+        if self._is_buffered(key):
+            return True
+        return bool(await self.redis.exists(key))
+
+    async def _exists_many(
+        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        keys = [self._get_key(blob, namespace) for blob in blobs]
+        unbuffered_keys = [key for key in keys if not self._is_buffered(key)]
+        if not unbuffered_keys:
+            return [True for _ in keys]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in unbuffered_keys:
+                pipe.exists(key)
+            results = await pipe.execute()
+        exists = dict(zip(unbuffered_keys, results))
+        return [bool(exists.get(key, True)) for key in keys]
+
+    async def _touch_many(
+        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        # TOUCH resets the idle time `_list_blobs` reads
+        keys = [self._get_key(blob, namespace) for blob in blobs]
+        unbuffered_keys = [key for key in keys if not self._is_buffered(key)]
+        if not unbuffered_keys:
+            return [True for _ in keys]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in unbuffered_keys:
+                pipe.touch(key)
+            results = await pipe.execute()
+        touched = dict(zip(unbuffered_keys, results))
+        return [bool(touched.get(key, True)) for key in keys]
 
     async def _download(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
@@ -266,8 +1907,18 @@ class InMemoryBlobRepo(BlobRepo):
         path = os.path.join(dir_, rand_id)
         if blob.file_extension is not None:
             path += f".{blob.file_extension}"
-        with open(path, "wb") as f:
-            f.write(InMemoryBlobRepo._store[namespace][blob.id])
+        # write to a temporary file, so a failed download leaves nothing behind
+        fd, partial_path = tempfile.mkstemp(dir=dir_)
+        os.close(fd)
+        try:
+            await _write_chunks(
+                partial_path,
+                self._retrieve_stream(log, blob, namespace, DEFAULT_CHUNK_SIZE),
+            )
+            os.replace(partial_path, path)
+        except BaseException:
+            os.remove(partial_path)
+            raise
         return path
 
     async def _delete(
@@ -276,16 +1927,128 @@ class InMemoryBlobRepo(BlobRepo):
         blob: Blob,
         namespace: str,
     ) -> None:
-        del InMemoryBlobRepo._store[namespace][blob.id]
+        key = self._get_key(blob, namespace)
+        if self.write_buffer is not None:
+            await self.write_buffer.discard(log, key)
+        # UNLINK frees large values in the background, without blocking the server
+        await self.redis.unlink(key, *await self._get_part_keys([key]))
 
+    async def _delete_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> None:
+        keys = [self._get_key(blob, namespace) for blob in blobs]
+        if self.write_buffer is not None:
+            for key in keys:
+                await self.write_buffer.discard(log, key)
+        await self.redis.unlink(*keys, *await self._get_part_keys(keys))
 
-class RedisBlobRepo(BlobRepo):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.redis = get_aioredis()
+    async def _list_blobs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[tuple[Blob, None | float]]:
+        if self.write_buffer is not None:
+            await self.write_buffer.flush(log)
+        batch_size = 1000
+        prefix = self._get_key(Blob(id=""), namespace)
+        # escape glob characters in the namespace
+        pattern = re.sub(r"([\\*?\[\]])", r"\\\1", prefix) + "*"
+
+        async def _with_idle_times(keys: list[str]):
+            # keys are rewritten on save and touched on use, so idle time tells when they were last used
+            # (it's unknown under LFU eviction policies, where OBJECT IDLETIME fails)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.object("idletime", key)
+                idle_times = await pipe.execute(raise_on_error=False)
+            now = time.time()
+            return [
+                (
+                    Blob(id=key[len(prefix) :]),
+                    now - idle_time if isinstance(idle_time, int) else None,
+                )
+                for key, idle_time in zip(keys, idle_times)
+            ]
+
+        keys = []
+        async for key in self.redis.scan_iter(match=pattern, count=batch_size):
+            if isinstance(key, bytes):
+                key = key.decode()
+            if ":" in key[len(prefix) :]:
+                # a blob of a nested namespace
+                continue
+            keys.append(key)
+            if len(keys) >= batch_size:
+                for entry in await _with_idle_times(keys):
+                    yield entry
+                keys = []
+        if keys:
+            for entry in await _with_idle_times(keys):
+                yield entry
+
+
+class FilesystemBlobRepo(BlobRepo):
+    """
+    Stores blobs as files under `<temp_dir>/blobs/<namespace>/`, sharded by the first bytes of their hash
+    (`ab/cd/abcd...`) so no directory grows too large.
+    Blobs written by older versions into the flat namespace directory are still found there.
+
+    File operations run in worker threads, and writes go through a temporary file and a rename,
+    so readers never see partial blobs.
+
+    With `ttl` set, a blob's modification time records when it was last used,
+    and blobs unused for longer than `ttl` are deleted by `sweep`,
+    which also runs in the background every `sweep_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        temp_dir: str,
+        sharded: bool = True,
+        sweep_interval: float | None = 300,
+        **kwargs,
+    ):
+        super().__init__(temp_dir, **kwargs)
+        self.sharded = sharded
+        self.sweep_interval = sweep_interval
+        self._sweeper: asyncio.Task | None = None
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def _get_flat_path(self, blob: Blob, namespace: str) -> str:
+        path = os.path.join(self.temp_dir, "blobs", namespace, blob.id)
+        if blob.file_extension is not None:
+            path += f".{blob.file_extension}"
+        return path
+
+    def _get_path(self, blob: Blob, namespace: str) -> str:
+        if not self.sharded:
+            return self._get_flat_path(blob, namespace)
+        path = os.path.join(
+            self.temp_dir, "blobs", namespace, blob.id[:2], blob.id[2:4], blob.id
+        )
+        if blob.file_extension is not None:
+            path += f".{blob.file_extension}"
+        return path
 
-    async def close(self):
-        await self.redis.aclose()
+    def _find_path(self, blob: Blob, namespace: str) -> None | str:
+        path = self._get_path(blob, namespace)
+        if os.path.exists(path):
+            return path
+        flat_path = self._get_flat_path(blob, namespace)
+        if flat_path != path and os.path.exists(flat_path):
+            return flat_path
+        return None
 
     async def _save(
         self,
@@ -294,7 +2057,26 @@ class RedisBlobRepo(BlobRepo):
         value: Value,
         namespace: str,
     ) -> Blob:
-        await self.redis.set(f"blob:{namespace}:{blob.id}", value)
+        await asyncio.to_thread(
+            _write_atomic, self._get_path(blob, namespace), _write_value(value)
+        )
+        self._start_sweeper(log)
+        return blob
+
+    async def _save_file(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        path: str,
+        namespace: str,
+    ) -> Blob:
+        def _copy_file(blob_path: str) -> None:
+            shutil.copyfile(path, blob_path)
+
+        await asyncio.to_thread(
+            _write_atomic, self._get_path(blob, namespace), _copy_file
+        )
+        self._start_sweeper(log)
         return blob
 
     async def _extend_ttl(
@@ -303,101 +2085,203 @@ class RedisBlobRepo(BlobRepo):
         blob: Blob,
         namespace: str,
     ) -> None:
-        pass
+        def _touch() -> None:
+            path = self._find_path(blob, namespace)
+            if path is not None:
+                os.utime(path)
+
+        await asyncio.to_thread(_touch)
+
+    def _start_sweeper(self, log: structlog.stdlib.BoundLogger) -> None:
+        if self.ttl is None or self.sweep_interval is None or self._sweeper is not None:
+            return
+        self._sweeper = asyncio.create_task(self._sweep_periodically(log))
+
+    async def _sweep_periodically(self, log: structlog.stdlib.BoundLogger) -> None:
+        assert self.sweep_interval is not None
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep(log)
+            except Exception as e:
+                log.warning(
+                    "Blob sweep error",
+                    exc_info=e,
+                )
+
+    async def sweep(self, log: structlog.stdlib.BoundLogger) -> int:
+        ttl_seconds = self._get_ttl_seconds()
+        if ttl_seconds is None:
+            return 0
+        expires_before = time.time() - ttl_seconds
+
+        def _sweep() -> int:
+            deleted = 0
+            for dirpath, _, filenames in os.walk(os.path.join(self.temp_dir, "blobs")):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        if os.stat(path).st_mtime >= expires_before:
+                            continue
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                    # leftover temporary files from interrupted writes aren't blobs
+                    if not filename.endswith(".tmp"):
+                        deleted += 1
+            return deleted
+
+        timer = Timer()
+        timer.start()
+        deleted = await asyncio.to_thread(_sweep)
+        timer.end()
+        if deleted:
+            # deleted blobs may be remembered as existing
+            self._known_blobs.clear()
+        log.info(
+            "Swept expired blobs",
+            deleted=deleted,
+            duration=timer.wall_time,
+        )
+        return deleted
 
     async def _retrieve(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
     ) -> Optional[Value]:
-        return await self.redis.get(f"blob:{namespace}:{blob.id}")
+        return await asyncio.to_thread(self._read, blob, namespace)
+
+    def _read(self, blob: Blob, namespace: str) -> Optional[Value]:
+        path = self._find_path(blob, namespace)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
 
     async def _multi_retrieve(
-        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+        concurrency: int,
     ) -> list[None | Value]:
-        return await self.redis.mget(*[f"blob:{namespace}:{blob.id}" for blob in blobs])
-
-    async def _exists(
-        self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
-    ) -> bool:
-        return bool(await self.redis.exists(f"blob:{namespace}:{blob.id}"))
+        # read in worker threads, so reads overlap instead of blocking the loop one by one
+        async def _retrieve(blob: Blob) -> Optional[Value]:
+            return await asyncio.to_thread(self._read, blob, namespace)
 
-    async def _download(
-        self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
-    ) -> str:
-        # save to temp dir
-        dir_ = os.path.join(self.temp_dir, "blobs", namespace)
-        os.makedirs(dir_, exist_ok=True)
-        rand_id = uuid.uuid4().hex
-        path = os.path.join(dir_, rand_id)
-        if blob.file_extension is not None:
-            path += f".{blob.file_extension}"
-        with open(path, "wb") as f:
-            f.write(await self.redis.get(f"blob:{namespace}:{blob.id}"))
-        return path
+        return await self._gather_retrieve(
+            log, blobs, namespace, concurrency, retrieve=_retrieve
+        )
 
-    async def _delete(
+    async def retrieve_mmap(
         self,
         log: structlog.stdlib.BoundLogger,
         blob: Blob,
-        namespace: str,
-    ) -> None:
-        await self.redis.delete(f"blob:{namespace}:{blob.id}")
+        namespace: None | str = None,
+    ) -> None | memoryview:
+        """
+        Retrieve a read-only view of a blob's file mapped into memory, without copying it.
+        The mapping stays open as long as the view (or a slice of it) is referenced;
+        `release()` the view when done with it.
+        """
+        if namespace is None:
+            namespace = self.default_namespace
 
+        timer = Timer()
+        timer.start()
+        view = await asyncio.to_thread(self._map, blob, namespace)
+        timer.end()
+        log.info(
+            "Mapped blob",
+            blob=blob,
+            namespace=namespace,
+            duration=timer.wall_time,
+        )
+        return view
 
-class FilesystemBlobRepo(BlobRepo):
-    async def _save(
+    def _map(self, blob: Blob, namespace: str) -> None | memoryview:
+        path = self._find_path(blob, namespace)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # empty files can't be mapped
+                return memoryview(b"")
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    async def _retrieve_stream(
         self,
         log: structlog.stdlib.BoundLogger,
         blob: Blob,
-        value: Value,
         namespace: str,
-    ) -> Blob:
-        blob_dir = os.path.join(self.temp_dir, "blobs", namespace)
-        os.makedirs(blob_dir, exist_ok=True)
-
-        path = os.path.join(blob_dir, blob.id)
-        if blob.file_extension is not None:
-            path += f".{blob.file_extension}"
-        with open(path, "wb") as f:
-            f.write(value)
-        return blob
+        chunk_size: int,
+    ) -> AsyncIterator[bytes]:
+        path = await asyncio.to_thread(self._find_path, blob, namespace)
+        if path is None:
+            raise ValueError(f"Blob {blob} does not exist")
+        f = await asyncio.to_thread(open, path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, chunk_size):
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
 
-    async def _extend_ttl(
+    async def _retrieve_range(
         self,
         log: structlog.stdlib.BoundLogger,
         blob: Blob,
+        start: int,
+        end: None | int,
         namespace: str,
-    ) -> None:
-        pass
-
-    async def _retrieve(
-        self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
     ) -> Optional[Value]:
-        path = os.path.join(self.temp_dir, "blobs", namespace, blob.id)
-        if not os.path.exists(path):
+        path = await asyncio.to_thread(self._find_path, blob, namespace)
+        if path is None:
             return None
-        with open(path, "rb") as f:
-            return f.read()
-
-    async def _multi_retrieve(
-        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
-    ) -> list[None | Value]:
-        return [await self._retrieve(log, blob, namespace=namespace) for blob in blobs]
+        size = -1 if end is None else end - start
+        return await asyncio.to_thread(_read_range, path, start, size)
 
     async def _exists(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
     ) -> bool:
-        path = os.path.join(self.temp_dir, "blobs", namespace, blob.id)
-        return os.path.exists(path)
+        return await asyncio.to_thread(self._find_path, blob, namespace) is not None
+
+    async def _exists_many(
+        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        def _exists_all() -> list[bool]:
+            return [self._find_path(blob, namespace) is not None for blob in blobs]
+
+        return await asyncio.to_thread(_exists_all)
+
+    async def _touch_many(
+        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        def _touch(blob: Blob) -> bool:
+            path = self._find_path(blob, namespace)
+            if path is None:
+                return False
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return False
+            return True
+
+        def _touch_all() -> list[bool]:
+            return [_touch(blob) for blob in blobs]
+
+        return await asyncio.to_thread(_touch_all)
 
     async def _download(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
     ) -> str:
-        dir_ = os.path.join(self.temp_dir, "blobs", namespace)
-        os.makedirs(dir_, exist_ok=True)
-        path = os.path.join(dir_, blob.id)
-        if blob.file_extension is not None:
-            path += f".{blob.file_extension}"
-        return path
+        def _get_local_path() -> str:
+            path = self._find_path(blob, namespace)
+            if path is not None:
+                return path
+            path = self._get_path(blob, namespace)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return path
+
+        return await asyncio.to_thread(_get_local_path)
 
     async def _delete(
         self,
@@ -405,11 +2289,70 @@ class FilesystemBlobRepo(BlobRepo):
         blob: Blob,
         namespace: str,
     ) -> None:
-        path = os.path.join(self.temp_dir, "blobs", namespace, blob.id)
-        os.remove(path)
+        def _remove() -> None:
+            path = self._find_path(blob, namespace)
+            if path is None:
+                raise FileNotFoundError(self._get_path(blob, namespace))
+            os.remove(path)
+
+        await asyncio.to_thread(_remove)
+
+    async def _delete_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> None:
+        def _remove_all() -> None:
+            for blob in blobs:
+                path = self._find_path(blob, namespace)
+                if path is not None:
+                    _remove_file(path)
+
+        await asyncio.to_thread(_remove_all)
+
+    async def _list_blobs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[tuple[Blob, None | float]]:
+        def _list_dir(path: str) -> tuple[list[str], list[tuple[Blob, float]]]:
+            subdirs = []
+            blobs = []
+            try:
+                entries = list(os.scandir(path))
+            except FileNotFoundError:
+                return [], []
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.path)
+                    elif not entry.name.endswith(".tmp"):
+                        blob_id, _, file_extension = entry.name.partition(".")
+                        blob = Blob(id=blob_id, file_extension=file_extension or None)
+                        blobs.append((blob, entry.stat().st_mtime))
+                except FileNotFoundError:
+                    continue
+            return subdirs, blobs
+
+        # list one directory at a time, so huge namespaces aren't held in memory
+        dirs = [os.path.join(self.temp_dir, "blobs", namespace)]
+        while dirs:
+            subdirs, blobs = await asyncio.to_thread(_list_dir, dirs.pop())
+            dirs += subdirs
+            for entry in blobs:
+                yield entry
 
 
 class S3BlobRepo(BlobRepo):
+    """
+    Stores blobs in an S3 bucket, under `<namespace>/<id>[.ext]`.
+    Operations share one pooled client, opened on first use and closed by `close`.
+
+    With `ttl` set, objects are tagged with the time they were last used (`aijson-last-access`),
+    which is cheap to update in place, and `sweep` deletes objects unused for longer than `ttl`.
+    """
+
     # if aioboto3 isn't stable just implement the lower level aiobotocore library
 
     def __init__(
@@ -419,8 +2362,23 @@ class S3BlobRepo(BlobRepo):
         endpoint_url: Optional[str] = None,
         aws_access_key_id: Optional[str] = None,
         aws_secret_access_key: Optional[str] = None,
+        exists_concurrency: int = 32,
+        max_pool_connections: int = 50,
+        multipart_chunk_size: int = DEFAULT_CHUNK_SIZE,
+        transfer_concurrency: int = 4,
+        transfer_timeout: float = 60,
+        sweep_concurrency: int = 32,
+        **kwargs,
     ):
-        super().__init__(temp_dir)
+        super().__init__(temp_dir, **kwargs)
+        self.exists_concurrency = exists_concurrency
+        self.sweep_concurrency = sweep_concurrency
+        self.max_pool_connections = max_pool_connections
+        # files larger than this are uploaded and downloaded in parts of this size (S3 requires at least 5 MiB)
+        self.multipart_chunk_size = multipart_chunk_size
+        # parts in flight at once per transfer, and the timeout for each part
+        self.transfer_concurrency = transfer_concurrency
+        self.transfer_timeout = transfer_timeout
 
         if bucket_name is None:
             bucket_name = os.environ["BUCKET_NAME"]
@@ -443,6 +2401,17 @@ class S3BlobRepo(BlobRepo):
         self.aws_secret_access_key = aws_secret_access_key
 
         self.aioboto3_session: None | aioboto3.Session = None
+        # opened on first use and shared by all operations on that event loop until `close`
+        self._exit_stack: None | AsyncExitStack = None
+        self._s3_resource: None | types_aiobotocore_s3.S3ServiceResource = None
+        self._s3_pool_loop: None | asyncio.AbstractEventLoop = None
+        self._s3_pool_lock: None | asyncio.Lock = None
+        # S3 clients opened, seconds spent opening them, and operations served by the shared one
+        self.connection_metrics = {
+            "clients_opened": 0,
+            "setup_time": 0.0,
+            "reuses": 0,
+        }
 
     async def on_startup(self, log: structlog.stdlib.BoundLogger):
         async with self._get_s3_resource() as s3:
@@ -467,20 +2436,66 @@ class S3BlobRepo(BlobRepo):
         ):
             pass
 
+    async def _get_s3_pool(self) -> types_aiobotocore_s3.S3ServiceResource:
+        loop = asyncio.get_running_loop()
+        if self._s3_pool_loop is not loop:
+            # clients can't be used across event loops, so open a new pool for this one
+            self._abandon_s3_pool()
+            self._s3_pool_loop = loop
+            self._s3_pool_lock = asyncio.Lock()
+        if self._s3_resource is not None:
+            self.connection_metrics["reuses"] += 1
+            return self._s3_resource
+        assert self._s3_pool_lock is not None
+        async with self._s3_pool_lock:
+            # concurrent first uses wait for one pool to open
+            if self._s3_resource is None:
+                exit_stack = AsyncExitStack()
+                self._s3_resource = await exit_stack.enter_async_context(
+                    self._open_s3_resource()
+                )
+                self._exit_stack = exit_stack
+                get_logger().debug(
+                    "Opened S3 connection pool",
+                    max_pool_connections=self.max_pool_connections,
+                    setup_time=self.connection_metrics["setup_time"],
+                )
+            else:
+                self.connection_metrics["reuses"] += 1
+            return self._s3_resource
+
     async def close(self):
-        pass
-        # there seems to be nothing to close here?
-        # if self.aioboto3_session is not None:
-        #     await self.aioboto3_session.close()
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._exit_stack = None
+        self._s3_resource = None
+
+    def _abandon_s3_pool(self) -> None:
+        """
+        Close the pool opened on another event loop, on that loop if it is still running.
+        """
+        exit_stack, pool_loop = self._exit_stack, self._s3_pool_loop
+        self._exit_stack = None
+        self._s3_resource = None
+        if exit_stack is None:
+            return
+        if pool_loop is not None and pool_loop.is_running():
+            asyncio.run_coroutine_threadsafe(exit_stack.aclose(), pool_loop)
+            return
+        # its sessions can only be closed on the loop they were opened on
+        get_logger().warning(
+            "Abandoned S3 connection pool of a stopped event loop; call `close` before it stops"
+        )
 
     def _wrap_tenacity(
         self,
         log: structlog.stdlib.BoundLogger,
         exception: type[BaseException] | tuple[type[BaseException], ...],
         func: Callable,
+        timeout: float = 5,
     ):
         async def _timeout(*args, **kwargs):
-            return await asyncio.wait_for(func(*args, **kwargs), timeout=5)
+            return await asyncio.wait_for(func(*args, **kwargs), timeout=timeout)
 
         if isinstance(exception, tuple):
             exc_tuple = exception
@@ -500,25 +2515,36 @@ class S3BlobRepo(BlobRepo):
             ),
         )(_timeout)
 
-    def _get_s3_resource(self) -> types_aiobotocore_s3.S3ServiceResource:
+    @asynccontextmanager
+    async def _open_s3_resource(
+        self,
+    ) -> AsyncIterator[types_aiobotocore_s3.S3ServiceResource]:
         if self.aioboto3_session is None:
             self.aioboto3_session = aioboto3.Session()
-        return self.aioboto3_session.resource(
+        timer = Timer()
+        timer.start()
+        async with self.aioboto3_session.resource(
             "s3",
             endpoint_url=self.endpoint_url,
             aws_access_key_id=self.aws_access_key_id,
             aws_secret_access_key=self.aws_secret_access_key,
-        )
+            config=Config(max_pool_connections=self.max_pool_connections),
+        ) as s3:
+            timer.end()
+            self.connection_metrics["clients_opened"] += 1
+            self.connection_metrics["setup_time"] += timer.wall_time
+            yield s3
+
+    @asynccontextmanager
+    async def _get_s3_resource(
+        self,
+    ) -> AsyncIterator[types_aiobotocore_s3.S3ServiceResource]:
+        yield await self._get_s3_pool()
 
-    def _get_s3_client(self) -> types_aiobotocore_s3.S3Client:
-        if self.aioboto3_session is None:
-            self.aioboto3_session = aioboto3.Session()
-        return self.aioboto3_session.client(
-            "s3",
-            endpoint_url=self.endpoint_url,
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-        )
+    @asynccontextmanager
+    async def _get_s3_client(self) -> AsyncIterator[types_aiobotocore_s3.S3Client]:
+        async with self._get_s3_resource() as s3:
+            yield s3.meta.client
 
     def _get_object_key(self, blob: Blob, namespace: str):
         object_key = f"{namespace}/{blob.id}"
@@ -526,6 +2552,24 @@ class S3BlobRepo(BlobRepo):
             object_key += f".{blob.file_extension}"
         return object_key
 
+    def _get_tagging_kwargs(self) -> dict[str, str]:
+        if self.ttl is None:
+            return {}
+        return {"Tagging": f"{_S3_LAST_ACCESS_TAG}={int(time.time())}"}
+
+    @staticmethod
+    def _get_last_access_tagging() -> dict:
+        return {
+            "TagSet": [{"Key": _S3_LAST_ACCESS_TAG, "Value": str(int(time.time()))}]
+        }
+
+    @staticmethod
+    def _get_last_access(tag_set: list[dict]) -> None | float:
+        for tag in tag_set:
+            if tag["Key"] == _S3_LAST_ACCESS_TAG:
+                return float(tag["Value"])
+        return None
+
     async def _save(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -554,27 +2598,220 @@ class S3BlobRepo(BlobRepo):
         await bucket.put_object(
             Key=object_key,
             Body=value,
+            **self._get_tagging_kwargs(),
         )
 
         return blob
 
+    async def _save_file(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        path: str,
+        namespace: str,
+    ) -> Blob:
+        object_key = self._get_object_key(blob, namespace)
+        size = os.path.getsize(path)
+        async with self._get_s3_client() as s3_client:
+            if size <= self.multipart_chunk_size:
+                value = await asyncio.to_thread(_read_range, path, 0, size)
+                await self._wrap_tenacity(
+                    log,
+                    s3_client.exceptions.ClientError,
+                    s3_client.put_object,
+                    timeout=self.transfer_timeout,
+                )(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    Body=value,
+                    **self._get_tagging_kwargs(),
+                )
+            else:
+                await self.__upload_multipart(log, s3_client, object_key, path, size)
+        return blob
+
+    async def __upload_multipart(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        s3_client: types_aiobotocore_s3.S3Client,
+        object_key: str,
+        path: str,
+        size: int,
+    ) -> None:
+        upload = await self._wrap_tenacity(
+            log,
+            s3_client.exceptions.ClientError,
+            s3_client.create_multipart_upload,
+        )(Bucket=self.bucket_name, Key=object_key, **self._get_tagging_kwargs())
+        upload_id = upload["UploadId"]
+        upload_part = self._wrap_tenacity(
+            log,
+            s3_client.exceptions.ClientError,
+            s3_client.upload_part,
+            timeout=self.transfer_timeout,
+        )
+        semaphore = asyncio.Semaphore(self.transfer_concurrency)
+
+        async def _upload_part(part_number: int, offset: int) -> dict:
+            # read each part only once it's its turn, so at most `transfer_concurrency` parts are in memory
+            async with semaphore:
+                data = await asyncio.to_thread(
+                    _read_range, path, offset, self.multipart_chunk_size
+                )
+                response = await upload_part(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    PartNumber=part_number,
+                    UploadId=upload_id,
+                    Body=data,
+                )
+                return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+        try:
+            parts = await asyncio.gather(
+                *[
+                    _upload_part(part_number, offset)
+                    for part_number, offset in enumerate(
+                        range(0, size, self.multipart_chunk_size), start=1
+                    )
+                ]
+            )
+            await self._wrap_tenacity(
+                log,
+                s3_client.exceptions.ClientError,
+                s3_client.complete_multipart_upload,
+            )(
+                Bucket=self.bucket_name,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": list(parts)},
+            )
+        except BaseException:
+            try:
+                await s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=object_key, UploadId=upload_id
+                )
+            except Exception as e:
+                log.warning(
+                    "Failed to abort multipart upload",
+                    object_key=object_key,
+                    exc_info=e,
+                )
+            raise
+        log.debug(
+            "Uploaded blob in parts",
+            object_key=object_key,
+            parts=len(parts),
+        )
+
     async def _extend_ttl(
         self,
         log: structlog.stdlib.BoundLogger,
         blob: Blob,
         namespace: str,
     ) -> None:
-        # TODO figure out how to check TTL first, else this causes a massive slowdown
-        pass
-        # object_key = self._get_object_key(blob, namespace)
-        #
-        # async with self._get_s3_resource() as s3:
-        #     obj = await s3.Object(self.bucket_name, object_key)
-        #     await obj.load()
-        #     await obj.copy_from(
-        #         CopySource=f"{self.bucket_name}/{object_key}",
-        #         MetadataDirective="REPLACE",
-        #     )
+        if self.ttl is None:
+            return
+        # retagging updates the object's metadata in place, without copying its contents
+        async with self._get_s3_client() as s3_client:
+            await self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, s3_client.put_object_tagging
+            )(
+                Bucket=self.bucket_name,
+                Key=self._get_object_key(blob, namespace),
+                Tagging=self._get_last_access_tagging(),
+            )
+
+    async def _touch_many(
+        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        # LastModified can only be updated by copying the object, so record the use in its tag
+        semaphore = asyncio.Semaphore(self.exists_concurrency)
+
+        async with self._get_s3_client() as s3_client:
+            put_tagging = self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, self.__put_last_access
+            )
+
+            async def _touch(blob: Blob) -> bool:
+                async with semaphore:
+                    return await put_tagging(s3_client, blob, namespace)
+
+            return list(await asyncio.gather(*[_touch(blob) for blob in blobs]))
+
+    async def __put_last_access(
+        self, s3_client: types_aiobotocore_s3.S3Client, blob: Blob, namespace: str
+    ) -> bool:
+        try:
+            await s3_client.put_object_tagging(
+                Bucket=self.bucket_name,
+                Key=self._get_object_key(blob, namespace),
+                Tagging=self._get_last_access_tagging(),
+            )
+            return True
+        except s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return False
+            raise
+
+    async def sweep(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: None | str = None,
+    ) -> int:
+        """
+        Delete objects (in `namespace`, if given) last used longer than `ttl` ago,
+        returning how many were deleted.
+        """
+        ttl_seconds = self._get_ttl_seconds()
+        if ttl_seconds is None:
+            return 0
+        expires_before = time.time() - ttl_seconds
+        semaphore = asyncio.Semaphore(self.sweep_concurrency)
+
+        timer = Timer()
+        timer.start()
+        async with self._get_s3_client() as s3_client:
+            get_tagging = self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, s3_client.get_object_tagging
+            )
+            delete_object = self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, s3_client.delete_object
+            )
+
+            async def _sweep_object(object_key: str) -> bool:
+                async with semaphore:
+                    response = await get_tagging(
+                        Bucket=self.bucket_name, Key=object_key
+                    )
+                    last_access = self._get_last_access(response["TagSet"])
+                    if last_access is not None and last_access >= expires_before:
+                        return False
+                    await delete_object(Bucket=self.bucket_name, Key=object_key)
+                    return True
+
+            paginator = s3_client.get_paginator("list_objects_v2")
+            list_kwargs = {"Bucket": self.bucket_name}
+            if namespace is not None:
+                list_kwargs["Prefix"] = f"{namespace}/"
+            tasks = []
+            async for page in paginator.paginate(**list_kwargs):
+                for obj in page.get("Contents", []):
+                    # only objects that weren't modified since can have expired
+                    if obj["LastModified"].timestamp() < expires_before:
+                        tasks.append(_sweep_object(obj["Key"]))
+            deleted = sum(await asyncio.gather(*tasks))
+        timer.end()
+        if deleted:
+            # deleted blobs may be remembered as existing
+            self._known_blobs.clear()
+        log.info(
+            "Swept expired blobs",
+            namespace=namespace,
+            deleted=deleted,
+            duration=timer.wall_time,
+        )
+        return deleted
 
     async def _retrieve(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
@@ -597,11 +2834,92 @@ class S3BlobRepo(BlobRepo):
         except s3.meta.client.exceptions.NoSuchKey:
             return None
 
+    async def _retrieve_stream(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        namespace: str,
+        chunk_size: int,
+    ) -> AsyncIterator[bytes]:
+        object_key = self._get_object_key(blob, namespace)
+        async with self._get_s3_client() as s3_client:
+            response = await self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, self.__get_object
+            )(s3_client, object_key)
+            if response is None:
+                raise ValueError(f"Blob {blob} does not exist")
+            body = response["Body"]
+            async with body:
+                async for chunk in body.iter_chunks(chunk_size):
+                    yield chunk
+
+    async def __get_object(
+        self,
+        s3_client: types_aiobotocore_s3.S3Client,
+        object_key: str,
+        range_: None | str = None,
+    ) -> None | dict:
+        kwargs = {}
+        if range_ is not None:
+            kwargs["Range"] = range_
+        try:
+            return await s3_client.get_object(  # type: ignore
+                Bucket=self.bucket_name, Key=object_key, **kwargs
+            )
+        except s3_client.exceptions.NoSuchKey:
+            return None
+
+    async def _retrieve_range(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blob: Blob,
+        start: int,
+        end: None | int,
+        namespace: str,
+    ) -> Optional[Value]:
+        if end is not None and end == start:
+            return b"" if await self.exists(log, blob, namespace) else None
+        object_key = self._get_object_key(blob, namespace)
+        async with self._get_s3_client() as s3_client:
+            return await self._wrap_tenacity(
+                log,
+                s3_client.exceptions.ClientError,
+                self.__get_range,
+                timeout=self.transfer_timeout,
+            )(s3_client, object_key, start, end)
+
+    async def __get_range(
+        self,
+        s3_client: types_aiobotocore_s3.S3Client,
+        object_key: str,
+        start: int,
+        end: None | int,
+    ) -> Optional[Value]:
+        # HTTP ranges are inclusive
+        range_ = f"bytes={start}-" if end is None else f"bytes={start}-{end - 1}"
+        try:
+            response = await self.__get_object(s3_client, object_key, range_)
+        except s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == "InvalidRange":
+                # the range starts past the end of the object
+                return b""
+            raise
+        if response is None:
+            return None
+        body = response["Body"]
+        async with body:
+            return await body.read()
+
     async def _multi_retrieve(
-        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+        concurrency: int,
     ) -> list[Optional[Value]]:
-        # Note: aioboto3 does not have native support for multi-object retrieval either
-        return [await self.retrieve(log, blob, namespace) for blob in blobs]
+        # Note: aioboto3 does not have native support for multi-object retrieval either,
+        #  so issue the GETs concurrently over the shared connection pool
+        return await self._gather_retrieve(log, blobs, namespace, concurrency)
 
     async def _exists(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
@@ -611,6 +2929,22 @@ class S3BlobRepo(BlobRepo):
                 log, s3_client.exceptions.ClientError, self.__exists
             )(s3_client, blob, namespace)
 
+    async def _exists_many(
+        self, log: structlog.stdlib.BoundLogger, blobs: list[Blob], namespace: str
+    ) -> list[bool]:
+        semaphore = asyncio.Semaphore(self.exists_concurrency)
+
+        async with self._get_s3_client() as s3_client:
+            tenacious_exists = self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, self.__exists
+            )
+
+            async def _exists(blob: Blob) -> bool:
+                async with semaphore:
+                    return await tenacious_exists(s3_client, blob, namespace)
+
+            return list(await asyncio.gather(*[_exists(blob) for blob in blobs]))
+
     async def __exists(
         self, s3_client: types_aiobotocore_s3.S3Client, blob: Blob, namespace: str
     ) -> bool:
@@ -628,19 +2962,91 @@ class S3BlobRepo(BlobRepo):
     async def _download(
         self, log: structlog.stdlib.BoundLogger, blob: Blob, namespace: str
     ) -> str:
-        value = await self.retrieve(log, blob, namespace)
-        if value is None:
-            raise ValueError(f"Blob {blob} does not exist")
-
+        object_key = self._get_object_key(blob, namespace)
         dir_ = os.path.join(self.temp_dir, "blobs", namespace)
         os.makedirs(dir_, exist_ok=True)
         local_path = os.path.join(dir_, blob.id)
         if blob.file_extension:
             local_path += f".{blob.file_extension}"
-        with open(local_path, "wb") as file:
-            file.write(value)
+
+        async with self._get_s3_client() as s3_client:
+            size = await self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, self.__get_size
+            )(s3_client, object_key)
+            if size is None:
+                raise ValueError(f"Blob {blob} does not exist")
+
+            # write to a temporary file, so a failed download leaves nothing behind
+            fd, partial_path = tempfile.mkstemp(dir=dir_)
+            os.close(fd)
+            try:
+                if size <= self.multipart_chunk_size:
+                    await _write_chunks(
+                        partial_path,
+                        self._retrieve_stream(log, blob, namespace, DEFAULT_CHUNK_SIZE),
+                    )
+                else:
+                    await self.__download_ranges(
+                        log, s3_client, object_key, partial_path, size
+                    )
+                os.replace(partial_path, local_path)
+            except BaseException:
+                os.remove(partial_path)
+                raise
         return local_path
 
+    async def __get_size(
+        self,
+        s3_client: types_aiobotocore_s3.S3Client,
+        object_key: str,
+    ) -> None | int:
+        try:
+            response = await s3_client.head_object(
+                Bucket=self.bucket_name, Key=object_key
+            )
+        except s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == "404":
+                return None
+            raise
+        return response["ContentLength"]
+
+    async def __download_ranges(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        s3_client: types_aiobotocore_s3.S3Client,
+        object_key: str,
+        path: str,
+        size: int,
+    ) -> None:
+        get_range = self._wrap_tenacity(
+            log,
+            s3_client.exceptions.ClientError,
+            self.__get_range,
+            timeout=self.transfer_timeout,
+        )
+        semaphore = asyncio.Semaphore(self.transfer_concurrency)
+
+        async def _download_range(offset: int) -> None:
+            async with semaphore:
+                end = min(offset + self.multipart_chunk_size, size)
+                data = await get_range(s3_client, object_key, offset, end)
+                if data is None or len(data) != end - offset:
+                    raise ValueError(f"Object {object_key} changed during download")
+                await asyncio.to_thread(_write_at, path, offset, data)
+
+        await asyncio.to_thread(os.truncate, path, size)
+        await asyncio.gather(
+            *[
+                _download_range(offset)
+                for offset in range(0, size, self.multipart_chunk_size)
+            ]
+        )
+        log.debug(
+            "Downloaded blob in parts",
+            object_key=object_key,
+            size=size,
+        )
+
     async def _delete(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -662,3 +3068,69 @@ class S3BlobRepo(BlobRepo):
 
         obj = await s3.Object(self.bucket_name, object_key)
         await obj.delete()
+
+    async def _delete_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> None:
+        object_keys = [self._get_object_key(blob, namespace) for blob in blobs]
+        async with self._get_s3_client() as s3_client:
+            delete_objects = self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, s3_client.delete_objects
+            )
+            # S3 deletes at most 1000 objects per request
+            for i in range(0, len(object_keys), 1000):
+                response = await delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={
+                        "Objects": [{"Key": key} for key in object_keys[i : i + 1000]],
+                        "Quiet": True,
+                    },
+                )
+                errors = response.get("Errors")
+                if errors:
+                    raise ValueError(f"Failed to delete blobs: {errors}")
+
+    async def _list_blobs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[tuple[Blob, None | float]]:
+        prefix = f"{namespace}/"
+        semaphore = asyncio.Semaphore(self.sweep_concurrency)
+        async with self._get_s3_client() as s3_client:
+            get_tagging = self._wrap_tenacity(
+                log, s3_client.exceptions.ClientError, s3_client.get_object_tagging
+            )
+
+            async def _get_last_used(obj: dict) -> None | float:
+                # uses since the object was written are recorded in its tag
+                async with semaphore:
+                    try:
+                        response = await get_tagging(
+                            Bucket=self.bucket_name, Key=obj["Key"]
+                        )
+                    except s3_client.exceptions.NoSuchKey:
+                        return None
+                last_modified = obj["LastModified"].timestamp()
+                last_access = self._get_last_access(response["TagSet"])
+                if last_access is None:
+                    return last_modified
+                return max(last_modified, last_access)
+
+            paginator = s3_client.get_paginator("list_objects_v2")
+            async for page in paginator.paginate(
+                Bucket=self.bucket_name, Prefix=prefix
+            ):
+                objects = page.get("Contents", [])
+                last_used = await asyncio.gather(
+                    *[_get_last_used(obj) for obj in objects]
+                )
+                for obj, obj_last_used in zip(objects, last_used):
+                    blob_id, _, file_extension = obj["Key"][len(prefix) :].partition(
+                        "."
+                    )
+                    blob = Blob(id=blob_id, file_extension=file_extension or None)
+                    yield blob, obj_last_used
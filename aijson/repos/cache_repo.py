@@ -1,46 +1,351 @@
 import asyncio
+import copy
+import hashlib
+import itertools
 import logging
 import os
+import re
 import shelve
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
 from datetime import timedelta
-from typing import Any
+from typing import Any, AsyncIterator, Callable, Iterator, Literal, TypeVar
 
 import structlog
 import tenacity
 
-from aijson.utils.cache_utils import _get_latest_modified_timestamp
-from aijson.utils.redis_utils import get_aioredis
+from aijson.utils.cache_utils import (
+    _get_latest_modified_timestamp,
+    BloomFilter,
+    SnapshotWriter,
+    ByteBudgetCache,
+    CompressionCodec,
+    EvictionPolicy,
+    compress_value,
+    decompress_value,
+    get_expire_seconds,
+    get_object_size,
+    MIN_SIMILARITY_THRESHOLD,
+    get_simhash,
+    get_simhash_similarity,
+    get_value_size,
+    iter_snapshot_records,
+)
+from aijson.log_config import get_logger
+from aijson.utils.misc_utils import lock_file, try_lock_file, unlock_file
+from aijson.utils.redis_utils import RedisWriteBuffer, get_aioredis
+
+T = TypeVar("T")
+
+# an explicit version number, a fingerprint of the code producing the value,
+# or `None` to tie the value to the latest modification in the working directory
+CacheVersion = None | int | str
 
 
 class CacheRepo:
-    def __init__(self, temp_dir: str):
+    """
+    Stores values under (namespace, key, version).
+
+    With `compression` set, `str` and `bytes` values of at least `compression_threshold` bytes
+    are compressed before being handed to the backend.
+    Compressed values are marked, so they are read back correctly regardless of the current settings.
+
+    Values stored with `store_approximate` can also be found by similar keys,
+    through a SimHash index of at most `approximate_index_size` keys per namespace and version,
+    stored as one entry per key (expiring with its value) and reloaded every `approximate_index_refresh` seconds.
+
+    With `key_filter` set, a Bloom filter of the keys in each namespace is kept in-process,
+    and lookups of keys it doesn't contain skip the backend.
+    The filter is populated on store and rebuilt from the backend in the background
+    every `key_filter_sync_interval` seconds, so keys stored by other processes in the meantime
+    may be missed until then. Until a namespace's first rebuild finishes, every lookup goes to the backend.
+    Backends that can't list their keys ignore `key_filter`, with a warning.
+    """
+
+    def __init__(
+        self,
+        temp_dir: str,
+        compression: CompressionCodec | None = None,
+        compression_threshold: int = 1024,
+        approximate_index_size: int = 10_000,
+        approximate_index_refresh: float = 60,
+        key_filter: bool = False,
+        key_filter_capacity: int = 1_000_000,
+        key_filter_error_rate: float = 0.01,
+        key_filter_sync_interval: float = 300,
+    ):
         self.temp_dir = temp_dir
         self.default_namespace = "global"
+        self.compression: CompressionCodec | None = compression
+        self.compression_threshold = compression_threshold
+        self.approximate_index_size = approximate_index_size
+        self.approximate_index_refresh = approximate_index_refresh
+        # (namespace, version modifier) -> (key digest -> simhash, monotonic load time)
+        self._approximate_indexes: dict[
+            tuple[str, str], tuple[dict[str, int], float]
+        ] = {}
+        if key_filter and type(self)._iter_keys is CacheRepo._iter_keys:
+            get_logger().warning(
+                "Cache key filter not supported by backend, ignoring `key_filter`",
+                cache_repo=type(self).__name__,
+            )
+            key_filter = False
+        self.key_filter = key_filter
+        self.key_filter_capacity = key_filter_capacity
+        self.key_filter_error_rate = key_filter_error_rate
+        self.key_filter_sync_interval = key_filter_sync_interval
+        # namespace -> (filter, monotonic sync time)
+        self._key_filters: dict[str, tuple[BloomFilter, float]] = {}
+        # namespace -> keys stored while its filter is being rebuilt
+        self._key_filter_syncs: dict[str, set[str]] = {}
+        # namespace -> background rebuild of its filter
+        self._key_filter_tasks: dict[str, asyncio.Task] = {}
 
     async def close(self):
-        pass
+        for task in self._key_filter_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._key_filter_tasks.values(), return_exceptions=True)
+        self._key_filter_tasks = {}
 
-    def _prepare_key(self, key: Any, version: None | int) -> str:
-        str_key = str(key)
+    def _list_namespaces(self) -> list[str]:
+        raise NotImplementedError()
+
+    def _iter_keys(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[str]:
+        """
+        Iterate over the (prepared) keys stored in a namespace.
+        """
+        raise NotImplementedError()
+
+    async def iter_values(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespaces: None | list[str] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[tuple[str, str, Any]]:
+        """
+        Iterate over the (namespace, prepared key, value) of all values in `namespaces`
+        (defaults to all, if the backend can list them), reading them in batches of `batch_size`.
+        """
+        if namespaces is None:
+            namespaces = self._list_namespaces()
+        for namespace in namespaces:
+            batch = []
+            async for key in self._iter_keys(log, namespace):
+                batch.append((namespace, key))
+                if len(batch) >= batch_size:
+                    for entry in await self._read_batch(log, batch):
+                        yield entry
+                    batch = []
+            for entry in await self._read_batch(log, batch):
+                yield entry
+
+    async def _read_batch(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        keys: list[tuple[str, str]],
+    ) -> list[tuple[str, str, Any]]:
+        if not keys:
+            return []
+        return [
+            (namespace, key, self._decode_value(value))
+            for (namespace, key), value in zip(
+                keys, await self._retrieve_many(log, keys)
+            )
+            if value is not None
+        ]
+
+    async def export_snapshot(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        path: str,
+        namespaces: None | list[str] = None,
+        versions: None | list[CacheVersion] = None,
+        batch_size: int = 500,
+    ) -> int:
+        """
+        Write the values in `namespaces` (defaults to all, if the backend can list them)
+        to a compressed snapshot file, optionally only those stored under `versions`.
+        Returns the number of values written. Expiry times are not kept.
+        """
+        if namespaces is None:
+            namespaces = self._list_namespaces()
+        version_suffixes = (
+            None
+            if versions is None
+            else tuple(f":{self._get_version_modifier(v)}" for v in versions)
+        )
+
+        count = 0
+        with open(path, "wb") as f:
+            writer = SnapshotWriter(f)
+            for namespace in namespaces:
+                batch = []
+                async for key in self._iter_keys(log, namespace):
+                    if version_suffixes is None or key.endswith(version_suffixes):
+                        batch.append((namespace, key))
+                    if len(batch) >= batch_size:
+                        count += await self._export_batch(log, writer, batch)
+                        batch = []
+                if batch:
+                    count += await self._export_batch(log, writer, batch)
+            writer.close()
+        log.info("Exported cache snapshot", path=path, values=count)
+        return count
+
+    async def _export_batch(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        writer: SnapshotWriter,
+        keys: list[tuple[str, str]],
+    ) -> int:
+        # values are exported as stored, compressed or not
+        records = [
+            (namespace, key, value)
+            for (namespace, key), value in zip(
+                keys, await self._retrieve_many(log, keys)
+            )
+            if isinstance(value, (str, bytes))
+        ]
+
+        def _write() -> None:
+            for namespace, key, value in records:
+                writer.write(namespace, key, value)
+
+        # compressing and writing large batches would block the event loop
+        await asyncio.to_thread(_write)
+        return len(records)
+
+    async def import_snapshot(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        path: str,
+        namespaces: None | list[str] = None,
+        expire: int | timedelta | None = None,
+        batch_size: int = 500,
+    ) -> int:
+        """
+        Store the values in a snapshot file written by `export_snapshot`,
+        optionally only those in `namespaces`, in batches of `batch_size`.
+        Returns the number of values stored.
+        """
+        count = 0
+        with open(path, "rb") as f:
+            records = iter_snapshot_records(f)
+
+            def _read_batch() -> list[tuple[str, str, str | bytes]]:
+                return list(itertools.islice(records, batch_size))
+
+            # reading and decompressing happen off the event loop
+            while batch := await asyncio.to_thread(_read_batch):
+                if namespaces is not None:
+                    batch = [record for record in batch if record[0] in namespaces]
+                if not batch:
+                    continue
+                await self._store_many(log, batch, expire)
+                for namespace, key, _ in batch:
+                    self._add_to_key_filter(key, namespace)
+                count += len(batch)
+        log.info("Imported cache snapshot", path=path, values=count)
+        return count
+
+    async def _sync_key_filter(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> None:
+        key_filter = BloomFilter(
+            capacity=self.key_filter_capacity,
+            error_rate=self.key_filter_error_rate,
+        )
+        try:
+            count = 0
+            async for key in self._iter_keys(log, namespace):
+                key_filter.add(key)
+                count += 1
+        except Exception as e:
+            log.warning(
+                "Cache key filter sync error",
+                exc_info=e,
+            )
+            return
+        finally:
+            stored_keys = self._key_filter_syncs.pop(namespace)
+            del self._key_filter_tasks[namespace]
+        for key in stored_keys:
+            key_filter.add(key)
+        self._key_filters[namespace] = (key_filter, time.monotonic())
+        log.debug("Synced cache key filter", namespace=namespace, keys=count)
+
+    async def _might_contain(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        namespace: str,
+    ) -> bool:
+        if not self.key_filter:
+            return True
+        entry = self._key_filters.get(namespace)
+        if (
+            entry is None
+            or time.monotonic() - entry[1] >= self.key_filter_sync_interval
+        ) and namespace not in self._key_filter_tasks:
+            # collect the keys stored from now on, as the rebuild may not see them
+            self._key_filter_syncs[namespace] = set()
+            self._key_filter_tasks[namespace] = asyncio.create_task(
+                self._sync_key_filter(log, namespace)
+            )
+        if entry is None:
+            # the first sync hasn't finished, so the key may be anywhere
+            return True
+        return key in entry[0]
+
+    def _add_to_key_filter(self, key: str, namespace: str) -> None:
+        if not self.key_filter:
+            return
+        if namespace in self._key_filter_syncs:
+            self._key_filter_syncs[namespace].add(key)
+        entry = self._key_filters.get(namespace)
+        if entry is not None:
+            entry[0].add(key)
+
+    @staticmethod
+    def _get_version_modifier(version: CacheVersion) -> str:
         if version is None:
-            version_modifier = f"t{_get_latest_modified_timestamp()}"
-        else:
-            version_modifier = f"v{version}"
-        return f"{str_key}:{version_modifier}"
+            return f"t{_get_latest_modified_timestamp()}"
+        elif isinstance(version, str):
+            return f"s{version}"
+        return f"v{version}"
+
+    def _prepare_key(self, key: Any, version: CacheVersion) -> str:
+        return f"{key}:{self._get_version_modifier(version)}"
+
+    def _encode_value(self, value: Any) -> Any:
+        if self.compression is None:
+            return value
+        return compress_value(value, self.compression, self.compression_threshold)
+
+    def _decode_value(self, value: Any) -> Any:
+        return decompress_value(value)
 
     async def store(
         self,
         log: structlog.stdlib.BoundLogger,
         key: Any,
         value: Any,
-        version: None | int,
+        version: CacheVersion,
         namespace: None | str = None,
         expire: int | timedelta | None = None,
     ) -> None:
         str_key = self._prepare_key(key, version)
         if namespace is None:
             namespace = self.default_namespace
-        await self._store(log, str_key, value, namespace, expire)
+        await self._store(log, str_key, self._encode_value(value), namespace, expire)
+        self._add_to_key_filter(str_key, namespace)
 
     async def _store(
         self,
@@ -52,17 +357,56 @@ class CacheRepo:
     ) -> None:
         raise NotImplementedError()
 
+    async def _store_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        items: list[tuple[str, str, Any]],
+        expire: int | timedelta | None,
+    ) -> None:
+        """
+        Store several (namespace, prepared key, value) items at once.
+        Backends that support it write all of them in a single round trip.
+        """
+        for namespace, key, value in items:
+            await self._store(log, key, value, namespace, expire)
+
+    async def flush_key(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        namespace: None | str = None,
+    ) -> None:
+        """
+        Wait until a value stored under `key` is written to the backend,
+        so other processes can read it. Only does anything for repos that buffer writes.
+        """
+        str_key = self._prepare_key(key, version)
+        if namespace is None:
+            namespace = self.default_namespace
+        await self._flush_key(log, str_key, namespace)
+
+    async def _flush_key(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        namespace: str,
+    ) -> None:
+        pass
+
     async def retrieve(
         self,
         log: structlog.stdlib.BoundLogger,
         key: Any,
-        version: None | int,
+        version: CacheVersion,
         namespace: None | str = None,
     ) -> Any | None:
         str_key = self._prepare_key(key, version)
         if namespace is None:
             namespace = self.default_namespace
-        return await self._retrieve(log, str_key, namespace)
+        if not await self._might_contain(log, str_key, namespace):
+            return None
+        return self._decode_value(await self._retrieve(log, str_key, namespace))
 
     async def _retrieve(
         self,
@@ -72,8 +416,273 @@ class CacheRepo:
     ) -> Any | None:
         raise NotImplementedError()
 
+    async def retrieve_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        keys: list[tuple[Any, CacheVersion, None | str]],
+    ) -> list[Any | None]:
+        """
+        Retrieve several values at once, each specified as a `(key, version, namespace)` tuple.
+        Backends that support it fetch all of them in a single round trip.
+        """
+        prepared_keys = [
+            (
+                namespace if namespace is not None else self.default_namespace,
+                self._prepare_key(key, version),
+            )
+            for key, version, namespace in keys
+        ]
+        present_keys = [
+            (namespace, str_key)
+            for namespace, str_key in prepared_keys
+            if await self._might_contain(log, str_key, namespace)
+        ]
+        if not present_keys:
+            return [None for _ in prepared_keys]
+        values = dict(zip(present_keys, await self._retrieve_many(log, present_keys)))
+        return [
+            self._decode_value(values.get(namespace_key))
+            for namespace_key in prepared_keys
+        ]
+
+    async def _retrieve_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        keys: list[tuple[str, str]],
+    ) -> list[Any | None]:
+        return [await self._retrieve(log, key, namespace) for namespace, key in keys]
+
+    async def delete(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        namespace: None | str = None,
+    ) -> None:
+        str_key = self._prepare_key(key, version)
+        if namespace is None:
+            namespace = self.default_namespace
+        await self._delete(log, str_key, namespace)
+
+    async def _delete(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        namespace: str,
+    ) -> None:
+        raise NotImplementedError()
+
+    async def retrieve_parsed(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        parse: Callable[[Any], T],
+        namespace: None | str = None,
+    ) -> T | None:
+        """
+        Retrieve a value and run it through `parse` (e.g., `model_validate_json`).
+        Repos that keep parsed values around may skip parsing on repeated hits.
+        """
+        value = await self.retrieve(log, key, version, namespace=namespace)
+        if value is None:
+            return None
+        return parse(value)
+
+    @staticmethod
+    def _get_approximate_namespace(namespace: str) -> str:
+        return f"{namespace}__approximate"
+
+    @staticmethod
+    def _get_approximate_index_namespace(namespace: str) -> str:
+        return f"{namespace}__index"
+
+    async def _load_approximate_index(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+        version: CacheVersion,
+    ) -> dict[str, int]:
+        index_key = (namespace, self._get_version_modifier(version))
+        loaded = self._approximate_indexes.get(index_key)
+        if (
+            loaded is not None
+            and time.monotonic() - loaded[1] < self.approximate_index_refresh
+        ):
+            return loaded[0]
+
+        index_namespace = self._get_approximate_index_namespace(namespace)
+        suffix = f":{self._get_version_modifier(version)}"
+        index: dict[str, int] = {}
+        batch = []
+        try:
+            async for key in self._iter_keys(log, index_namespace):
+                if not key.endswith(suffix):
+                    continue
+                batch.append((index_namespace, key))
+                if len(batch) >= 500:
+                    index.update(await self._read_approximate_index_batch(log, batch))
+                    batch = []
+                if len(index) + len(batch) >= self.approximate_index_size:
+                    break
+            index.update(await self._read_approximate_index_batch(log, batch))
+        except NotImplementedError:
+            log.warning("Approximate cache index not supported by backend")
+        self._approximate_indexes[index_key] = (index, time.monotonic())
+        return index
+
+    async def _read_approximate_index_batch(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        keys: list[tuple[str, str]],
+    ) -> dict[str, int]:
+        return {
+            # strip the version from the prepared key, leaving the digest
+            key.rpartition(":")[0]: int(value)
+            for _, key, value in await self._read_batch(log, keys)
+        }
+
+    async def store_approximate(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        value: Any,
+        version: CacheVersion,
+        namespace: None | str = None,
+        expire: int | timedelta | None = None,
+    ) -> None:
+        """
+        Store a value so `retrieve_approximate` finds it by similar keys.
+        The value is kept in the `<namespace>__approximate` namespace,
+        and its key's SimHash in `<namespace>__approximate__index`, with the same expiry.
+        """
+        if namespace is None:
+            namespace = self.default_namespace
+        namespace = self._get_approximate_namespace(namespace)
+        str_key = str(key)
+        digest = hashlib.sha256(str_key.encode()).hexdigest()
+        simhash = get_simhash(str_key)
+        await self.store(
+            log, digest, value, version, namespace=namespace, expire=expire
+        )
+        await self.store(
+            log,
+            digest,
+            str(simhash),
+            version,
+            namespace=self._get_approximate_index_namespace(namespace),
+            expire=expire,
+        )
+
+        # entries stored by other workers show up on the next reload
+        loaded = self._approximate_indexes.get(
+            (namespace, self._get_version_modifier(version))
+        )
+        if loaded is not None and len(loaded[0]) < self.approximate_index_size:
+            loaded[0][digest] = simhash
+
+    async def retrieve_approximate(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        threshold: float,
+        namespace: None | str = None,
+        max_candidates: int = 3,
+    ) -> Any | None:
+        """
+        Retrieve the value stored with `store_approximate` under the most similar key,
+        if its SimHash similarity is at least `threshold`.
+        `threshold` must be between `MIN_SIMILARITY_THRESHOLD` (0.9, at most 6 of 64 bits differing) and 1.
+        """
+        if not MIN_SIMILARITY_THRESHOLD <= threshold <= 1:
+            raise ValueError(
+                f"Similarity threshold must be between {MIN_SIMILARITY_THRESHOLD} and 1, got {threshold}"
+            )
+        if namespace is None:
+            namespace = self.default_namespace
+        namespace = self._get_approximate_namespace(namespace)
+        index = await self._load_approximate_index(log, namespace, version)
+        if not index:
+            return None
+
+        simhash = get_simhash(str(key))
+        candidates = sorted(
+            (
+                (similarity, digest)
+                for digest, other_simhash in index.items()
+                if (similarity := get_simhash_similarity(simhash, other_simhash))
+                >= threshold
+            ),
+            reverse=True,
+        )
+        # the best candidates may have expired
+        for similarity, digest in candidates[:max_candidates]:
+            value = await self.retrieve(log, digest, version, namespace=namespace)
+            if value is not None:
+                log.debug("Approximate cache match", similarity=similarity)
+                return value
+        return None
+
+
+@dataclass
+class _ShelveRecord:
+    value: Any
+    expires_at: float
+
+
+# how often to retry a shelf lock held by another process or a compaction, in seconds
+_LOCK_POLL_INTERVAL = 0.01
+
 
 class ShelveCacheRepo(CacheRepo):
+    """
+    Stores each namespace in a `shelve` file in `temp_dir`.
+
+    Expiring values are dropped lazily when read,
+    and periodically by a background sweeper (every `sweep_interval` seconds).
+
+    With `max_bytes` set, the total size of stored keys and values is kept within budget,
+    evicting values according to `eviction` (`lru`, `lfu` or `tinylfu`).
+    Access metadata is kept in-process, and rebuilt from the shelves (in a thread) on first use.
+    As shelve files never shrink on their own, the sweeper also compacts namespaces
+    whose files are more than `compaction_ratio` times the size of their live values.
+
+    Each shelf is only opened while holding a per-namespace lock file,
+    so processes sharing `temp_dir` (and compactions running in threads) don't clobber each other.
+    """
+
+    def __init__(
+        self,
+        temp_dir: str,
+        sweep_interval: float | None = 300,
+        max_bytes: None | int = None,
+        eviction: EvictionPolicy = "lru",
+        compaction_ratio: float | None = 2,
+        **kwargs,
+    ):
+        super().__init__(temp_dir, **kwargs)
+        self.sweep_interval = sweep_interval
+        self._sweeper: asyncio.Task | None = None
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self.compaction_ratio = compaction_ratio
+        # sizes and access metadata of stored values, keyed by (namespace, key)
+        self._index: ByteBudgetCache[tuple[str, str], None] | None = None
+        self._index_lock = asyncio.Lock()
+        # disk usage of each namespace right after it was last compacted
+        self._compacted_sizes: dict[str, int] = {}
+
+    async def close(self):
+        await super().close()
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
     def _get_shelf_path(self, namespace: str) -> str:
         os.makedirs(self.temp_dir, exist_ok=True)
         path = os.path.join(self.temp_dir, f"{namespace}.db")
@@ -85,6 +694,271 @@ class ShelveCacheRepo(CacheRepo):
             writeback=True,
         )
 
+    def _open_lock_file(self, namespace: str) -> int:
+        lock_dir = os.path.join(self.temp_dir, ".locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        return os.open(
+            os.path.join(lock_dir, f"{namespace}.lock"), os.O_RDWR | os.O_CREAT, 0o600
+        )
+
+    @contextmanager
+    def _lock_namespace(self, namespace: str) -> Iterator[None]:
+        """
+        Hold the lock of a namespace, blocking until it is free (for use in threads).
+        """
+        fd = self._open_lock_file(namespace)
+        try:
+            lock_file(fd)
+            try:
+                yield
+            finally:
+                unlock_file(fd)
+        finally:
+            os.close(fd)
+
+    @asynccontextmanager
+    async def _lock_namespace_async(self, namespace: str) -> AsyncIterator[None]:
+        """
+        Hold the lock of a namespace, polling for it without blocking the event loop.
+        """
+        fd = self._open_lock_file(namespace)
+        try:
+            while not lock_file(fd, blocking=False):
+                await asyncio.sleep(_LOCK_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                unlock_file(fd)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def _open_shelf(self, namespace: str) -> Iterator[shelve.Shelf]:
+        with self._lock_namespace(namespace):
+            shelf = self._load_shelf(namespace)
+            try:
+                yield shelf
+            finally:
+                shelf.close()
+
+    @asynccontextmanager
+    async def _open_shelf_async(self, namespace: str) -> AsyncIterator[shelve.Shelf]:
+        async with self._lock_namespace_async(namespace):
+            shelf = self._load_shelf(namespace)
+            try:
+                yield shelf
+            finally:
+                shelf.close()
+
+    def _list_namespaces(self) -> list[str]:
+        if not os.path.isdir(self.temp_dir):
+            return []
+        # depending on the dbm implementation, shelves are stored as one or more files
+        # named like `<namespace>.db`, `<namespace>.db.dat`, etc.
+        namespaces = set()
+        for filename in os.listdir(self.temp_dir):
+            namespace, sep, _ = filename.rpartition(".db")
+            if sep and namespace:
+                namespaces.add(namespace)
+        return sorted(namespaces)
+
+    def _get_shelf_files(self, namespace: str) -> list[str]:
+        if not os.path.isdir(self.temp_dir):
+            return []
+        return [
+            os.path.join(self.temp_dir, filename)
+            for filename in os.listdir(self.temp_dir)
+            if filename.rpartition(".db")[0] == namespace
+        ]
+
+    def get_disk_usage(self, namespace: str) -> int:
+        return sum(os.path.getsize(path) for path in self._get_shelf_files(namespace))
+
+    @staticmethod
+    def _get_entry_size(key: str, value: Any) -> int:
+        if isinstance(value, _ShelveRecord):
+            value = value.value
+        return len(key) + get_value_size(value)
+
+    async def _get_index(
+        self, log: structlog.stdlib.BoundLogger
+    ) -> ByteBudgetCache[tuple[str, str], None] | None:
+        if self.max_bytes is None:
+            return None
+        async with self._index_lock:
+            if self._index is None:
+                # scanning every shelf is slow, keep it off the event loop
+                index, dropped_keys = await asyncio.to_thread(self._build_index)
+                await self._delete_keys(log, dropped_keys)
+                self._index = index
+        return self._index
+
+    def _build_index(
+        self,
+    ) -> tuple[ByteBudgetCache[tuple[str, str], None], list[tuple[str, str]]]:
+        assert self.max_bytes is not None
+        index: ByteBudgetCache[tuple[str, str], None] = ByteBudgetCache(
+            max_bytes=self.max_bytes, eviction=self.eviction
+        )
+        dropped_keys = []
+        for namespace in self._list_namespaces():
+            with self._open_shelf(namespace) as shelf:
+                for key, value in shelf.items():
+                    dropped_keys += self._track(
+                        index, namespace, key, self._get_entry_size(key, value)
+                    )
+        return index, dropped_keys
+
+    @staticmethod
+    def _track(
+        index: ByteBudgetCache[tuple[str, str], None],
+        namespace: str,
+        key: str,
+        size: int,
+    ) -> list[tuple[str, str]]:
+        """
+        Record a value in the index, returning the keys that no longer fit in the budget
+        (including this one, if it was not admitted).
+        """
+        dropped_keys = [
+            evicted_key for evicted_key, _ in index.set((namespace, key), None, size)
+        ]
+        if (namespace, key) not in index:
+            dropped_keys.append((namespace, key))
+        return dropped_keys
+
+    async def _delete_keys(
+        self, log: structlog.stdlib.BoundLogger, keys: list[tuple[str, str]]
+    ) -> None:
+        if not keys:
+            return
+        for namespace in {namespace for namespace, _ in keys}:
+            async with self._open_shelf_async(namespace) as shelf:
+                for key_namespace, key in keys:
+                    if key_namespace == namespace and key in shelf:
+                        del shelf[key]
+        log.debug("Evicted cache values", evicted=len(keys))
+
+    async def compact(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespaces: None | list[str] = None,
+    ) -> int:
+        """
+        Rewrite the shelves of `namespaces` (defaults to all) without the space left by
+        deleted and overwritten values, returning how many bytes were reclaimed.
+        Skipped if another process is compacting the same `temp_dir`.
+        """
+        os.makedirs(self.temp_dir, exist_ok=True)
+        with try_lock_file(os.path.join(self.temp_dir, ".compact.lock")) as locked:
+            if not locked:
+                log.debug("Cache already being compacted by another process")
+                return 0
+            if namespaces is None:
+                namespaces = self._list_namespaces()
+            reclaimed = 0
+            for namespace in namespaces:
+                disk_usage, compacted_size = await asyncio.to_thread(
+                    self._compact_namespace, namespace
+                )
+                self._compacted_sizes[namespace] = compacted_size
+                reclaimed += disk_usage - compacted_size
+        log.debug("Compacted cache", namespaces=len(namespaces), reclaimed=reclaimed)
+        return reclaimed
+
+    def _compact_namespace(self, namespace: str) -> tuple[int, int]:
+        """
+        Rewrite a namespace's shelf, returning its disk usage before and after.
+        """
+        compact_dir = os.path.join(self.temp_dir, ".compact")
+        os.makedirs(compact_dir, exist_ok=True)
+        # writers wait on the namespace lock until the compacted files are swapped in
+        with self._lock_namespace(namespace):
+            disk_usage = self.get_disk_usage(namespace)
+            shelf = self._load_shelf(namespace)
+            compacted_shelf = shelve.open(os.path.join(compact_dir, f"{namespace}.db"))
+            try:
+                for key, value in shelf.items():
+                    compacted_shelf[key] = value
+            finally:
+                compacted_shelf.close()
+                shelf.close()
+
+            # swap in the compacted files
+            for path in self._get_shelf_files(namespace):
+                os.remove(path)
+            for filename in os.listdir(compact_dir):
+                if filename.rpartition(".db")[0] == namespace:
+                    os.replace(
+                        os.path.join(compact_dir, filename),
+                        os.path.join(self.temp_dir, filename),
+                    )
+            return disk_usage, self.get_disk_usage(namespace)
+
+    def _start_sweeper(self, log: structlog.stdlib.BoundLogger) -> None:
+        if self.sweep_interval is None or self._sweeper is not None:
+            return
+        self._sweeper = asyncio.create_task(self._sweep_periodically(log))
+
+    async def _sweep_periodically(self, log: structlog.stdlib.BoundLogger) -> None:
+        assert self.sweep_interval is not None
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep(log)
+            except Exception as e:
+                log.warning(
+                    "Cache sweep error",
+                    exc_info=e,
+                )
+
+    async def sweep(self, log: structlog.stdlib.BoundLogger) -> int:
+        """
+        Delete expired values from all namespaces, returning how many were deleted,
+        and compact the namespaces that have grown too large on disk.
+        """
+        now = time.time()
+        index = await self._get_index(log)
+        deleted = 0
+        bloated_namespaces = []
+        for namespace in await asyncio.to_thread(self._list_namespaces):
+            expired_keys, live_bytes = await asyncio.to_thread(
+                self._sweep_namespace, namespace, now
+            )
+            if index is not None:
+                for key in expired_keys:
+                    index.pop((namespace, key))
+            deleted += len(expired_keys)
+            # dbm files pad values, so compare against the size after the last compaction too
+            expected_usage = max(live_bytes, self._compacted_sizes.get(namespace, 0))
+            if (
+                self.compaction_ratio is not None
+                and self.get_disk_usage(namespace)
+                > self.compaction_ratio * expected_usage
+            ):
+                bloated_namespaces.append(namespace)
+        log.debug("Swept expired cache values", deleted=deleted)
+        if bloated_namespaces:
+            await self.compact(log, bloated_namespaces)
+        return deleted
+
+    def _sweep_namespace(self, namespace: str, now: float) -> tuple[list[str], int]:
+        """
+        Delete a namespace's values expired by `now`,
+        returning their keys and the size of the remaining values.
+        """
+        live_bytes = 0
+        with self._open_shelf(namespace) as shelf:
+            expired_keys = []
+            for key, value in shelf.items():
+                if isinstance(value, _ShelveRecord) and value.expires_at <= now:
+                    expired_keys.append(key)
+                else:
+                    live_bytes += self._get_entry_size(key, value)
+            for key in expired_keys:
+                del shelf[key]
+        return expired_keys, live_bytes
+
     async def _store(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -93,9 +967,48 @@ class ShelveCacheRepo(CacheRepo):
         namespace: str,
         expire: int | timedelta | None,
     ) -> None:
-        shelf = self._load_shelf(namespace)
-        shelf[key] = value
-        shelf.close()
+        expire_seconds = get_expire_seconds(expire)
+        if expire_seconds is not None:
+            value = _ShelveRecord(
+                value=value,
+                expires_at=time.time() + expire_seconds,
+            )
+            self._start_sweeper(log)
+
+        dropped_keys = []
+        index = await self._get_index(log)
+        if index is not None:
+            self._start_sweeper(log)
+            dropped_keys = self._track(
+                index, namespace, key, self._get_entry_size(key, value)
+            )
+        if (namespace, key) not in dropped_keys:
+            async with self._open_shelf_async(namespace) as shelf:
+                shelf[key] = value
+        await self._delete_keys(log, dropped_keys)
+
+    async def _iter_keys(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[str]:
+        # don't create shelves for namespaces that were never written to
+        if not self._get_shelf_files(namespace):
+            return
+        async with self._open_shelf_async(namespace) as shelf:
+            keys = list(shelf.keys())
+        for key in keys:
+            yield key
+
+    @staticmethod
+    def _read_value(shelf: shelve.Shelf, key: str) -> Any | None:
+        value = shelf.get(key)
+        if isinstance(value, _ShelveRecord):
+            if value.expires_at <= time.time():
+                del shelf[key]
+                return None
+            return value.value
+        return value
 
     async def _retrieve(
         self,
@@ -103,19 +1016,87 @@ class ShelveCacheRepo(CacheRepo):
         key: str,
         namespace: str,
     ) -> Any | None:
-        shelf = self._load_shelf(namespace)
-        value = shelf.get(key)
-        shelf.close()
+        async with self._open_shelf_async(namespace) as shelf:
+            value = self._read_value(shelf, key)
 
+        await self._touch(log, namespace, key, value)
         return value
 
+    async def _touch(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+        key: str,
+        value: Any | None,
+    ) -> None:
+        index = await self._get_index(log)
+        if index is None:
+            return
+        index.get((namespace, key))
+        if value is None:
+            index.pop((namespace, key))
+
+    async def _retrieve_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        keys: list[tuple[str, str]],
+    ) -> list[Any | None]:
+        # open each namespace's shelf once
+        values: dict[tuple[str, str], Any | None] = {}
+        for namespace in {namespace for namespace, _ in keys}:
+            async with self._open_shelf_async(namespace) as shelf:
+                for key_namespace, key in keys:
+                    if key_namespace == namespace:
+                        values[(namespace, key)] = self._read_value(shelf, key)
+        for (namespace, key), value in values.items():
+            await self._touch(log, namespace, key, value)
+        return [values[namespace_key] for namespace_key in keys]
+
+    async def _delete(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        namespace: str,
+    ) -> None:
+        async with self._open_shelf_async(namespace) as shelf:
+            if key in shelf:
+                del shelf[key]
+        if self._index is not None:
+            self._index.pop((namespace, key))
+
 
 class RedisCacheRepo(CacheRepo):
-    def __init__(self, *args, **kwargs):
+    """
+    Stores values in Redis, under `<namespace>:<key>`.
+
+    With `write_behind` set, stores are buffered and written in pipelined batches
+    of up to `write_batch_size`, at most `write_delay` seconds later (and on `close`).
+    """
+
+    def __init__(
+        self,
+        *args,
+        write_behind: bool = False,
+        write_batch_size: int = 500,
+        write_delay: float = 0.05,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.redis_client = get_aioredis()
+        self.write_buffer = (
+            RedisWriteBuffer(
+                self.redis_client,
+                max_batch_size=write_batch_size,
+                max_delay=write_delay,
+            )
+            if write_behind
+            else None
+        )
 
     async def close(self):
+        await super().close()
+        if self.write_buffer is not None:
+            await self.write_buffer.flush(get_logger())
         await self.redis_client.close()
 
     def _wrap_tenacity(self, log: structlog.stdlib.BoundLogger, func):
@@ -143,6 +1124,9 @@ class RedisCacheRepo(CacheRepo):
         namespace: str,
         expire: int | timedelta | None,
     ) -> None:
+        if self.write_buffer is not None:
+            self.write_buffer.set(log, f"{namespace}:{key}", value, ex=expire)
+            return
         tenacious_set = self._wrap_tenacity(log, self.redis_client.set)
         await tenacious_set(
             name=f"{namespace}:{key}",
@@ -150,11 +1134,417 @@ class RedisCacheRepo(CacheRepo):
             ex=expire,
         )
 
+    async def _store_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        items: list[tuple[str, str, Any]],
+        expire: int | timedelta | None,
+    ) -> None:
+        if self.write_buffer is not None:
+            for namespace, key, value in items:
+                self.write_buffer.set(log, f"{namespace}:{key}", value, ex=expire)
+            return
+
+        async def _set_many():
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for namespace, key, value in items:
+                    pipe.set(f"{namespace}:{key}", value, ex=expire)
+                await pipe.execute()
+
+        await self._wrap_tenacity(log, _set_many)()
+
+    async def _flush_key(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        namespace: str,
+    ) -> None:
+        if self.write_buffer is not None and f"{namespace}:{key}" in self.write_buffer:
+            await self.write_buffer.flush(log)
+
     async def _retrieve(
         self,
         log: structlog.stdlib.BoundLogger,
         key: str,
         namespace: str,
     ) -> Any | None:
+        if self.write_buffer is not None and f"{namespace}:{key}" in self.write_buffer:
+            return self.write_buffer.get(f"{namespace}:{key}")
         tenacious_get = self._wrap_tenacity(log, self.redis_client.get)
         return await tenacious_get(f"{namespace}:{key}")
+
+    async def _retrieve_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        keys: list[tuple[str, str]],
+    ) -> list[Any | None]:
+        names = [f"{namespace}:{key}" for namespace, key in keys]
+        write_buffer = self.write_buffer
+        if write_buffer is None:
+            tenacious_mget = self._wrap_tenacity(log, self.redis_client.mget)
+            return await tenacious_mget(names)
+
+        # only fetch what isn't buffered
+        values = {
+            name: write_buffer.get(name) for name in names if name in write_buffer
+        }
+        unbuffered_names = [name for name in names if name not in values]
+        if unbuffered_names:
+            tenacious_mget = self._wrap_tenacity(log, self.redis_client.mget)
+            values.update(zip(unbuffered_names, await tenacious_mget(unbuffered_names)))
+        return [values[name] for name in names]
+
+    async def _delete(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        namespace: str,
+    ) -> None:
+        if self.write_buffer is not None:
+            await self.write_buffer.discard(log, f"{namespace}:{key}")
+        tenacious_delete = self._wrap_tenacity(log, self.redis_client.delete)
+        await tenacious_delete(f"{namespace}:{key}")
+
+    async def _iter_keys(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[str]:
+        if self.write_buffer is not None:
+            await self.write_buffer.flush(log)
+        prefix = f"{namespace}:"
+        # escape glob characters in the namespace
+        pattern = re.sub(r"([\\*?\[\]])", r"\\\1", prefix) + "*"
+        async for key in self.redis_client.scan_iter(match=pattern, count=1000):
+            if isinstance(key, bytes):
+                key = key.decode()
+            yield key[len(prefix) :]
+
+
+WriteMode = Literal["write-through", "write-behind"]
+
+
+@dataclass
+class _TieredEntry:
+    value: Any
+    # monotonic deadline, if the value expires
+    expires_at: float | None = None
+    # parsed representations of `value`, keyed by the parse function
+    parsed: dict[Callable, Any] = field(default_factory=dict)
+    # estimated bytes of `value` and its parsed representations
+    size: int = 0
+
+
+class TieredCacheRepo(CacheRepo):
+    """
+    Keeps a size-bounded in-process tier in front of any other cache repo.
+
+    Values (and the objects parsed from them) are kept in memory,
+    so repeated hits skip both the backend round trip and output validation;
+    parsed hits are deep copies, so callers can't change what later hits get.
+    The estimated size of parsed objects counts towards `max_bytes` along with the values,
+    and they are only kept if the entry still fits in it.
+    With `write_mode="write-behind"`, stores return as soon as the in-process tier is updated,
+    and the backend is written to in the background (awaited on `flush` and `close`).
+    Values read from the backend are kept in memory for at most `read_expire`.
+    """
+
+    def __init__(
+        self,
+        temp_dir: str,
+        backend: CacheRepo | type[CacheRepo] = ShelveCacheRepo,
+        max_bytes: int = 64 * 1024 * 1024,
+        eviction: EvictionPolicy = "lru",
+        write_mode: WriteMode = "write-through",
+        read_expire: int | timedelta | None = 60,
+    ):
+        super().__init__(temp_dir)
+        if isinstance(backend, CacheRepo):
+            self.backend = backend
+        else:
+            self.backend = backend(temp_dir=temp_dir)
+        self.write_mode = write_mode
+        self.read_expire = read_expire
+        self.memory: ByteBudgetCache[tuple[str, str], _TieredEntry] = ByteBudgetCache(
+            max_bytes=max_bytes,
+            eviction=eviction,
+        )
+        self._pending_writes: set[asyncio.Task] = set()
+        # the latest pending write of each (namespace, key), which waits for the ones before it
+        self._key_writes: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def flush(self) -> None:
+        while self._pending_writes:
+            await asyncio.gather(*self._pending_writes)
+
+    async def close(self):
+        await super().close()
+        await self.flush()
+        await self.backend.close()
+
+    def _remember(
+        self,
+        namespace: str,
+        str_key: str,
+        value: Any,
+        expire: int | timedelta | None = None,
+    ) -> _TieredEntry:
+        entry = _TieredEntry(value=value, size=get_value_size(value))
+        expire_seconds = get_expire_seconds(expire)
+        if expire_seconds is not None:
+            entry.expires_at = time.monotonic() + expire_seconds
+        self.memory.set((namespace, str_key), entry, size=entry.size)
+        return entry
+
+    async def _write_behind(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        value: Any,
+        version: CacheVersion,
+        namespace: str,
+        expire: int | timedelta | None,
+        previous_write: asyncio.Task | None = None,
+    ) -> None:
+        if previous_write is not None:
+            # keep writes to the same key in order
+            await asyncio.wait({previous_write})
+        try:
+            await self.backend.store(
+                log, key, value, version, namespace=namespace, expire=expire
+            )
+        except Exception as e:
+            log.warning(
+                "Cache write-behind error",
+                exc_info=e,
+            )
+
+    async def store(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        value: Any,
+        version: CacheVersion,
+        namespace: None | str = None,
+        expire: int | timedelta | None = None,
+    ) -> None:
+        str_key = self._prepare_key(key, version)
+        if namespace is None:
+            namespace = self.default_namespace
+
+        if self.write_mode == "write-behind":
+            self._remember(namespace, str_key, value, expire)
+            namespace_key = (namespace, str_key)
+            task = asyncio.create_task(
+                self._write_behind(
+                    log,
+                    key,
+                    value,
+                    version,
+                    namespace,
+                    expire,
+                    previous_write=self._key_writes.get(namespace_key),
+                )
+            )
+            self._pending_writes.add(task)
+            self._key_writes[namespace_key] = task
+            task.add_done_callback(lambda task: self._forget_write(namespace_key, task))
+            return
+
+        await self.backend.store(
+            log, key, value, version, namespace=namespace, expire=expire
+        )
+        self._remember(namespace, str_key, value, expire)
+
+    def _forget_write(self, namespace_key: tuple[str, str], task: asyncio.Task) -> None:
+        self._pending_writes.discard(task)
+        if self._key_writes.get(namespace_key) is task:
+            del self._key_writes[namespace_key]
+
+    def _get_memory_entry(self, namespace: str, str_key: str) -> _TieredEntry | None:
+        entry = self.memory.get((namespace, str_key))
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            self.memory.pop((namespace, str_key))
+            return None
+        return entry
+
+    async def _get_entry(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        namespace: None | str,
+    ) -> _TieredEntry | None:
+        str_key = self._prepare_key(key, version)
+        if namespace is None:
+            namespace = self.default_namespace
+
+        entry = self._get_memory_entry(namespace, str_key)
+        if entry is not None:
+            return entry
+
+        value = await self.backend.retrieve(log, key, version, namespace=namespace)
+        if value is None:
+            return None
+        # the backend's remaining TTL isn't known, so don't hold on to the value for long
+        return self._remember(namespace, str_key, value, self.read_expire)
+
+    async def flush_key(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        namespace: None | str = None,
+    ) -> None:
+        str_key = self._prepare_key(key, version)
+        if namespace is None:
+            namespace = self.default_namespace
+        pending_write = self._key_writes.get((namespace, str_key))
+        if pending_write is not None:
+            await asyncio.wait({pending_write})
+        await self.backend.flush_key(log, key, version, namespace=namespace)
+
+    async def delete(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        namespace: None | str = None,
+    ) -> None:
+        str_key = self._prepare_key(key, version)
+        if namespace is None:
+            namespace = self.default_namespace
+        self.memory.pop((namespace, str_key))
+        pending_write = self._key_writes.get((namespace, str_key))
+        if pending_write is not None:
+            # a write landing after the delete would bring the value back
+            await asyncio.wait({pending_write})
+        await self.backend.delete(log, key, version, namespace=namespace)
+
+    async def export_snapshot(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        path: str,
+        namespaces: None | list[str] = None,
+        versions: None | list[CacheVersion] = None,
+        batch_size: int = 500,
+    ) -> int:
+        await self.flush()
+        return await self.backend.export_snapshot(
+            log, path, namespaces=namespaces, versions=versions, batch_size=batch_size
+        )
+
+    async def _iter_keys(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> AsyncIterator[str]:
+        await self.flush()
+        async for key in self.backend._iter_keys(log, namespace):
+            yield key
+
+    async def _retrieve_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        keys: list[tuple[str, str]],
+    ) -> list[Any | None]:
+        return await self.backend._retrieve_many(log, keys)
+
+    async def iter_values(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespaces: None | list[str] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[tuple[str, str, Any]]:
+        await self.flush()
+        async for entry in self.backend.iter_values(
+            log, namespaces=namespaces, batch_size=batch_size
+        ):
+            yield entry
+
+    async def import_snapshot(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        path: str,
+        namespaces: None | list[str] = None,
+        expire: int | timedelta | None = None,
+        batch_size: int = 500,
+    ) -> int:
+        count = await self.backend.import_snapshot(
+            log, path, namespaces=namespaces, expire=expire, batch_size=batch_size
+        )
+        # imported values take precedence over those held in memory
+        self.memory.clear()
+        return count
+
+    async def retrieve(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        namespace: None | str = None,
+    ) -> Any | None:
+        entry = await self._get_entry(log, key, version, namespace)
+        if entry is None:
+            return None
+        return entry.value
+
+    async def retrieve_many(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        keys: list[tuple[Any, CacheVersion, None | str]],
+    ) -> list[Any | None]:
+        values: list[Any | None] = []
+        missing_indices = []
+        for i, (key, version, namespace) in enumerate(keys):
+            if namespace is None:
+                namespace = self.default_namespace
+            entry = self._get_memory_entry(namespace, self._prepare_key(key, version))
+            values.append(entry.value if entry is not None else None)
+            if entry is None:
+                missing_indices.append(i)
+
+        if missing_indices:
+            backend_values = await self.backend.retrieve_many(
+                log, [keys[i] for i in missing_indices]
+            )
+            for i, value in zip(missing_indices, backend_values):
+                if value is None:
+                    continue
+                key, version, namespace = keys[i]
+                if namespace is None:
+                    namespace = self.default_namespace
+                self._remember(
+                    namespace, self._prepare_key(key, version), value, self.read_expire
+                )
+                values[i] = value
+        return values
+
+    async def retrieve_parsed(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: Any,
+        version: CacheVersion,
+        parse: Callable[[Any], T],
+        namespace: None | str = None,
+    ) -> T | None:
+        entry = await self._get_entry(log, key, version, namespace)
+        if entry is None:
+            return None
+        if parse not in entry.parsed:
+            parsed = parse(entry.value)
+            size = entry.size + get_object_size(parsed)
+            if size > self.memory.max_bytes:
+                # not kept, so there's no need to copy it either
+                return parsed
+            entry.parsed[parse] = parsed
+            entry.size = size
+            if namespace is None:
+                namespace = self.default_namespace
+            memory_key = (namespace, self._prepare_key(key, version))
+            if self.memory.peek(memory_key) is entry:
+                self.memory.resize(memory_key, size)
+        # callers may modify what they get, so hand out copies rather than the kept object
+        return copy.deepcopy(entry.parsed[parse])
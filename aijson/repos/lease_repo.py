@@ -0,0 +1,285 @@
+import asyncio
+import time
+import uuid
+
+import structlog
+
+from aijson.utils.redis_utils import get_aioredis
+
+
+class LeaseRepo:
+    """
+    Short-lived exclusive leases, used to let a single worker compute a value
+    while other workers wait for it to be released.
+    """
+
+    async def close(self):
+        pass
+
+    async def acquire(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        ttl: float,
+    ) -> None | str:
+        """
+        Try to acquire the lease for `key`, held for at most `ttl` seconds.
+        Returns a token to release the lease with, or `None` if it is held by someone else.
+        """
+        token = uuid.uuid4().hex
+        if not await self._acquire(log, key, token, ttl):
+            return None
+        log.debug("Acquired lease", lease_key=key)
+        return token
+
+    async def _acquire(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+        ttl: float,
+    ) -> bool:
+        raise NotImplementedError
+
+    async def release(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+    ) -> None:
+        await self._release(log, key, token)
+        log.debug("Released lease", lease_key=key)
+
+    async def _release(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+    ) -> None:
+        raise NotImplementedError
+
+    async def renew(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+        ttl: float,
+    ) -> bool:
+        """
+        Extend the lease for `key` to expire `ttl` seconds from now.
+        Returns `False` if it has expired or is held by someone else.
+        """
+        return await self._renew(log, key, token, ttl)
+
+    async def _renew(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+        ttl: float,
+    ) -> bool:
+        raise NotImplementedError
+
+    async def wait(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        timeout: float,
+    ) -> bool:
+        """
+        Wait until the lease for `key` is released or expires.
+        Returns `False` if it is still held after `timeout` seconds.
+        """
+        return await self._wait(log, key, timeout)
+
+    async def _wait(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        timeout: float,
+    ) -> bool:
+        raise NotImplementedError
+
+
+class InMemoryLeaseRepo(LeaseRepo):
+    """
+    Leases local to this process, for tests and single-process deployments.
+    """
+
+    def __init__(self):
+        # key -> (token, monotonic expiry)
+        self._leases: dict[str, tuple[str, float]] = {}
+        self._released: dict[str, asyncio.Event] = {}
+
+    def _get_lease(self, key: str) -> None | tuple[str, float]:
+        lease = self._leases.get(key)
+        if lease is not None and lease[1] <= time.monotonic():
+            self._drop_lease(key)
+            return None
+        return lease
+
+    def _drop_lease(self, key: str) -> None:
+        self._leases.pop(key, None)
+        event = self._released.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def _acquire(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+        ttl: float,
+    ) -> bool:
+        if self._get_lease(key) is not None:
+            return False
+        self._leases[key] = (token, time.monotonic() + ttl)
+        return True
+
+    async def _release(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+    ) -> None:
+        lease = self._get_lease(key)
+        if lease is not None and lease[0] == token:
+            self._drop_lease(key)
+
+    async def _renew(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+        ttl: float,
+    ) -> bool:
+        lease = self._get_lease(key)
+        if lease is None or lease[0] != token:
+            return False
+        self._leases[key] = (token, time.monotonic() + ttl)
+        return True
+
+    async def _wait(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        timeout: float,
+    ) -> bool:
+        deadline = time.monotonic() + timeout
+        while (lease := self._get_lease(key)) is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            event = self._released.setdefault(key, asyncio.Event())
+            try:
+                # wake up when released, or when the lease expires
+                await asyncio.wait_for(
+                    event.wait(),
+                    timeout=min(remaining, lease[1] - time.monotonic()),
+                )
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+
+class RedisLeaseRepo(LeaseRepo):
+    """
+    Leases shared across processes, stored as `lease:<key>` with a TTL.
+    Releasing a lease publishes on `lease:<key>:released` to wake up waiters.
+    """
+
+    # only delete the lease if it is still ours, and notify waiters
+    _RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    redis.call("del", KEYS[1])
+    redis.call("publish", KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+    # only extend the lease if it is still ours
+    _RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+    def __init__(self):
+        self.redis_client = get_aioredis()
+
+    async def close(self):
+        await self.redis_client.close()
+
+    async def _acquire(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+        ttl: float,
+    ) -> bool:
+        return bool(
+            await self.redis_client.set(
+                f"lease:{key}",
+                token,
+                nx=True,
+                px=int(ttl * 1000),
+            )
+        )
+
+    async def _release(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+    ) -> None:
+        await self.redis_client.eval(  # type: ignore
+            self._RELEASE_SCRIPT,
+            2,
+            f"lease:{key}",
+            f"lease:{key}:released",
+            token,
+        )
+
+    async def _renew(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        token: str,
+        ttl: float,
+    ) -> bool:
+        return bool(
+            await self.redis_client.eval(  # type: ignore
+                self._RENEW_SCRIPT,
+                1,
+                f"lease:{key}",
+                token,
+                int(ttl * 1000),
+            )
+        )
+
+    async def _wait(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        key: str,
+        timeout: float,
+    ) -> bool:
+        deadline = time.monotonic() + timeout
+        async with self.redis_client.pubsub() as pubsub:
+            await pubsub.subscribe(f"lease:{key}:released")
+            while True:
+                # check after subscribing, so a release in between is not missed
+                ttl_ms = await self.redis_client.pttl(f"lease:{key}")
+                if ttl_ms < 0:
+                    # no lease, or the lease key has no expiry (-1) which we never set
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=min(remaining, ttl_ms / 1000),
+                )
+                if message is not None:
+                    return True
@@ -0,0 +1,222 @@
+import getpass
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import uuid
+from typing import Callable
+
+from aijson.models.blob import BlobId
+from aijson.utils.misc_utils import hash_file
+
+
+def get_default_blob_cache_dir() -> str:
+    cache_dir = os.environ.get("AIJSON_BLOB_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    # one per user, as other users could plant entries in a shared one
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"aijson-blob-cache-{user}")
+
+
+def _make_private_dir(path: str) -> None:
+    """
+    Create a directory only the current user can access, refusing one someone else owns.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return
+    dir_stat = os.lstat(path)
+    if not stat.S_ISDIR(dir_stat.st_mode) or dir_stat.st_uid != os.getuid():
+        raise PermissionError(f"Blob cache directory {path} isn't owned by this user")
+    if dir_stat.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+
+class LocalBlobCache:
+    """
+    Content-addressed cache of blobs on local disk, under `<cache_dir>/<id[:2]>/<id>`.
+    Any number of repos and processes on a host can share the same `cache_dir`.
+
+    Blob ids are the SHA-256 of their contents, so entries never go stale;
+    contents are checked against their id when added and read, and entries that don't match are dropped.
+    The default `cache_dir` is private to the current user.
+    Once the cache outgrows `max_bytes`, entries are evicted least-recently-used first
+    (by modification time, which every hit bumps) until it's down to `low_watermark` of that.
+
+    Entries are read-only and may be hardlinked out to other directories (see `link`);
+    don't modify files obtained from the cache in place.
+    """
+
+    def __init__(
+        self,
+        cache_dir: None | str = None,
+        max_bytes: int = 10 * 1024**3,
+        low_watermark: float = 0.9,
+    ):
+        if cache_dir is None:
+            cache_dir = get_default_blob_cache_dir()
+            _make_private_dir(cache_dir)
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        # this process's estimate of the cache size, corrected on every eviction
+        self._size: None | int = None
+
+    def _get_path(self, blob_id: BlobId) -> str:
+        return os.path.join(self.cache_dir, blob_id[:2], blob_id)
+
+    def lookup(self, blob_id: BlobId) -> None | str:
+        """
+        Return the path of a cached blob, marking it as recently used.
+        """
+        path = self._get_path(blob_id)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get(self, blob_id: BlobId) -> None | bytes:
+        path = self.lookup(blob_id)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+        except FileNotFoundError:
+            # evicted in the meantime
+            return None
+        if hashlib.sha256(value).hexdigest() != blob_id:
+            self.remove(blob_id)
+            return None
+        return value
+
+    def put(self, blob_id: BlobId, value: bytes) -> None:
+        if hashlib.sha256(value).hexdigest() != blob_id:
+            raise ValueError(f"Contents of blob {blob_id} don't match its id")
+
+        def _write(path: str) -> None:
+            with open(path, "wb") as f:
+                f.write(value)
+
+        self._add(blob_id, _write, len(value))
+
+    def put_file(self, blob_id: BlobId, path: str) -> None:
+        """
+        Add a copy of a file to the cache, leaving the file itself as it is.
+        """
+
+        def _copy(cache_path: str) -> None:
+            shutil.copyfile(path, cache_path)
+            # check the copy, the original may still be changed
+            if hash_file(cache_path) != blob_id:
+                raise ValueError(f"Contents of blob {blob_id} don't match its id")
+
+        self._add(blob_id, _copy, os.path.getsize(path))
+
+    def link(self, blob_id: BlobId, dest: str) -> bool:
+        """
+        Hardlink a cached blob to `dest` (copying it across filesystems).
+        Returns whether the blob was cached.
+        """
+        path = self.lookup(blob_id)
+        if path is None:
+            return False
+        try:
+            if hash_file(path) != blob_id:
+                self.remove(blob_id)
+                return False
+        except FileNotFoundError:
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        partial_dest = f"{dest}.{uuid.uuid4().hex}.tmp"
+        try:
+            try:
+                os.link(path, partial_dest)
+            except FileNotFoundError:
+                return False
+            except OSError:
+                shutil.copyfile(path, partial_dest)
+            os.replace(partial_dest, dest)
+        except FileNotFoundError:
+            # evicted in the meantime
+            return False
+        finally:
+            if os.path.exists(partial_dest):
+                os.remove(partial_dest)
+        return True
+
+    def remove(self, blob_id: BlobId) -> None:
+        try:
+            os.remove(self._get_path(blob_id))
+        except FileNotFoundError:
+            pass
+
+    def _add(
+        self,
+        blob_id: BlobId,
+        write: Callable[[str], None],
+        size: int,
+    ) -> None:
+        path = self._get_path(blob_id)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(partial_path)
+            os.chmod(partial_path, 0o444)
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+        if self._size is None:
+            self._size = self.get_size()
+        else:
+            self._size += size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def get_size(self) -> int:
+        return sum(size for _, size, _ in self._scan())
+
+    def evict(self) -> int:
+        """
+        Evict least-recently-used entries until the cache is down to `low_watermark` of `max_bytes`.
+        Returns the number of bytes freed.
+        """
+        entries = sorted(self._scan())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * self.low_watermark
+        freed = 0
+        for _, entry_size, path in entries:
+            if size - freed <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # evicted by another process
+                pass
+            freed += entry_size
+        self._size = size - freed
+        return freed
@@ -0,0 +1,103 @@
+import asyncio
+
+from aijson.log_config import get_logger
+from aijson.repos.blob_repo import (
+    BlobRepo,
+    FilesystemBlobRepo,
+    RedisBlobRepo,
+    S3BlobRepo,
+)
+from aijson.repos.cache_repo import CacheRepo, RedisCacheRepo, ShelveCacheRepo
+from aijson.services.blob_gc_service import BlobGarbageCollector
+
+CACHE_REPOS: dict[str, type[CacheRepo]] = {
+    "shelve": ShelveCacheRepo,
+    "redis": RedisCacheRepo,
+}
+
+BLOB_REPOS: dict[str, type[BlobRepo]] = {
+    "filesystem": FilesystemBlobRepo,
+    "redis": RedisBlobRepo,
+    "s3": S3BlobRepo,
+}
+
+
+async def collect_blob_garbage(
+    cache_repo: CacheRepo,
+    blob_repo: BlobRepo,
+    cache_namespaces: None | list[str] = None,
+    blob_namespaces: None | list[str] = None,
+    dry_run: bool = False,
+    min_age: float = 3600,
+    max_deletes_per_second: None | float = None,
+):
+    log = get_logger()
+    collector = BlobGarbageCollector(
+        cache_repo,
+        blob_repo,
+        min_age=min_age,
+        max_deletes_per_second=max_deletes_per_second,
+    )
+    try:
+        return await collector.collect(
+            log,
+            cache_namespaces=cache_namespaces,
+            blob_namespaces=blob_namespaces,
+            dry_run=dry_run,
+        )
+    finally:
+        await cache_repo.close()
+        await blob_repo.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Delete blobs no longer referenced by any cached output"
+    )
+    parser.add_argument("--temp-dir", type=str, required=True)
+    parser.add_argument("--cache-repo", choices=list(CACHE_REPOS), default="shelve")
+    parser.add_argument("--blob-repo", choices=list(BLOB_REPOS), default="filesystem")
+    parser.add_argument(
+        "--cache-namespace",
+        action="append",
+        help=(
+            "Cache namespace (action name) to look for references in, along with the namespaces derived from it "
+            "(`<namespace>__stale`, `__stream`, `__checkpoint` and `__approximate`); "
+            "defaults to all, required for redis, which can't list them"
+        ),
+    )
+    parser.add_argument(
+        "--blob-namespace",
+        action="append",
+        help="Blob namespace to collect (defaults to the blob repo's default namespace)",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument(
+        "--min-age",
+        type=float,
+        default=3600,
+        help="Keep blobs written or used less than this many seconds ago",
+    )
+    parser.add_argument("--max-deletes-per-second", type=float, required=False)
+
+    args = parser.parse_args()
+    if args.cache_repo == "redis" and not args.cache_namespace:
+        # redis keys of all namespaces share one keyspace with blobs and leases
+        parser.error("--cache-namespace is required with --cache-repo redis")
+
+    _cache_repo = CACHE_REPOS[args.cache_repo](temp_dir=args.temp_dir)
+    _blob_repo = BLOB_REPOS[args.blob_repo](temp_dir=args.temp_dir)
+    result = asyncio.run(
+        collect_blob_garbage(
+            _cache_repo,
+            _blob_repo,
+            cache_namespaces=args.cache_namespace,
+            blob_namespaces=args.blob_namespace,
+            dry_run=args.dry_run,
+            min_age=args.min_age,
+            max_deletes_per_second=args.max_deletes_per_second,
+        )
+    )
+    print(result.model_dump_json(indent=2))
@@ -25,6 +25,7 @@ from structlog.typing import EventDict
 from aijson import Flow, ShelveCacheRepo
 from aijson.log_config import get_logger, configure_logging
 from aijson.models.config.flow import Loop
+from aijson.models.primitives import StreamReplaySpeed
 from aijson.repos.cache_repo import CacheRepo
 from aijson.scripts.serve_openai import find_open_port, create_server
 from aijson.utils.action_utils import get_actions_dict, import_custom_actions
@@ -575,13 +576,16 @@ def construct_gradio_app(log, variables: set[str], flow: Flow):
 
 
 def create_flow_gradio_app(
-    flow_path: str, cache_repo: CacheRepo | type[CacheRepo] = ShelveCacheRepo
+    flow_path: str,
+    cache_repo: CacheRepo | type[CacheRepo] = ShelveCacheRepo,
+    stream_replay_speed: None | StreamReplaySpeed = None,
 ):
     log = get_logger()
 
     flow = Flow.from_file(
         flow_path,
         cache_repo=cache_repo,
+        stream_replay_speed=stream_replay_speed,
     )
 
     # TODO differentiate variables by type
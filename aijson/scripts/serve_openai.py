@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import json
 import socket
@@ -8,6 +9,7 @@ from fastapi import FastAPI, HTTPException
 
 from aijson import Flow
 from aijson.log_config import get_logger
+from aijson.models.primitives import StreamReplaySpeed
 from aijson.models.openai_server import OpenAIChatCompletionRequest
 from aijson.utils.format_utils import format_value
 from aijson.utils.static_utils import (
@@ -122,6 +124,22 @@ def find_open_port(start_port: int | None = None, max_tries: int = 50) -> int:
     raise RuntimeError("Failed to find open port")
 
 
+def parse_stream_replay_speed(value: str) -> StreamReplaySpeed:
+    if value in ("instant", "original"):
+        return value  # type: ignore
+    try:
+        speed = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected `instant`, `original` or a number, got {value!r}"
+        )
+    if not speed > 0:
+        raise argparse.ArgumentTypeError(
+            f"speed-up factor must be positive, got {value}"
+        )
+    return speed
+
+
 async def create_server(
     flow: Flow,
     input_var_name: str | None = None,
@@ -165,18 +183,22 @@ async def run_server(
 
 
 if __name__ == "__main__":
-    import argparse
-
     log = get_logger()
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--flow", type=str, required=True)
     parser.add_argument("--port", type=int, required=False)
     parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument(
+        "--stream-replay-speed",
+        type=parse_stream_replay_speed,
+        required=False,
+        help="Replay recorded streams on cache hits: `instant`, `original`, or a speed-up factor",
+    )
 
     args, _ = parser.parse_known_args()
 
-    _flow = Flow.from_file(args.flow)
+    _flow = Flow.from_file(args.flow, stream_replay_speed=args.stream_replay_speed)
     variables = get_config_variables(_flow.action_config)
     if len(variables) > 1:
         log.error(
@@ -1,10 +1,14 @@
 import asyncio
+import hashlib
 import json
 import sys
+import time
 from collections import defaultdict
 from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
 from json import JSONDecodeError
-from typing import Any, AsyncIterator, Iterable, Coroutine
+from typing import Any, AsyncIterator, Callable, Iterable, Coroutine
 
 from pydantic_core import PydanticSerializationError
 from typing_extensions import assert_never
@@ -15,6 +19,7 @@ from pydantic import BaseModel, RootModel, ValidationError
 
 from aijson.models.io import (
     CacheControlOutputs,
+    CheckpointInputs,
     FinalInvocationInputs,
     BlobRepoInputs,
     DefaultModelInputs,
@@ -35,11 +40,17 @@ from aijson.models.config.value_declarations import (
     TextDeclaration,
     ValueDeclaration,
 )
-from aijson.models.primitives import ExecutableName, ExecutableId, TaskId
+from aijson.models.primitives import (
+    ExecutableName,
+    ExecutableId,
+    TaskId,
+    StreamReplaySpeed,
+)
 
 from aijson.repos.blob_repo import BlobRepo
 
-from aijson.repos.cache_repo import CacheRepo
+from aijson.repos.cache_repo import CacheRepo, CacheVersion
+from aijson.repos.lease_repo import LeaseRepo
 from aijson.utils.async_utils import (
     merge_iterators,
     iterator_to_coro,
@@ -47,6 +58,7 @@ from aijson.utils.async_utils import (
     measure_coro,
     measure_async_iterator,
 )
+from aijson.utils.cache_utils import get_source_fingerprint
 from aijson.utils.llm_utils import infer_default_llm
 from aijson.utils.pydantic_utils import iterate_fields, is_basemodel_subtype
 from aijson.utils.redis_utils import get_redis_url
@@ -61,6 +73,16 @@ ActionSubclass = InternalActionBase[Any, Any]
 Inputs = BaseModel
 Outputs = BaseModel | Any
 
+# stale copies are kept under a fixed version, so they survive version changes
+_STALE_CACHE_VERSION = 0
+
+
+@dataclass
+class _StreamRecording:
+    # (offset from the start of the run, outputs JSON)
+    entries: list[tuple[float, str]] = field(default_factory=list)
+    size: int = 0
+
 
 class ActionService:
     # class Finished(Action):
@@ -74,6 +96,12 @@ class ActionService:
         blob_repo: BlobRepo,
         config: ActionConfig,
         loop: asyncio.AbstractEventLoop | None = None,
+        prefetch_max_age: float = 60,
+        lease_repo: None | LeaseRepo = None,
+        lease_ttl: None | float = None,
+        stream_replay_speed: None | StreamReplaySpeed = None,
+        stale_max_age: None | int = 7 * 24 * 3600,
+        stream_recording_max_bytes: int = 1024 * 1024,
     ):
         self.temp_dir = temp_dir
         self.use_cache = use_cache
@@ -90,6 +118,35 @@ class ActionService:
         self.actions: dict[ExecutableName, type[ActionSubclass]] = get_actions_dict()
         # This relies on using a separate action instance for each trace_id
         self.action_cache: dict[ExecutableId, ActionSubclass] = {}
+        # Cached outputs fetched ahead of time by `prefetch_cache`,
+        # keyed by (namespace, cache key, version), with the time they were fetched
+        self.prefetched_cache: dict[
+            tuple[str, str | None, CacheVersion], tuple[Any, float]
+        ] = {}
+        self.prefetch_max_age = prefetch_max_age
+        # Leases held while computing an action, so other workers wait for its cached outputs;
+        # they last `lease_ttl` seconds (defaults to the action timeout) and are renewed while held
+        self.lease_repo = lease_repo
+        self.lease_ttl = lease_ttl if lease_ttl is not None else config.action_timeout
+        self.held_leases: dict[TaskId, list[tuple[str, str]]] = defaultdict(list)
+        # Renewals of held leases, keyed by (lease key, token)
+        self.lease_renewals: dict[tuple[str, str], asyncio.Task] = {}
+        # Background refreshes of stale cache entries, keyed by (namespace, cache key)
+        self.revalidation_tasks: dict[tuple[str, str], asyncio.Task] = {}
+        # How long stale copies are kept to serve while revalidating, in seconds; `None` keeps them indefinitely
+        self.stale_max_age = stale_max_age
+        if (
+            isinstance(stream_replay_speed, (int, float))
+            and not stream_replay_speed > 0
+        ):
+            raise ValueError(
+                f"stream_replay_speed must be positive, got {stream_replay_speed}"
+            )
+        # How cache hits of actions that record their streams replay them; `None` yields only the result
+        self.stream_replay_speed = stream_replay_speed
+        # Streams whose partial outputs add up to more than this aren't recorded,
+        # as each partial output usually repeats the ones before it
+        self.stream_recording_max_bytes = stream_recording_max_bytes
 
     @contextmanager
     def _get_loop(self):
@@ -111,6 +168,22 @@ class ActionService:
         finally:
             loop.set_task_factory(task_factory_bak)
 
+    async def close(self) -> None:
+        """
+        Cancel background cache revalidations (releasing their leases) and lease renewals,
+        so the repos they use can be closed.
+        """
+        revalidations = list(self.revalidation_tasks.values())
+        for task in revalidations:
+            task.cancel()
+        await asyncio.gather(*revalidations, return_exceptions=True)
+
+        renewals = list(self.lease_renewals.values())
+        for task in renewals:
+            task.cancel()
+        await asyncio.gather(*renewals, return_exceptions=True)
+        self.lease_renewals.clear()
+
     def create_task(self, coro: Coroutine):
         with self._get_loop() as loop:
             return loop.create_task(coro)
@@ -257,40 +330,34 @@ class ActionService:
         log: structlog.stdlib.BoundLogger,
         output: Any,
     ):
-        if isinstance(output, Blob):
-            try:
-                return not await self.blob_repo.exists(log, output)
-            except Exception as e:
-                log.exception("Blob existence check error", exc_info=True)
-                sentry_sdk.capture_exception(e)
-                return True
+        blobs = self._collect_blobs(output)
+        if not blobs:
+            return False
+        try:
+            return not all(await self.blob_repo.exists_many(log, blobs))
+        except Exception as e:
+            log.exception("Blob existence check error", exc_info=True)
+            sentry_sdk.capture_exception(e)
+            return True
 
+    @classmethod
+    def _collect_blobs(cls, output: Any) -> list[Blob]:
+        if isinstance(output, Blob):
+            return [output]
         if isinstance(output, BaseModel):
-            return any(
-                await asyncio.gather(
-                    *[
-                        self._contains_expired_blobs(log, field_value)
-                        for field_value in output.__dict__.values()
-                    ]
-                )
-            )
+            values = output.__dict__.values()
         elif isinstance(output, list):
-            return any(
-                await asyncio.gather(
-                    *[self._contains_expired_blobs(log, item) for item in output]
-                )
-            )
+            values = output
         elif isinstance(output, dict):
-            return any(
-                await asyncio.gather(
-                    *[
-                        self._contains_expired_blobs(log, value)
-                        for value in output.values()
-                    ]
-                )
-            )
+            values = output.values()
+        else:
+            return []
 
-        return False
+        blobs = {}
+        for value in values:
+            for blob in cls._collect_blobs(value):
+                blobs.setdefault(blob.id, blob)
+        return list(blobs.values())
 
     @classmethod
     def _get_dependency_ids_and_stream_flag_from_input_spec(
@@ -398,6 +465,16 @@ class ActionService:
         ):
             yield dependency_outputs
 
+    @staticmethod
+    def _get_input_spec(action_config: ActionInvocation) -> dict[str, Any]:
+        input_spec = {}
+        for name, value in iterate_fields(action_config):
+            if name in ("id", "action"):
+                continue
+            if value is not None:
+                input_spec[name] = value
+        return input_spec
+
     async def stream_input_dependencies(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -415,13 +492,7 @@ class ActionService:
             yield None
             return
 
-        input_spec = {}
-        for name, value in iterate_fields(action_config):
-            if name in ("id", "action"):
-                continue
-            if value is not None:
-                input_spec[name] = value
-
+        input_spec = self._get_input_spec(action_config)
         dependencies = self._get_dependency_ids_and_stream_flag_from_input_spec(
             input_spec
         )
@@ -579,6 +650,333 @@ class ActionService:
             if queue in new_listeners_queues:
                 new_listeners_queues.remove(queue)
 
+    def _pop_prefetched(
+        self,
+        namespace: str,
+        cache_key: str | None,
+        version: CacheVersion,
+    ) -> Any | None:
+        prefetched = self.prefetched_cache.pop((namespace, cache_key, version), None)
+        if prefetched is None:
+            return None
+        value, fetched_at = prefetched
+        if time.monotonic() - fetched_at > self.prefetch_max_age:
+            return None
+        return value
+
+    def _prune_prefetched(self) -> None:
+        expired_before = time.monotonic() - self.prefetch_max_age
+        for key, (_, fetched_at) in list(self.prefetched_cache.items()):
+            if fetched_at < expired_before:
+                del self.prefetched_cache[key]
+
+    def discard_prefetched(
+        self,
+        keys: list[tuple[str, str | None, CacheVersion]],
+    ) -> None:
+        """
+        Drop outputs fetched by `prefetch_cache` that weren't used, once the run they were fetched for ends.
+        """
+        for key in keys:
+            self.prefetched_cache.pop(key, None)
+
+    def _get_executable_dependency_closure(
+        self,
+        executable_id: ExecutableId,
+        flow: FlowConfig,
+    ) -> set[ExecutableId]:
+        closure = set()
+        to_visit = [executable_id]
+        while to_visit:
+            id_ = to_visit.pop()
+            if id_ in closure or id_ not in flow:
+                continue
+            closure.add(id_)
+            executable = flow[id_]
+            if isinstance(executable, ActionInvocation):
+                input_spec = self._get_input_spec(executable)
+            elif isinstance(executable, Loop):
+                # actions within the loop depend on the loop variable, so only the iterated value is followed
+                input_spec = executable.in_
+            else:
+                input_spec = executable
+            to_visit.extend(
+                d
+                for d, _ in self._get_dependency_ids_and_stream_flag_from_input_spec(
+                    input_spec
+                )
+            )
+        return closure
+
+    async def _resolve_static_cache_key(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_config: ActionInvocation,
+        variables: dict[str, Any],
+    ) -> str | None | SentinelType:
+        """
+        Resolve the cache key of an action without running any other executables.
+        Returns Sentinel if the key depends on other executables' outputs.
+        """
+        if action_config.cache_key is not None:
+            if self._get_dependency_ids_and_stream_flag_from_input_spec(
+                action_config.cache_key
+            ):
+                return Sentinel
+            return str(action_config.cache_key)
+
+        inputs_type = self.get_action_type(action_config.action)._get_inputs_type()
+        if isinstance(None, inputs_type):
+            return None
+
+        input_spec = self._get_input_spec(action_config)
+        if self._get_dependency_ids_and_stream_flag_from_input_spec(input_spec):
+            return Sentinel
+        rendered = await self._collect_inputs_from_context(
+            log,
+            input_spec=input_spec,
+            context=variables,
+        )
+        return inputs_type.model_validate(rendered).model_dump_json()
+
+    async def prefetch_cache(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        executable_id: ExecutableId,
+        variables: dict[str, Any] | None = None,
+        flow: FlowConfig | None = None,
+    ) -> list[tuple[str, str | None, CacheVersion]]:
+        """
+        Fetch the cached outputs of `executable_id` and its dependencies in one batch,
+        for every action whose cache key can be resolved up front
+        (a static `cache_key`, or inputs that don't depend on other executables).
+        The fetched outputs are used by the next cache check of each action.
+        Returns the keys of the fetched outputs, to pass to `discard_prefetched` once the run ends.
+        """
+        if not self.use_cache:
+            return []
+        if variables is None:
+            variables = {}
+        if flow is None:
+            flow = self.config.flow
+
+        keys = []
+        for id_ in self._get_executable_dependency_closure(executable_id, flow):
+            action_config = flow[id_]
+            if not isinstance(action_config, ActionInvocation):
+                continue
+            action_type = self.get_action_type(action_config.action)
+            if not action_type.cache:
+                continue
+            try:
+                cache_key = await self._resolve_static_cache_key(
+                    log, action_config, variables
+                )
+            except Exception:
+                log.debug(
+                    "Could not resolve cache key for prefetching",
+                    action_id=id_,
+                    exc_info=True,
+                )
+                continue
+            if is_sentinel(cache_key):
+                continue
+            keys.append(
+                (cache_key, self._get_cache_version(action_type), action_config.action)
+            )
+        if not keys:
+            return []
+
+        try:
+            values = await self.cache_repo.retrieve_many(log, keys)
+        except Exception as e:
+            log.warning(
+                "Cache prefetch error",
+                exc_info=e,
+            )
+            return []
+        # drop what earlier runs fetched but never used
+        self._prune_prefetched()
+        fetched_at = time.monotonic()
+        prefetched_keys = []
+        for (cache_key, version, namespace), value in zip(keys, values):
+            if value is not None:
+                self.prefetched_cache[(namespace, cache_key, version)] = (
+                    value,
+                    fetched_at,
+                )
+                prefetched_keys.append((namespace, cache_key, version))
+        log.debug(
+            "Prefetched cache",
+            keys=len(keys),
+            hits=len(prefetched_keys),
+        )
+        return prefetched_keys
+
+    @staticmethod
+    def _get_outputs_parser(
+        action_type: type[ActionSubclass],
+        action_invocation: ActionInvocation,
+    ) -> Callable[[Any], Any]:
+        outputs_type = action_type._get_outputs_type(action_invocation)
+        if is_basemodel_subtype(outputs_type):
+            return outputs_type.model_validate_json
+        return json.loads
+
+    @staticmethod
+    def _get_stale_namespace(action_name: ExecutableName) -> str:
+        return f"{action_name}__stale"
+
+    @staticmethod
+    def get_derived_cache_namespaces(action_name: ExecutableName) -> list[str]:
+        """
+        Return the cache namespaces derived from an action's, which also hold its outputs
+        (stale copies, stream recordings, checkpoints and approximate matches).
+        """
+        return [
+            ActionService._get_stale_namespace(action_name),
+            ActionService._get_stream_namespace(action_name),
+            ActionService._get_checkpoint_namespace(action_name),
+            CacheRepo._get_approximate_namespace(action_name),
+        ]
+
+    async def _check_stale_cache(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_id: ExecutableId,
+        cache_key: str,
+        flow: FlowConfig,
+    ) -> SentinelType | Outputs:
+        action_invocation = flow[action_id]
+        if not isinstance(action_invocation, ActionInvocation):
+            return Sentinel
+        action_name = action_invocation.action
+        action_type = self.get_action_type(action_name)
+        if not (
+            self.use_cache
+            and action_type.cache
+            and action_type.cache_stale_while_revalidate
+        ):
+            return Sentinel
+
+        try:
+            outputs = await self.cache_repo.retrieve_parsed(
+                log,
+                cache_key,
+                namespace=self._get_stale_namespace(action_name),
+                version=_STALE_CACHE_VERSION,
+                parse=self._get_outputs_parser(action_type, action_invocation),
+            )
+        except Exception as e:
+            log.warning(
+                "Stale cache retrieve error",
+                exc_info=e,
+            )
+            return Sentinel
+        if outputs is None:
+            return Sentinel
+        if isinstance(outputs, BaseModel) and await self._contains_expired_blobs(
+            log, outputs
+        ):
+            return Sentinel
+        log.info("Serving stale cache")
+        return outputs
+
+    def _revalidate_in_background(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_id: ExecutableId,
+        inputs: Inputs,
+        cache_key: str,
+        variables: dict[str, Any],
+        flow: FlowConfig,
+    ) -> None:
+        action_invocation = flow[action_id]
+        if not isinstance(action_invocation, ActionInvocation):
+            return
+        action_name = action_invocation.action
+        action_type = self.get_action_type(action_name)
+
+        revalidation_key = (action_name, cache_key)
+        if revalidation_key in self.revalidation_tasks:
+            return
+
+        async def _revalidate():
+            outputs = Sentinel
+            lease = None
+            try:
+                # the lease also keeps other workers from revalidating it at the same time
+                lease = await self._try_acquire_lease(
+                    log, action_name, action_type, cache_key
+                )
+                if lease is Sentinel:
+                    log.debug("Action already being computed, not revalidating")
+                    return
+                async for outputs in self._run_action(
+                    log=log,
+                    action_id=action_id,
+                    inputs=inputs,
+                    flow=flow,
+                    variables=variables,
+                ):
+                    pass
+                if self._should_cache_outputs(action_type, action_invocation, outputs):
+                    await self._cache_outputs(
+                        log,
+                        outputs=outputs,
+                        cache_key=cache_key,
+                        action_name=action_name,
+                        action_type=action_type,
+                    )
+            except Exception as e:
+                log.exception("Cache revalidation error")
+                sentry_sdk.capture_exception(e)
+            finally:
+                if isinstance(lease, tuple):
+                    await self._release_lease(log, *lease)
+                self.revalidation_tasks.pop(revalidation_key, None)
+
+        log.debug("Revalidating cache in background")
+        self.revalidation_tasks[revalidation_key] = self.create_task(_revalidate())
+
+    async def _check_approximate_cache(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_name: ExecutableName,
+        action_type: type[ActionSubclass],
+        cache_key: str,
+        parse: Callable[[Any], Any],
+    ) -> SentinelType | Outputs:
+        try:
+            value = await self.cache_repo.retrieve_approximate(
+                log,
+                cache_key,
+                version=self._get_cache_version(action_type),
+                threshold=action_type.cache_similarity_threshold,  # type: ignore
+                namespace=action_name,
+            )
+            if value is None:
+                return Sentinel
+            outputs = parse(value)
+        except (ValidationError, JSONDecodeError) as e:
+            log.warning(
+                "Approximate cache hit but outputs invalid",
+                exc_info=e,
+            )
+            return Sentinel
+        except Exception as e:
+            log.warning(
+                "Approximate cache retrieve error",
+                exc_info=e,
+            )
+            return Sentinel
+        if isinstance(outputs, BaseModel) and await self._contains_expired_blobs(
+            log, outputs
+        ):
+            return Sentinel
+        log.info("Approximate cache hit")
+        return outputs
+
     async def _check_cache(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -595,38 +993,50 @@ class ActionService:
 
         if self.use_cache and action_type.cache:
             log.debug("Checking cache")
+            parse = self._get_outputs_parser(action_type, action_invocation)
+            prefetched = self._pop_prefetched(
+                action_name, cache_key, self._get_cache_version(action_type)
+            )
             try:
-                outputs_json = await self.cache_repo.retrieve(
-                    log, cache_key, namespace=action_name, version=action_type.version
+                if prefetched is not None:
+                    outputs = parse(prefetched)
+                else:
+                    outputs = await self.cache_repo.retrieve_parsed(
+                        log,
+                        cache_key,
+                        namespace=action_name,
+                        version=self._get_cache_version(action_type),
+                        parse=parse,
+                    )
+            except (ValidationError, JSONDecodeError) as e:
+                log.warning(
+                    "Cache hit but outputs invalid",
+                    exc_info=e,
                 )
+                return Sentinel
             except Exception as e:
                 log.warning(
                     "Cache retrieve error",
                     exc_info=e,
                 )
-                outputs_json = None
-            if outputs_json is not None:
-                outputs_type = action_type._get_outputs_type(action_invocation)
-                try:
-                    if is_basemodel_subtype(outputs_type):
-                        outputs = outputs_type.model_validate_json(outputs_json)
-                        if await self._contains_expired_blobs(log, outputs):
-                            log.info("Cache hit but blobs expired")
-                            return Sentinel
-                        else:
-                            log.info("Cache hit")
-                    else:
-                        outputs = json.loads(outputs_json)
-                        log.info("Cache hit")
-                    return outputs
-                except (ValidationError, JSONDecodeError) as e:
-                    log.warning(
-                        "Cache hit but outputs invalid",
-                        exc_info=e,
-                    )
-
+                outputs = None
+            if outputs is not None:
+                if isinstance(
+                    outputs, BaseModel
+                ) and await self._contains_expired_blobs(log, outputs):
+                    log.info("Cache hit but blobs expired")
+                    return Sentinel
+                log.info("Cache hit")
+                return outputs
             else:
                 log.info("Cache miss")
+                if (
+                    action_type.cache_similarity_threshold is not None
+                    and cache_key is not None
+                ):
+                    return await self._check_approximate_cache(
+                        log, action_name, action_type, cache_key, parse
+                    )
         else:
             log.debug(
                 "Cache disabled",
@@ -676,6 +1086,21 @@ class ActionService:
         log.debug("Resolved cache key", cache_key=cache_key)
         return cache_key
 
+    @staticmethod
+    def _get_cache_version(action_type: type[ActionSubclass]) -> CacheVersion:
+        # without an explicit version, cache across runs as long as the action's code is unchanged
+        if action_type.version is not None:
+            return action_type.version
+        return get_source_fingerprint(action_type)
+
+    def _get_cache_expire(
+        self,
+        action_type: type[ActionSubclass],
+    ) -> int | timedelta | None:
+        if action_type.cache_expire is not None:
+            return action_type.cache_expire
+        return self.config.action_cache_expire
+
     async def _cache_outputs(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -706,17 +1131,438 @@ class ActionService:
                 log,
                 cache_key,
                 outputs_json,
-                version=action_type.version,
+                version=self._get_cache_version(action_type),
                 namespace=action_name,
-                # TODO add expire
-                # expire=self.config.action_cache_expire,
+                expire=self._get_cache_expire(action_type),
             )
+            if (
+                action_type.cache_similarity_threshold is not None
+                and cache_key is not None
+            ):
+                await self.cache_repo.store_approximate(
+                    log,
+                    cache_key,
+                    outputs_json,
+                    version=self._get_cache_version(action_type),
+                    namespace=action_name,
+                    expire=self._get_cache_expire(action_type),
+                )
+            if action_type.cache_stale_while_revalidate:
+                # kept across versions and for `stale_max_age`, to serve while revalidating
+                await self.cache_repo.store(
+                    log,
+                    cache_key,
+                    outputs_json,
+                    version=_STALE_CACHE_VERSION,
+                    namespace=self._get_stale_namespace(action_name),
+                    expire=self.stale_max_age,
+                )
+            if self.lease_repo is not None and cache_key is not None:
+                # workers waiting on this action's lease read the outputs as soon as it is released,
+                # so they must be written through any write-behind buffering first
+                await self.cache_repo.flush_key(
+                    log,
+                    cache_key,
+                    version=self._get_cache_version(action_type),
+                    namespace=action_name,
+                )
         except Exception as e:
             log.warning(
                 "Cache store error",
                 exc_info=e,
             )
 
+    @staticmethod
+    def _get_stream_namespace(action_name: ExecutableName) -> str:
+        return f"{action_name}__stream"
+
+    async def _store_stream_recording(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_name: ExecutableName,
+        action_type: type[ActionSubclass],
+        cache_key: str,
+        recording: list[tuple[float, str]],
+    ) -> None:
+        try:
+            await self.cache_repo.store(
+                log,
+                cache_key,
+                json.dumps(recording),
+                version=self._get_cache_version(action_type),
+                namespace=self._get_stream_namespace(action_name),
+                expire=self._get_cache_expire(action_type),
+            )
+        except Exception as e:
+            log.warning(
+                "Stream recording store error",
+                exc_info=e,
+            )
+            return
+        log.debug("Stored stream recording", outputs=len(recording))
+
+    async def _load_stream_recording(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_id: ExecutableId,
+        cache_key: str,
+        flow: FlowConfig,
+    ) -> None | list[tuple[float, Outputs]]:
+        action_invocation = flow[action_id]
+        if not isinstance(action_invocation, ActionInvocation):
+            return None
+        action_name = action_invocation.action
+        action_type = self.get_action_type(action_name)
+        parse = self._get_outputs_parser(action_type, action_invocation)
+        try:
+            recording = await self.cache_repo.retrieve(
+                log,
+                cache_key,
+                version=self._get_cache_version(action_type),
+                namespace=self._get_stream_namespace(action_name),
+            )
+            if recording is None:
+                return None
+            return [
+                (float(offset), parse(outputs_json))
+                for offset, outputs_json in json.loads(recording)
+            ]
+        except (ValidationError, JSONDecodeError, TypeError, ValueError) as e:
+            log.warning(
+                "Stream recording invalid",
+                exc_info=e,
+            )
+        except Exception as e:
+            log.warning(
+                "Stream recording retrieve error",
+                exc_info=e,
+            )
+        return None
+
+    async def _broadcast_cached_outputs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_id: ExecutableId,
+        task_id: TaskId,
+        cache_key: str | None,
+        outputs: Outputs,
+        flow: FlowConfig,
+    ) -> None:
+        """
+        Broadcast cached outputs, replaying the recorded stream before them if so configured.
+        """
+        action_invocation = flow[action_id]
+        speed = self.stream_replay_speed
+        if (
+            speed is None
+            or cache_key is None
+            or not isinstance(action_invocation, ActionInvocation)
+            or not self.get_action_type(action_invocation.action).cache_record_stream
+        ):
+            self._broadcast_outputs(log, task_id, outputs)
+            return
+
+        recording = await self._load_stream_recording(
+            log, action_id, cache_key, flow=flow
+        )
+        if not recording:
+            self._broadcast_outputs(log, task_id, outputs)
+            return
+
+        log.info("Replaying stream recording", outputs=len(recording), speed=speed)
+        if speed == "instant":
+            factor = None
+        elif speed == "original":
+            factor = 1.0
+        else:
+            factor = float(speed)
+        replay_start = time.monotonic()
+        for i, (offset, partial_outputs) in enumerate(recording):
+            if factor is not None:
+                delay = replay_start + offset / factor - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            # the cached result stands in for the last recorded outputs
+            if i == len(recording) - 1:
+                partial_outputs = outputs
+            self._broadcast_outputs(log, task_id, partial_outputs)
+
+    @staticmethod
+    def _get_checkpoint_namespace(action_name: ExecutableName) -> str:
+        return f"{action_name}__checkpoint"
+
+    async def _load_checkpoint(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_id: ExecutableId,
+        cache_key: str,
+        flow: FlowConfig,
+    ) -> SentinelType | Outputs:
+        action_invocation = flow[action_id]
+        if not isinstance(action_invocation, ActionInvocation):
+            return Sentinel
+        action_name = action_invocation.action
+        action_type = self.get_action_type(action_name)
+        try:
+            checkpoint = await self.cache_repo.retrieve_parsed(
+                log,
+                cache_key,
+                version=self._get_cache_version(action_type),
+                parse=self._get_outputs_parser(action_type, action_invocation),
+                namespace=self._get_checkpoint_namespace(action_name),
+            )
+        except Exception as e:
+            log.warning(
+                "Checkpoint retrieve error",
+                exc_info=e,
+            )
+            return Sentinel
+        if checkpoint is None:
+            return Sentinel
+        return checkpoint
+
+    async def _store_checkpoint(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_name: ExecutableName,
+        action_type: type[ActionSubclass],
+        cache_key: str,
+        outputs: Outputs,
+    ) -> None:
+        try:
+            if isinstance(outputs, BaseModel):
+                outputs_json = outputs.model_dump_json()
+            else:
+                outputs_json = json.dumps(outputs)
+            await self.cache_repo.store(
+                log,
+                cache_key,
+                outputs_json,
+                version=self._get_cache_version(action_type),
+                namespace=self._get_checkpoint_namespace(action_name),
+                expire=self._get_cache_expire(action_type),
+            )
+        except Exception as e:
+            log.warning(
+                "Checkpoint store error",
+                exc_info=e,
+            )
+            return
+        log.debug("Stored checkpoint")
+
+    async def _delete_checkpoint(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_name: ExecutableName,
+        action_type: type[ActionSubclass],
+        cache_key: str,
+    ) -> None:
+        try:
+            await self.cache_repo.delete(
+                log,
+                cache_key,
+                version=self._get_cache_version(action_type),
+                namespace=self._get_checkpoint_namespace(action_name),
+            )
+        except Exception as e:
+            log.warning(
+                "Checkpoint delete error",
+                exc_info=e,
+            )
+
+    def _record_outputs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        recording: None | _StreamRecording,
+        run_start: float,
+        outputs: Outputs,
+    ) -> None | _StreamRecording:
+        if recording is None:
+            return None
+        try:
+            if isinstance(outputs, BaseModel):
+                outputs_json = outputs.model_dump_json()
+            else:
+                outputs_json = json.dumps(outputs)
+        except (PydanticSerializationError, TypeError):
+            log.debug("Outputs are unserializable, not recording stream")
+            return None
+        recording.size += len(outputs_json)
+        if recording.size > self.stream_recording_max_bytes:
+            log.debug(
+                "Stream too large, not recording it",
+                max_bytes=self.stream_recording_max_bytes,
+            )
+            return None
+        recording.entries.append((time.monotonic() - run_start, outputs_json))
+        return recording
+
+    def _should_cache_outputs(
+        self,
+        action_type: type[ActionSubclass],
+        action_invocation: ActionInvocation,
+        outputs: SentinelType | Outputs,
+    ) -> bool:
+        return (
+            self.use_cache  # global flag
+            and action_type._get_outputs_type(action_invocation)
+            is not type(None)  # outputs type is NoneType
+            and not is_sentinel(outputs)  # outputs not yielded
+            and action_type.cache  # cache disabled in action implementation
+            and (
+                not isinstance(outputs, CacheControlOutputs) or outputs._cache
+            )  # outputs modifier opt-out of caching
+        )
+
+    def _get_lease_key(
+        self,
+        action_name: ExecutableName,
+        action_type: type[ActionSubclass],
+        cache_key: str,
+    ) -> str:
+        version = self._get_cache_version(action_type)
+        digest = hashlib.sha256(cache_key.encode()).hexdigest()
+        return f"{action_name}:{version}:{digest}"
+
+    async def _acquire_lease_or_wait(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_id: ExecutableId,
+        task_id: TaskId,
+        cache_key: str,
+        flow: FlowConfig,
+    ) -> SentinelType | Outputs:
+        """
+        Acquire the lease for computing the action's outputs,
+        or wait for whoever holds it and return the outputs they cached.
+        Returns `Sentinel` if the action should be run by this worker.
+        """
+        if self.lease_repo is None:
+            return Sentinel
+
+        action_invocation = flow[action_id]
+        if not isinstance(action_invocation, ActionInvocation):
+            return Sentinel
+        action_name = action_invocation.action
+        action_type = self.get_action_type(action_name)
+        if not (self.use_cache and action_type.cache):
+            return Sentinel
+
+        lease_key = self._get_lease_key(action_name, action_type, cache_key)
+        try:
+            token = await self.lease_repo.acquire(log, lease_key, ttl=self.lease_ttl)
+            if token is None:
+                log.info("Waiting for in-flight action", lease_key=lease_key)
+                if not await self.lease_repo.wait(
+                    log, lease_key, timeout=self.lease_ttl
+                ):
+                    log.warning("Timed out waiting for in-flight action")
+                    return Sentinel
+                outputs = await self._check_cache(log, action_id, cache_key, flow=flow)
+                if not is_sentinel(outputs):
+                    return outputs
+                # the holder finished without caching outputs, compute them here
+                token = await self.lease_repo.acquire(
+                    log, lease_key, ttl=self.lease_ttl
+                )
+        except Exception as e:
+            log.warning(
+                "Lease error",
+                exc_info=e,
+            )
+            return Sentinel
+
+        if token is not None:
+            self.held_leases[task_id].append((lease_key, token))
+            self._renew_lease_in_background(log, lease_key, token)
+        return Sentinel
+
+    async def _try_acquire_lease(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        action_name: ExecutableName,
+        action_type: type[ActionSubclass],
+        cache_key: str,
+    ) -> None | SentinelType | tuple[str, str]:
+        """
+        Acquire the lease for computing the action's outputs without waiting for it.
+        Returns the (lease key, token) held, `Sentinel` if someone else holds it,
+        or `None` if there is no lease to take.
+        """
+        if self.lease_repo is None:
+            return None
+        lease_key = self._get_lease_key(action_name, action_type, cache_key)
+        try:
+            token = await self.lease_repo.acquire(log, lease_key, ttl=self.lease_ttl)
+        except Exception as e:
+            log.warning(
+                "Lease error",
+                exc_info=e,
+            )
+            return None
+        if token is None:
+            return Sentinel
+        self._renew_lease_in_background(log, lease_key, token)
+        return lease_key, token
+
+    def _renew_lease_in_background(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        lease_key: str,
+        token: str,
+    ) -> None:
+        """
+        Keep renewing a held lease until it is released, so it outlives actions that take longer than `lease_ttl`.
+        """
+        lease_repo = self.lease_repo
+        assert lease_repo is not None
+
+        async def _renew():
+            while True:
+                await asyncio.sleep(self.lease_ttl / 3)
+                try:
+                    if not await lease_repo.renew(
+                        log, lease_key, token, ttl=self.lease_ttl
+                    ):
+                        log.warning("Lease lost", lease_key=lease_key)
+                        return
+                except Exception as e:
+                    log.warning(
+                        "Lease error",
+                        exc_info=e,
+                    )
+
+        self.lease_renewals[(lease_key, token)] = self.create_task(_renew())
+
+    async def _release_lease(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        lease_key: str,
+        token: str,
+    ) -> None:
+        if self.lease_repo is None:
+            return
+        renewal = self.lease_renewals.pop((lease_key, token), None)
+        if renewal is not None:
+            renewal.cancel()
+        try:
+            await self.lease_repo.release(log, lease_key, token)
+        except Exception as e:
+            log.warning(
+                "Lease error",
+                exc_info=e,
+            )
+
+    async def _release_leases(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        task_id: TaskId,
+    ) -> None:
+        if self.lease_repo is None:
+            return
+        for lease_key, token in self.held_leases.pop(task_id, []):
+            await self._release_lease(log, lease_key, token)
+
     async def _run_and_broadcast_action(
         self,
         log: structlog.stdlib.BoundLogger,
@@ -747,7 +1593,9 @@ class ActionService:
             hardcoded_cache_key = cache_key
             outputs = await self._check_cache(log, action_id, cache_key, flow=flow)
             if not is_sentinel(outputs):
-                self._broadcast_outputs(log, task_id, outputs)
+                await self._broadcast_cached_outputs(
+                    log, action_id, task_id, cache_key, outputs, flow=flow
+                )
                 return
         else:
             hardcoded_cache_key = cache_key
@@ -755,6 +1603,8 @@ class ActionService:
         inputs = None
         outputs = Sentinel
         cache_hit = False
+        recording: None | _StreamRecording = None
+        run_start = time.monotonic()
 
         # Run dependencies
         # FIXME instead of running the action on each partial dependency result, every time the action execution
@@ -789,11 +1639,54 @@ class ActionService:
             else:
                 cache_key = None
             outputs = await self._check_cache(log, action_id, cache_key, flow=flow)
+            if (
+                is_sentinel(outputs)
+                and cache_key is not None
+                and not isinstance(inputs, FinalInvocationInputs)
+            ):
+                outputs = await self._check_stale_cache(
+                    log, action_id, cache_key, flow=flow
+                )
+                if not is_sentinel(outputs):
+                    self._revalidate_in_background(
+                        log, action_id, inputs, cache_key, variables, flow=flow
+                    )
+            if is_sentinel(outputs) and cache_key is not None:
+                outputs = await self._acquire_lease_or_wait(
+                    log, action_id, task_id, cache_key, flow=flow
+                )
             if not is_sentinel(outputs):
                 cache_hit = True
-                self._broadcast_outputs(log, task_id, outputs)
+                await self._broadcast_cached_outputs(
+                    log, action_id, task_id, cache_key, outputs, flow=flow
+                )
                 continue
 
+            # Replay the checkpoint of an interrupted run
+            checkpoint_interval = action_type.cache_checkpoint_interval
+            if checkpoint_interval is not None and cache_key is not None:
+                checkpoint = await self._load_checkpoint(
+                    log, action_id, cache_key, flow=flow
+                )
+                if not is_sentinel(checkpoint):
+                    log.info("Replaying checkpoint")
+                    self._broadcast_outputs(log, task_id, checkpoint)
+                    if isinstance(inputs, CheckpointInputs):
+                        inputs._checkpoint = checkpoint
+            last_checkpoint_time = time.monotonic()
+
+            # Record the stream of partial outputs, with their offsets from the start of the run
+            if (
+                self.use_cache
+                and action_type.cache
+                and action_type.cache_record_stream
+                and cache_key is not None
+            ):
+                recording = _StreamRecording()
+            else:
+                recording = None
+            run_start = time.monotonic()
+
             # Run the action
             # TODO signal that `action_id` has started running from here
 
@@ -811,6 +1704,17 @@ class ActionService:
                 # Send result to queue
                 # log.debug("Broadcasting outputs")
                 self._broadcast_outputs(log, task_id, outputs)
+                recording = self._record_outputs(log, recording, run_start, outputs)
+
+                if (
+                    checkpoint_interval is not None
+                    and cache_key is not None
+                    and time.monotonic() - last_checkpoint_time >= checkpoint_interval
+                ):
+                    await self._store_checkpoint(
+                        log, action_name, action_type, cache_key, outputs
+                    )
+                    last_checkpoint_time = time.monotonic()
 
             # log.debug("Outputs done")
 
@@ -828,19 +1732,13 @@ class ActionService:
                 variables=variables,
             ):
                 self._broadcast_outputs(log, task_id, outputs)
+                recording = self._record_outputs(log, recording, run_start, outputs)
 
         # Cache result
         # TODO should we cache intermediate results too, or only on the final set of inputs/outputs? (currently latter)
         if (
-            self.use_cache  # global flag
-            and action_type._get_outputs_type(action_invocation)
-            is not type(None)  # outputs type is NoneType
-            and not is_sentinel(outputs)  # outputs not yielded
-            and not cache_hit  # output retrieved from cache
-            and action_type.cache  # cache disabled in action implementation
-            and (
-                not isinstance(outputs, CacheControlOutputs) or outputs._cache
-            )  # outputs modifier opt-out of caching
+            not cache_hit  # output retrieved from cache
+            and self._should_cache_outputs(action_type, action_invocation, outputs)
         ):
             await self._cache_outputs(
                 log,
@@ -849,6 +1747,19 @@ class ActionService:
                 action_name=action_name,
                 action_type=action_type,
             )
+            if recording is not None and recording.entries and cache_key is not None:
+                await self._store_stream_recording(
+                    log, action_name, action_type, cache_key, recording.entries
+                )
+
+        # The run finished, so its checkpoint is no longer needed
+        if (
+            action_type.cache_checkpoint_interval is not None
+            and cache_key is not None
+            and not cache_hit
+            and not is_sentinel(outputs)
+        ):
+            await self._delete_checkpoint(log, action_name, action_type, cache_key)
 
         if not is_sentinel(outputs) and (queues := self.new_listeners[task_id]):
             log.debug("Final output broadcast for new listeners")
@@ -876,6 +1787,9 @@ class ActionService:
             log.exception("Action service exception")
             sentry_sdk.capture_exception(e)
         finally:
+            # Let workers waiting on this task's leases read the cached outputs
+            await self._release_leases(log, task_id)
+
             log.debug("Broadcasting end of stream")
             # Signal end of queue
             self._broadcast_outputs(log, task_id, Sentinel)
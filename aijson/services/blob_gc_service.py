@@ -0,0 +1,251 @@
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from typing import Any
+
+import structlog
+from pydantic import BaseModel
+
+from aijson.models.blob import Blob, BlobId
+from aijson.repos.blob_repo import BlobRepo
+from aijson.repos.cache_repo import CacheRepo
+from aijson.services.action_service import ActionService
+from aijson.utils.async_utils import Timer
+
+
+def collect_blob_ids(value: Any, blob_ids: set[BlobId]) -> None:
+    """
+    Add the ids of all blobs referenced in `value` to `blob_ids`,
+    looking into models, containers and (nested) JSON strings like cached outputs.
+    """
+    if isinstance(value, Blob):
+        blob_ids.add(value.id)
+    elif isinstance(value, BaseModel):
+        collect_blob_ids(value.__dict__, blob_ids)
+    elif isinstance(value, dict):
+        if isinstance(value.get("id"), str) and set(value) <= {"id", "file_extension"}:
+            # a serialized blob
+            blob_ids.add(value["id"])
+            return
+        for item in value.values():
+            collect_blob_ids(item, blob_ids)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            collect_blob_ids(item, blob_ids)
+    elif isinstance(value, bytes):
+        try:
+            collect_blob_ids(value.decode(), blob_ids)
+        except UnicodeDecodeError:
+            pass
+    elif isinstance(value, str) and value.lstrip()[:1] in ("{", "["):
+        try:
+            collect_blob_ids(json.loads(value), blob_ids)
+        except json.JSONDecodeError:
+            pass
+
+
+class BlobCollectionResult(BaseModel):
+    cached_values: int = 0
+    reachable_blobs: int = 0
+    stored_blobs: int = 0
+    orphaned_blobs: int = 0
+    deleted_blobs: int = 0
+    unknown_age_blobs: int = 0
+
+
+class BlobGarbageCollector:
+    """
+    Deletes blobs that no cached value refers to anymore, by mark and sweep.
+
+    Marking walks the values in the cache namespaces and collects the blob ids they reference;
+    sweeping lists the blobs in the blob namespaces and deletes the unreferenced ones,
+    in batches of `batch_size` and at most `max_deletes_per_second`.
+    Blobs written or used less than `min_age` seconds before marking started are kept,
+    as actions still running may not have cached the outputs referring to them yet;
+    so are blobs whose age the backend doesn't know.
+
+    If the blob repo uses content chunking (or has before), each namespace's chunks are then swept as well,
+    keeping those referenced by the blobs that remain.
+    """
+
+    def __init__(
+        self,
+        cache_repo: CacheRepo,
+        blob_repo: BlobRepo,
+        min_age: float = 3600,
+        batch_size: int = 500,
+        max_deletes_per_second: None | float = None,
+    ):
+        self.cache_repo = cache_repo
+        self.blob_repo = blob_repo
+        self.min_age = min_age
+        self.batch_size = batch_size
+        self.max_deletes_per_second = max_deletes_per_second
+
+    async def mark(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        cache_namespaces: None | list[str] = None,
+    ) -> tuple[set[BlobId], int]:
+        """
+        Collect the ids of blobs referenced from the cache, and the number of cached values read.
+        """
+        if cache_namespaces is not None:
+            # actions' outputs are also kept in namespaces derived from theirs
+            cache_namespaces = list(
+                dict.fromkeys(
+                    derived_namespace
+                    for namespace in cache_namespaces
+                    for derived_namespace in [
+                        namespace,
+                        *ActionService.get_derived_cache_namespaces(namespace),
+                    ]
+                )
+            )
+        blob_ids: set[BlobId] = set()
+        count = 0
+        async for _, _, value in self.cache_repo.iter_values(
+            log, namespaces=cache_namespaces, batch_size=self.batch_size
+        ):
+            collect_blob_ids(value, blob_ids)
+            count += 1
+        return blob_ids, count
+
+    async def collect(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        cache_namespaces: None | list[str] = None,
+        blob_namespaces: None | list[str] = None,
+        dry_run: bool = False,
+    ) -> BlobCollectionResult:
+        """
+        Delete orphaned blobs from `blob_namespaces` (defaults to the blob repo's default namespace),
+        considering references from `cache_namespaces` (defaults to all)
+        and the namespaces derived from them (`<namespace>__stale`, `__stream`, etc.).
+        With `dry_run` set, orphaned blobs are only counted.
+        """
+        if blob_namespaces is None:
+            blob_namespaces = [self.blob_repo.default_namespace]
+
+        timer = Timer()
+        timer.start()
+        # anything saved from here on may be referenced by values not yet cached
+        keep_after = time.time() - self.min_age
+        reachable_ids, cached_values = await self.mark(log, cache_namespaces)
+        result = BlobCollectionResult(
+            cached_values=cached_values,
+            reachable_blobs=len(reachable_ids),
+        )
+
+        for namespace in blob_namespaces:
+            await self._sweep(
+                log, namespace, reachable_ids, keep_after, dry_run, result
+            )
+            chunk_namespace = self.blob_repo.get_chunk_namespace(namespace)
+            # repos read chunked blobs regardless of `content_chunking`, so they may hold some anyway
+            if self.blob_repo.content_chunking or await self._has_blobs(
+                log, chunk_namespace
+            ):
+                # with `dry_run`, the orphaned blobs' chunks still count as referenced
+                chunk_ids = await self._mark_chunks(log, namespace)
+                await self._sweep(
+                    log,
+                    chunk_namespace,
+                    chunk_ids,
+                    keep_after,
+                    dry_run,
+                    result,
+                )
+
+        timer.end()
+        if result.unknown_age_blobs:
+            log.warning(
+                "Kept unreferenced blobs of unknown age",
+                unknown_age_blobs=result.unknown_age_blobs,
+            )
+        log.info(
+            "Collected orphaned blobs",
+            dry_run=dry_run,
+            duration=timer.wall_time,
+            **result.model_dump(),
+        )
+        return result
+
+    async def _has_blobs(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> bool:
+        async with aclosing(self.blob_repo.list_blobs(log, namespace)) as blobs:
+            async for _ in blobs:
+                return True
+        return False
+
+    async def _mark_chunks(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+    ) -> set[BlobId]:
+        chunk_ids = set()
+        async for blob, _ in self.blob_repo.list_blobs(log, namespace):
+            chunks = await self.blob_repo.get_chunks(log, blob, namespace)
+            if chunks is not None:
+                chunk_ids.update(chunk_blob.id for chunk_blob, _ in chunks)
+        return chunk_ids
+
+    async def _sweep(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        namespace: str,
+        reachable_ids: set[BlobId],
+        keep_after: float,
+        dry_run: bool,
+        result: BlobCollectionResult,
+    ) -> None:
+        orphans = []
+        async for blob, last_used in self.blob_repo.list_blobs(log, namespace):
+            result.stored_blobs += 1
+            if blob.id in reachable_ids:
+                continue
+            if last_used is None:
+                # may have been saved moments ago
+                result.unknown_age_blobs += 1
+                continue
+            if last_used >= keep_after:
+                continue
+            result.orphaned_blobs += 1
+            if dry_run:
+                continue
+            orphans.append(blob)
+            if len(orphans) >= self.batch_size:
+                result.deleted_blobs += await self._delete_batch(
+                    log, orphans, namespace
+                )
+                orphans = []
+        if orphans:
+            result.deleted_blobs += await self._delete_batch(log, orphans, namespace)
+
+    async def _delete_batch(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        blobs: list[Blob],
+        namespace: str,
+    ) -> int:
+        started_at = time.monotonic()
+        try:
+            await self.blob_repo.delete_many(log, blobs, namespace)
+            deleted = len(blobs)
+        except Exception as e:
+            log.warning(
+                "Blob garbage collection error",
+                namespace=namespace,
+                exc_info=e,
+            )
+            deleted = 0
+        if self.max_deletes_per_second is not None:
+            elapsed = time.monotonic() - started_at
+            await asyncio.sleep(
+                max(0.0, len(blobs) / self.max_deletes_per_second - elapsed)
+            )
+        return deleted
@@ -1,7 +1,11 @@
+import asyncio
 import hashlib
 import os
+import threading
+import time
 import uuid
-from unittest.mock import patch, AsyncMock, ANY
+from contextlib import asynccontextmanager
+from unittest.mock import patch, AsyncMock, ANY, MagicMock
 
 import pytest
 import tenacity
@@ -9,6 +13,13 @@ from boto3.exceptions import ResourceLoadException
 from botocore.exceptions import EndpointConnectionError
 
 from aijson.models.blob import Blob
+from aijson.repos.blob_repo import (
+    FilesystemBlobRepo,
+    InMemoryBlobRepo,
+    RedisBlobRepo,
+    S3BlobRepo,
+)
+from aijson.repos.local_blob_cache import LocalBlobCache
 
 
 @pytest.fixture
@@ -51,6 +62,78 @@ async def test_multi_retrieve(log, blob_repo, blob_value):
     assert retrieved_values == [blob_value, value_2]
 
 
+async def test_multi_retrieve_bounded(log, blob_repo, blob_value):
+    blobs = [await blob_repo.save(log, f"value {i}".encode()) for i in range(10)]
+    missing_blob = Blob(id="nonexistent")
+    retrieved_values = await blob_repo.multi_retrieve(
+        log, blobs + [missing_blob, blobs[0]], concurrency=3
+    )
+    assert retrieved_values == [f"value {i}".encode() for i in range(10)] + [
+        None,
+        b"value 0",
+    ]
+
+
+async def test_multi_retrieve_partial_failure(log, temp_dir, blob_value, log_history):
+    blob_repo = FilesystemBlobRepo(temp_dir=temp_dir)
+    saved_blob = await blob_repo.save(log, blob_value)
+    failing_blob = await blob_repo.save(log, b"Another value")
+    read = blob_repo._read
+
+    def flaky_read(blob, namespace):
+        if blob == failing_blob:
+            raise OSError("disk error")
+        return read(blob, namespace)
+
+    with patch.object(blob_repo, "_read", flaky_read):
+        retrieved_values = await blob_repo.multi_retrieve(
+            log, [saved_blob, failing_blob]
+        )
+    assert retrieved_values == [blob_value, None]
+    assert "Blob retrieve error" in [log["event"] for log in log_history]
+
+
+async def test_save_stream(log, blob_repo, blob_value):
+    async def chunks():
+        for offset in range(0, len(blob_value), 4):
+            yield blob_value[offset : offset + 4]
+
+    saved_blob = await blob_repo.save_stream(log, chunks(), file_extension="txt")
+    assert saved_blob.id == hashlib.sha256(blob_value).hexdigest()
+    assert saved_blob == await blob_repo.save(log, blob_value, file_extension="txt")
+    assert await blob_repo.retrieve(log, saved_blob) == blob_value
+
+
+async def test_save_file(log, blob_repo, blob_value, temp_dir):
+    path = os.path.join(temp_dir, "upload.bin")
+    with open(path, "wb") as f:
+        f.write(blob_value)
+    saved_blob = await blob_repo.save_file(log, path)
+    assert saved_blob.id == hashlib.sha256(blob_value).hexdigest()
+    assert await blob_repo.retrieve(log, saved_blob) == blob_value
+
+
+async def test_retrieve_stream(log, blob_repo, blob_value):
+    saved_blob = await blob_repo.save(log, blob_value)
+    chunks = [
+        chunk
+        async for chunk in blob_repo.retrieve_stream(log, saved_blob, chunk_size=4)
+    ]
+    assert b"".join(chunks) == blob_value
+
+    with pytest.raises(ValueError):
+        async for _ in blob_repo.retrieve_stream(log, Blob(id="nonexistent")):
+            pass
+
+
+async def test_retrieve_range(log, blob_repo, blob_value):
+    saved_blob = await blob_repo.save(log, blob_value)
+    assert await blob_repo.retrieve_range(log, saved_blob, 2, 5) == blob_value[2:5]
+    assert await blob_repo.retrieve_range(log, saved_blob, 3) == blob_value[3:]
+    assert await blob_repo.retrieve_range(log, saved_blob, 1000) == b""
+    assert await blob_repo.retrieve_range(log, Blob(id="nonexistent"), 0) is None
+
+
 async def test_exists(log, blob_repo, blob_value):
     saved_blob = await blob_repo.save(log, blob_value)
     exists = await blob_repo.exists(log, saved_blob)
@@ -60,6 +143,39 @@ async def test_exists(log, blob_repo, blob_value):
     assert exists is False
 
 
+async def test_exists_many(log, blob_repo, blob_value, blob_value_2):
+    saved_blob = await blob_repo.save(log, blob_value)
+    saved_blob_2 = await blob_repo.save(log, blob_value_2)
+    non_existent_blob = Blob(id="nonexistent")
+    exists = await blob_repo.exists_many(
+        log, [saved_blob, non_existent_blob, saved_blob_2]
+    )
+    assert exists == [True, False, True]
+
+
+async def test_exists_many_cache(log, blob_repo, blob_value):
+    saved_blob = await blob_repo.save(log, blob_value)
+    with patch.object(blob_repo, "_exists_many", AsyncMock()) as exists_many:
+        assert await blob_repo.exists_many(log, [saved_blob]) == [True]
+        exists_many.assert_not_called()
+
+    # deleting invalidates the existence cache
+    await blob_repo.delete(log, saved_blob)
+    assert await blob_repo.exists_many(log, [saved_blob]) == [False]
+
+
+async def test_exists_cache_bounded(log, temp_dir):
+    blob_repo = InMemoryBlobRepo(temp_dir=temp_dir, exists_cache_ttl=60)
+    with patch("aijson.repos.blob_repo._MAX_KNOWN_BLOBS", 3):
+        for i in range(5):
+            blob_repo._remember_exists(Blob(id=str(i)), "bounded")
+    assert list(blob_repo._known_blobs) == [
+        ("bounded", "2"),
+        ("bounded", "3"),
+        ("bounded", "4"),
+    ]
+
+
 async def test_save_with_file_extension(log, blob_repo, blob_value):
     file_extension = "txt"
     saved_blob = await blob_repo.save(log, blob_value, file_extension=file_extension)
@@ -260,3 +376,415 @@ async def test_s3_client_blocking(
             "log_level": "warning",
             "func": s3_blob_repo._S3BlobRepo__exists,
         }
+
+
+async def test_s3_client_reused(log, s3_blob_repo, blob_value):
+    blob = await s3_blob_repo.save(log, blob_value)
+    assert await s3_blob_repo.retrieve(log, blob) == blob_value
+    assert await s3_blob_repo.exists(log, blob)
+    await s3_blob_repo.delete(log, blob)
+
+    # only the client opened on startup
+    assert s3_blob_repo.connection_metrics["clients_opened"] == 1
+    assert s3_blob_repo.connection_metrics["reuses"] > 1
+
+
+async def test_s3_client_opened_lazily(log, s3_blob_repo, blob_value):
+    await s3_blob_repo.close()
+    s3_blob_repo.connection_metrics["clients_opened"] = 0
+
+    # without `on_startup`, concurrent first uses share one client
+    blobs = [Blob(id=str(i)) for i in range(5)]
+    await asyncio.gather(*[s3_blob_repo.exists(log, blob) for blob in blobs])
+    assert s3_blob_repo.connection_metrics["clients_opened"] == 1
+
+
+async def test_s3_pool_closed_across_loops(log, log_history, temp_dir):
+    s3_blob_repo = S3BlobRepo(
+        temp_dir=temp_dir,
+        bucket_name="bucket",
+        aws_access_key_id="key",
+        aws_secret_access_key="secret",
+    )
+    closed_loops = []
+
+    @asynccontextmanager
+    async def _open_s3_resource():
+        try:
+            yield MagicMock()
+        finally:
+            closed_loops.append(asyncio.get_running_loop())
+
+    with patch.object(s3_blob_repo, "_open_s3_resource", _open_s3_resource):
+        # a pool opened on a loop that is still running is closed on that loop
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever)
+        thread.start()
+        try:
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(
+                    s3_blob_repo._get_s3_pool(), other_loop
+                )
+            )
+            await s3_blob_repo._get_s3_pool()
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop)
+            )
+            assert closed_loops == [other_loop]
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+
+        # one left on a stopped loop can't be closed, so it is logged
+        await asyncio.to_thread(asyncio.run, s3_blob_repo._get_s3_pool())
+        log_history.clear()
+        await s3_blob_repo._get_s3_pool()
+        assert [entry["event"] for entry in log_history] == [
+            "Abandoned S3 connection pool of a stopped event loop; call `close` before it stops"
+        ]
+        await s3_blob_repo.close()
+        assert closed_loops[-1] is asyncio.get_running_loop()
+
+
+async def test_s3_multipart(log, s3_blob_repo, temp_dir):
+    s3_blob_repo.multipart_chunk_size = 5 * 1024 * 1024
+    value = os.urandom(11 * 1024 * 1024)
+    path = os.path.join(temp_dir, "large.bin")
+    with open(path, "wb") as f:
+        f.write(value)
+
+    saved_blob = await s3_blob_repo.save_file(log, path, namespace="multipart")
+    assert saved_blob.id == hashlib.sha256(value).hexdigest()
+
+    local_path = await s3_blob_repo.download(log, saved_blob, namespace="multipart")
+    with open(local_path, "rb") as f:
+        assert f.read() == value
+    assert (
+        await s3_blob_repo.retrieve_range(
+            log, saved_blob, 5 * 1024 * 1024 - 2, 5 * 1024 * 1024 + 2, "multipart"
+        )
+        == value[5 * 1024 * 1024 - 2 : 5 * 1024 * 1024 + 2]
+    )
+
+
+async def test_filesystem_sharded_layout(log, temp_dir, blob_value):
+    blob_repo = FilesystemBlobRepo(temp_dir=temp_dir)
+    saved_blob = await blob_repo.save(log, blob_value, namespace="sharded")
+    blob_id = saved_blob.id
+    assert os.path.exists(
+        os.path.join(temp_dir, "blobs", "sharded", blob_id[:2], blob_id[2:4], blob_id)
+    )
+    # no temporary files are left behind
+    assert os.listdir(
+        os.path.join(temp_dir, "blobs", "sharded", blob_id[:2], blob_id[2:4])
+    ) == [blob_id]
+
+    # blobs in the older flat layout are still found
+    legacy_value = b"Legacy value"
+    legacy_blob = Blob(id=hashlib.sha256(legacy_value).hexdigest())
+    with open(os.path.join(temp_dir, "blobs", "sharded", legacy_blob.id), "wb") as f:
+        f.write(legacy_value)
+    assert await blob_repo.exists(log, legacy_blob, namespace="sharded")
+    assert await blob_repo.retrieve(log, legacy_blob, namespace="sharded") == (
+        legacy_value
+    )
+    await blob_repo.delete(log, legacy_blob, namespace="sharded")
+    assert not await blob_repo.exists(log, legacy_blob, namespace="sharded")
+
+
+async def test_filesystem_retrieve_mmap(log, temp_dir, blob_value):
+    blob_repo = FilesystemBlobRepo(temp_dir=temp_dir)
+    saved_blob = await blob_repo.save(log, blob_value)
+    view = await blob_repo.retrieve_mmap(log, saved_blob)
+    assert view is not None
+    assert view.readonly
+    assert view[2:5] == blob_value[2:5]
+    assert bytes(view) == blob_value
+    view.release()
+
+    empty_blob = await blob_repo.save(log, b"")
+    assert await blob_repo.retrieve_mmap(log, empty_blob) == b""
+    assert await blob_repo.retrieve_mmap(log, Blob(id="nonexistent")) is None
+
+
+async def test_local_cache(log, temp_dir, blob_value):
+    local_cache = LocalBlobCache(cache_dir=os.path.join(temp_dir, "cache"))
+    blob_repo = InMemoryBlobRepo(temp_dir=temp_dir, local_cache=local_cache)
+    saved_blob = await blob_repo.save(log, blob_value, file_extension="txt")
+    saved_blob_2 = await blob_repo.save(log, b"Another value")
+
+    assert await blob_repo.retrieve(log, saved_blob) == blob_value
+    path = await blob_repo.download(log, saved_blob)
+    with open(path, "rb") as f:
+        assert f.read() == blob_value
+    assert local_cache.get(saved_blob.id) == blob_value
+
+    # cached blobs are served locally, also to other repos on the host
+    other_repo = InMemoryBlobRepo(
+        temp_dir=os.path.join(temp_dir, "other"), local_cache=local_cache
+    )
+    with patch.object(other_repo, "_retrieve", AsyncMock()) as retrieve:
+        assert await other_repo.retrieve(log, saved_blob) == blob_value
+        retrieve.assert_not_called()
+    with patch.object(other_repo, "_download", AsyncMock()) as download:
+        other_path = await other_repo.download(log, saved_blob)
+        download.assert_not_called()
+    with open(other_path, "rb") as f:
+        assert f.read() == blob_value
+    with patch.object(
+        other_repo, "_multi_retrieve", AsyncMock(return_value=[b"Another value"])
+    ) as multi_retrieve:
+        assert await other_repo.multi_retrieve(log, [saved_blob, saved_blob_2]) == [
+            blob_value,
+            b"Another value",
+        ]
+        multi_retrieve.assert_called_once()
+        assert multi_retrieve.call_args.args[1] == [saved_blob_2]
+
+    await blob_repo.delete(log, saved_blob)
+    assert local_cache.get(saved_blob.id) is None
+
+
+async def test_local_cache_errors_are_misses(log, temp_dir, blob_value):
+    local_cache = LocalBlobCache(cache_dir=os.path.join(temp_dir, "cache"))
+    blob_repo = InMemoryBlobRepo(temp_dir=temp_dir, local_cache=local_cache)
+    saved_blob = await blob_repo.save(log, blob_value)
+
+    error = PermissionError("mock")
+    with (
+        patch.object(local_cache, "get", side_effect=error),
+        patch.object(local_cache, "link", side_effect=error),
+    ):
+        assert await blob_repo.retrieve(log, saved_blob) == blob_value
+        assert await blob_repo.multi_retrieve(log, [saved_blob]) == [blob_value]
+        path = await blob_repo.download(log, saved_blob)
+    with open(path, "rb") as f:
+        assert f.read() == blob_value
+
+
+async def test_in_memory_spill(log, temp_dir):
+    max_bytes = InMemoryBlobRepo._store.max_bytes
+    try:
+        InMemoryBlobRepo.set_max_bytes(100)
+        blob_repo = InMemoryBlobRepo(temp_dir=temp_dir)
+        values = [bytes([i]) * 60 for i in range(3)]
+        blobs = [await blob_repo.save(log, value) for value in values]
+        assert InMemoryBlobRepo._store.memory_bytes <= 100
+
+        # spilled blobs are still there
+        assert await blob_repo.exists_many(log, blobs) == [True, True, True]
+        assert await blob_repo.multi_retrieve(log, blobs) == values
+        assert await blob_repo.retrieve(log, blobs[0]) == values[0]
+
+        # downloads are written once per blob
+        path = await blob_repo.download(log, blobs[1])
+        with open(path, "rb") as f:
+            assert f.read() == values[1]
+        blob_repo.blob_paths.clear()
+        assert await blob_repo.download(log, blobs[1]) == path
+        assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+        await blob_repo.delete(log, blobs[0])
+        assert await blob_repo.retrieve(log, blobs[0]) is None
+    finally:
+        InMemoryBlobRepo.set_max_bytes(max_bytes)
+        InMemoryBlobRepo._store.clear()
+
+
+async def test_ttl_refresh_rate_limited(log, temp_dir, blob_value):
+    blob_repo = InMemoryBlobRepo(temp_dir=temp_dir, ttl=120, ttl_refresh_interval=60)
+    saved_blob = await blob_repo.save(log, blob_value, namespace="ttl")
+    with patch.object(blob_repo, "_extend_ttl", AsyncMock()) as extend_ttl:
+        # just saved, so nothing to refresh yet
+        assert await blob_repo.exists(log, saved_blob, namespace="ttl")
+        extend_ttl.assert_not_called()
+
+        blob_repo._ttl_refreshed_at.clear()
+        assert await blob_repo.retrieve(log, saved_blob, namespace="ttl")
+        assert await blob_repo.exists_many(log, [saved_blob], namespace="ttl") == [True]
+        extend_ttl.assert_called_once_with(ANY, saved_blob, "ttl")
+
+
+def test_ttl_refresh_interval(temp_dir):
+    assert (
+        InMemoryBlobRepo(temp_dir=temp_dir, ttl=600)._get_ttl_refresh_interval() == 150
+    )
+    with pytest.raises(ValueError):
+        InMemoryBlobRepo(temp_dir=temp_dir, ttl=600, ttl_refresh_interval=600)
+
+
+async def test_filesystem_sweep(log, temp_dir, blob_value, blob_value_2):
+    blob_repo = FilesystemBlobRepo(temp_dir=temp_dir, ttl=60, ttl_refresh_interval=0)
+    old_blob = await blob_repo.save(log, blob_value, namespace="ttl")
+    used_blob = await blob_repo.save(log, blob_value_2, namespace="ttl")
+    past = time.time() - 120
+    for saved_blob in [old_blob, used_blob]:
+        os.utime(blob_repo._get_path(saved_blob, "ttl"), (past, past))
+    try:
+        # using a blob records it in its modification time
+        assert await blob_repo.retrieve(log, used_blob, namespace="ttl")
+
+        assert await blob_repo.sweep(log) == 1
+        assert await blob_repo.exists_many(log, [old_blob, used_blob], "ttl") == [
+            False,
+            True,
+        ]
+    finally:
+        await blob_repo.close()
+
+
+async def test_s3_ttl_tags(log, s3_blob_repo, blob_value, blob_value_2):
+    s3_blob_repo.ttl = 60
+    old_blob = await s3_blob_repo.save(log, blob_value, namespace="ttl")
+    used_blob = await s3_blob_repo.save(log, blob_value_2, namespace="ttl")
+
+    # 90 seconds later, only the blob used in the meantime is kept
+    with patch("time.time", return_value=time.time() + 90):
+        await s3_blob_repo._extend_ttl(log, used_blob, "ttl")
+        assert await s3_blob_repo.sweep(log, namespace="ttl") == 1
+    assert await s3_blob_repo.exists_many(log, [old_blob, used_blob], "ttl") == [
+        False,
+        True,
+    ]
+
+
+async def test_s3_reuse_recorded(log, s3_blob_repo, blob_value):
+    await s3_blob_repo.save(log, blob_value, namespace="reused")
+    later = time.time() + 90
+    with patch("time.time", return_value=later):
+        # saving the same contents again is recorded as a use
+        await s3_blob_repo.save(log, blob_value, namespace="reused")
+    [(_, last_used)] = [entry async for entry in s3_blob_repo.list_blobs(log, "reused")]
+    assert last_used >= int(later)
+
+
+async def test_list_blobs_and_delete_many(log, blob_repo, blob_value, blob_value_2):
+    saved_blob = await blob_repo.save(log, blob_value, namespace="listed")
+    saved_blob_2 = await blob_repo.save(
+        log, blob_value_2, file_extension="txt", namespace="listed"
+    )
+    await blob_repo.save(log, b"elsewhere", namespace="other")
+
+    listed = {blob.id: blob async for blob, _ in blob_repo.list_blobs(log, "listed")}
+    assert set(listed) == {saved_blob.id, saved_blob_2.id}
+
+    await blob_repo.delete_many(log, list(listed.values()), namespace="listed")
+    assert await blob_repo.exists_many(log, [saved_blob, saved_blob_2], "listed") == [
+        False,
+        False,
+    ]
+    assert [blob async for blob in blob_repo.list_blobs(log, "listed")] == []
+
+
+async def test_redis_write_behind_batches(log, temp_dir):
+    redis_client = MagicMock()
+    redis_client.aclose = AsyncMock()
+    pipe = redis_client.pipeline.return_value.__aenter__.return_value
+    pipe.set = MagicMock()
+    pipe.execute = AsyncMock(side_effect=ValueError("mock"))
+    with patch("aijson.repos.blob_repo.get_aioredis", return_value=redis_client):
+        blob_repo = RedisBlobRepo(
+            temp_dir=temp_dir, write_behind=True, write_batch_bytes=100, write_delay=60
+        )
+    blobs = [Blob(id="a"), Blob(id="b")]
+    for blob in blobs:
+        blob_repo._remember_exists(blob, "buffered")
+        blob_repo.write_buffer.set(log, blob_repo._get_key(blob, "buffered"), b"x" * 60)
+    # batches are capped by size, not only by count
+    await asyncio.sleep(0.01)
+    assert pipe.execute.call_count == 1
+    assert pipe.set.call_count == 2
+
+    # blobs whose writes failed aren't assumed to exist anymore
+    assert not any(blob_repo._is_known_to_exist(blob, "buffered") for blob in blobs)
+    await blob_repo.close()
+
+
+async def test_redis_chunked(log, blob_repo, temp_dir):
+    if not isinstance(blob_repo, RedisBlobRepo):
+        pytest.skip("Only Redis stores blobs in parts")
+    blob_repo.chunk_size = 10
+    blob_repo.transfer_window = 2
+    value = os.urandom(256)
+    saved_blob = await blob_repo.save(log, value, namespace="chunked")
+    key = blob_repo._get_key(saved_blob, "chunked")
+    assert len(await blob_repo.redis.get(key)) < len(value)
+
+    assert await blob_repo.retrieve(log, saved_blob, namespace="chunked") == value
+    assert (
+        await blob_repo.retrieve_range(log, saved_blob, 5, 27, namespace="chunked")
+        == value[5:27]
+    )
+    chunks = [
+        chunk async for chunk in blob_repo.retrieve_stream(log, saved_blob, "chunked")
+    ]
+    assert b"".join(chunks) == value
+
+    path = os.path.join(temp_dir, "chunked.bin")
+    with open(path, "wb") as f:
+        f.write(value * 2)
+    saved_file_blob = await blob_repo.save_file(log, path, namespace="chunked")
+    local_path = await blob_repo.download(log, saved_file_blob, namespace="chunked")
+    with open(local_path, "rb") as f:
+        assert f.read() == value * 2
+
+    await blob_repo.delete_many(log, [saved_blob, saved_file_blob], "chunked")
+    assert await blob_repo.redis.keys(f"{key}*") == []
+
+
+async def test_content_chunking(log, blob_repo, temp_dir):
+    blob_repo.content_chunking = True
+    blob_repo.content_chunk_min_size = 64
+    blob_repo.content_chunk_avg_size = 256
+    blob_repo.content_chunk_max_size = 1024
+    value = os.urandom(20_000)
+    edited_value = value[:10_000] + b"edit" + value[10_000:]
+    chunk_namespace = blob_repo.get_chunk_namespace("chunked")
+
+    saved_blob = await blob_repo.save(log, value, namespace="chunked")
+    chunks = await blob_repo.get_chunks(log, saved_blob, "chunked")
+    assert sum(size for _, size in chunks) == len(value)
+    chunk_count = len(
+        [blob async for blob in blob_repo.list_blobs(log, chunk_namespace)]
+    )
+
+    path = os.path.join(temp_dir, "edited.bin")
+    with open(path, "wb") as f:
+        f.write(edited_value)
+    edited_blob = await blob_repo.save_file(log, path, namespace="chunked")
+    new_chunk_count = len(
+        [blob async for blob in blob_repo.list_blobs(log, chunk_namespace)]
+    )
+    # only the chunks around the edit are new
+    assert chunk_count < new_chunk_count <= chunk_count + 5
+
+    assert await blob_repo.retrieve(log, saved_blob, namespace="chunked") == value
+    assert await blob_repo.multi_retrieve(
+        log, [saved_blob, edited_blob], namespace="chunked"
+    ) == [value, edited_value]
+    assert (
+        await blob_repo.retrieve_range(log, edited_blob, 9_000, 11_000, "chunked")
+        == edited_value[9_000:11_000]
+    )
+    streamed = [
+        chunk
+        async for chunk in blob_repo.retrieve_stream(
+            log, edited_blob, "chunked", chunk_size=1000
+        )
+    ]
+    assert b"".join(streamed) == edited_value
+    local_path = await blob_repo.download(log, edited_blob, namespace="chunked")
+    with open(local_path, "rb") as f:
+        assert f.read() == edited_value
+
+    # small values are stored whole
+    small_blob = await blob_repo.save(log, b"small", namespace="chunked")
+    assert await blob_repo.get_chunks(log, small_blob, "chunked") is None
+    assert await blob_repo.retrieve(log, small_blob, namespace="chunked") == b"small"
+
+    # repos that don't chunk what they save still read chunked blobs
+    blob_repo.content_chunking = False
+    assert await blob_repo.retrieve(log, edited_blob, namespace="chunked") == (
+        edited_value
+    )
@@ -138,13 +138,26 @@
 #         )
 #         tenacious_get = self._wrap_tenacity(log, timeout_get)
 #         return await tenacious_get()
+import asyncio
+import json
+import multiprocessing
 import os
-from unittest.mock import MagicMock, ANY, patch
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, ANY, patch
 
 import pytest
 import tenacity
 
-from aijson.repos.cache_repo import RedisCacheRepo
+from aijson.log_config import get_logger
+from aijson.repos.cache_repo import (
+    CacheRepo,
+    RedisCacheRepo,
+    ShelveCacheRepo,
+    TieredCacheRepo,
+)
+from aijson.utils.misc_utils import try_lock_file
+from aijson.utils.redis_utils import RedisWriteBuffer
 
 
 async def test_save_retrieve(log, cache_repo):
@@ -155,8 +168,220 @@ async def test_save_retrieve(log, cache_repo):
     assert retrieved_value == value
 
 
+async def test_delete(log, cache_repo):
+    await cache_repo.store(log, "test-key", "test-value", 1)
+    await cache_repo.delete(log, "test-key", 1)
+    assert await cache_repo.retrieve(log, "test-key", 1) is None
+
+
+async def test_expire(log, cache_repo):
+    await cache_repo.store(log, "test-key", "test-value", 1, expire=60)
+    assert await cache_repo.retrieve(log, "test-key", 1) == "test-value"
+
+    with patch("time.time", return_value=time.time() + 61):
+        assert await cache_repo.retrieve(log, "test-key", 1) is None
+
+
+async def test_sweep(log, cache_repo):
+    await cache_repo.store(log, "expiring", "test-value", 1, expire=60)
+    await cache_repo.store(log, "persistent", "test-value", 1)
+
+    with patch("time.time", return_value=time.time() + 61):
+        assert await cache_repo.sweep(log) == 1
+    assert await cache_repo.retrieve(log, "persistent", 1) == "test-value"
+    await cache_repo.close()
+
+
+async def test_max_bytes_eviction(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir, max_bytes=300)
+    await cache_repo.store(log, "first", "a" * 100, 1)
+    await cache_repo.store(log, "second", "b" * 100, 1)
+    # reading `first` makes `second` the least recently used
+    assert await cache_repo.retrieve(log, "first", 1) == "a" * 100
+    await cache_repo.store(log, "third", "c" * 100, 1)
+
+    assert await cache_repo.retrieve(log, "first", 1) == "a" * 100
+    assert await cache_repo.retrieve(log, "second", 1) is None
+    assert await cache_repo.retrieve(log, "third", 1) == "c" * 100
+    await cache_repo.close()
+
+    # the budget is enforced on what is already on disk
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir, max_bytes=150)
+    await cache_repo.store(log, "fourth", "d" * 10, 1)
+    assert [
+        await cache_repo.retrieve(log, key, 1) is not None
+        for key in ("first", "third", "fourth")
+    ].count(True) == 2
+    await cache_repo.close()
+
+
+async def test_index_built_in_thread(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir)
+    await cache_repo.store(log, "first", "a" * 100, 1)
+    await cache_repo.close()
+
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir, max_bytes=300)
+    build_index = cache_repo._build_index
+    threads = []
+
+    def _build_index():
+        threads.append(threading.current_thread())
+        return build_index()
+
+    cache_repo._build_index = _build_index
+    # concurrent first uses share a single build
+    await asyncio.gather(
+        cache_repo.retrieve(log, "first", 1),
+        cache_repo.store(log, "second", "b" * 100, 1),
+    )
+    assert threads and threads[0] is not threading.main_thread()
+    assert len(threads) == 1
+    assert len(cache_repo._index) == 2
+    await cache_repo.close()
+
+
+async def test_max_bytes_tinylfu_admission(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir, max_bytes=250, eviction="tinylfu")
+    await cache_repo.store(log, "popular", "a" * 100, 1)
+    await cache_repo.store(log, "other", "b" * 100, 1)
+    for _ in range(3):
+        await cache_repo.retrieve(log, "popular", 1)
+        await cache_repo.retrieve(log, "other", 1)
+
+    # a value seen once doesn't displace popular ones
+    await cache_repo.store(log, "one_off", "c" * 100, 1)
+    assert await cache_repo.retrieve(log, "one_off", 1) is None
+    assert await cache_repo.retrieve(log, "popular", 1) == "a" * 100
+    await cache_repo.close()
+
+
+async def test_compact(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir)
+    for i in range(100):
+        await cache_repo.store(log, f"key{i}", "value" * 100, 1)
+    for i in range(99):
+        await cache_repo.delete(log, f"key{i}", 1)
+    disk_usage = cache_repo.get_disk_usage("global")
+
+    assert await cache_repo.compact(log) > 0
+    assert cache_repo.get_disk_usage("global") < disk_usage
+    assert await cache_repo.retrieve(log, "key99", 1) == "value" * 100
+
+
+async def test_compact_locked(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir)
+    for i in range(100):
+        await cache_repo.store(log, f"key{i}", "value" * 100, 1)
+    for i in range(99):
+        await cache_repo.delete(log, f"key{i}", 1)
+    disk_usage = cache_repo.get_disk_usage("global")
+
+    # another process compacting the same directory holds the lock
+    with try_lock_file(os.path.join(temp_dir, ".compact.lock")) as locked:
+        assert locked
+        assert await cache_repo.compact(log) == 0
+    assert cache_repo.get_disk_usage("global") == disk_usage
+
+    assert await cache_repo.compact(log) > 0
+
+
+def _store_values(temp_dir: str, count: int) -> None:
+    async def _store():
+        cache_repo = ShelveCacheRepo(temp_dir=temp_dir, sweep_interval=None)
+        for i in range(count):
+            await cache_repo.store(get_logger(), f"new{i}", "value" * 100, 1)
+        await cache_repo.close()
+
+    asyncio.run(_store())
+
+
+async def test_compact_while_another_process_writes(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir)
+    for i in range(200):
+        await cache_repo.store(log, f"old{i}", "value" * 100, 1)
+        await cache_repo.delete(log, f"old{i}", 1)
+
+    process = multiprocessing.get_context("spawn").Process(
+        target=_store_values, args=(temp_dir, 200)
+    )
+    process.start()
+    while process.is_alive():
+        await cache_repo.compact(log)
+        await cache_repo.store(log, "garbage", "value" * 1000, 1)
+        await asyncio.sleep(0.01)
+    process.join()
+    assert process.exitcode == 0
+
+    # no write was dropped by swapping in compacted files
+    values = await cache_repo.retrieve_many(
+        log, [(f"new{i}", 1, "global") for i in range(200)]
+    )
+    assert values == ["value" * 100] * 200
+    await cache_repo.close()
+
+
+async def test_sweep_compacts(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir)
+    for i in range(100):
+        await cache_repo.store(log, f"key{i}", "value" * 100, 1, expire=60)
+
+    with patch("time.time", return_value=time.time() + 61):
+        assert await cache_repo.sweep(log) == 100
+    assert cache_repo.get_disk_usage("global") < 1024
+    await cache_repo.close()
+
+
+async def test_retrieve_many(log, cache_repo):
+    await cache_repo.store(log, "first", "first-value", 1, namespace="a")
+    await cache_repo.store(log, "second", "second-value", 2, namespace="b")
+
+    values = await cache_repo.retrieve_many(
+        log,
+        [
+            ("second", 2, "b"),
+            ("missing", 1, "a"),
+            ("first", 1, "a"),
+        ],
+    )
+    assert values == ["second-value", None, "first-value"]
+
+
+@pytest.fixture
+def compressing_cache_repo(temp_dir):
+    return ShelveCacheRepo(
+        temp_dir=temp_dir,
+        compression="zlib",
+        compression_threshold=16,
+    )
+
+
+async def test_compression(log, compressing_cache_repo):
+    value = json.dumps({"result": "test " * 100})
+    await compressing_cache_repo.store(log, "test-key", value, 1)
+
+    stored = await compressing_cache_repo._retrieve(log, "test-key:v1", "global")
+    assert isinstance(stored, bytes)
+    assert len(stored) < len(value)
+    assert await compressing_cache_repo.retrieve(log, "test-key", 1) == value
+
+    # values under the threshold are stored as they are
+    await compressing_cache_repo.store(log, "small-key", "small", 1)
+    assert await compressing_cache_repo._retrieve(log, "small-key:v1", "global") == (
+        "small"
+    )
+
+
+async def test_compression_coexists(log, cache_repo, compressing_cache_repo):
+    value = "test " * 100
+    await cache_repo.store(log, "uncompressed", value, 1)
+    await compressing_cache_repo.store(log, "compressed", value, 1)
+
+    assert await compressing_cache_repo.retrieve(log, "uncompressed", 1) == value
+    assert await cache_repo.retrieve(log, "compressed", 1) == value
+
+
 async def test_save_retrieve_versions(log, cache_repo):
-    versions = [None, 1, 2]
+    versions = [None, 1, 2, "a1b2c3"]
     key = "test-key"
     value = "test-value"
 
@@ -222,3 +447,412 @@ async def test_timeout(
             "log_level": "warning",
             "func": blocking_func,
         }
+
+
+async def test_retrieve_approximate(log, cache_repo):
+    prompt = "Answer the customer: my order has not arrived, it was placed 3 days ago"
+    await cache_repo.store_approximate(log, prompt, "answer", version=1)
+
+    similar_prompt = (
+        "Answer the customer:  my order has not arrived, it was placed 5 days ago"
+    )
+    assert (
+        await cache_repo.retrieve_approximate(
+            log, similar_prompt, version=1, threshold=0.9
+        )
+        == "answer"
+    )
+    assert (
+        await cache_repo.retrieve_approximate(
+            log, "How do I reset my password?", version=1, threshold=0.9
+        )
+        is None
+    )
+    # exact lookups are unaffected, and other versions are not matched
+    assert await cache_repo.retrieve(log, prompt, version=1) is None
+    assert (
+        await cache_repo.retrieve_approximate(log, prompt, version=2, threshold=0.9)
+        is None
+    )
+
+
+async def test_approximate_index_persisted(log, cache_repo, temp_dir):
+    prompt = "Answer the customer: my order has not arrived"
+    await cache_repo.store_approximate(log, prompt, "answer", version=1)
+
+    other_repo = ShelveCacheRepo(temp_dir=temp_dir)
+    assert (
+        await other_repo.retrieve_approximate(log, prompt, version=1, threshold=0.9)
+        == "answer"
+    )
+
+
+async def test_approximate_index_entries(log, cache_repo, temp_dir):
+    prompts = [
+        "Answer the customer: my order has not arrived",
+        "Answer the customer: my refund has not arrived",
+    ]
+    # entries from several workers are all kept
+    other_repo = ShelveCacheRepo(temp_dir=temp_dir)
+    await cache_repo.store_approximate(log, prompts[0], "answer", version=1)
+    await other_repo.store_approximate(log, prompts[1], "refund", version=1, expire=1)
+    index = await ShelveCacheRepo(temp_dir=temp_dir)._load_approximate_index(
+        log, "global__approximate", version=1
+    )
+    assert len(index) == 2
+
+    # and expire with their values
+    with patch("time.time", return_value=time.time() + 2):
+        index = await ShelveCacheRepo(temp_dir=temp_dir)._load_approximate_index(
+            log, "global__approximate", version=1
+        )
+    assert len(index) == 1
+
+
+async def test_approximate_threshold_validated(log, cache_repo):
+    with pytest.raises(ValueError):
+        await cache_repo.retrieve_approximate(log, "key", version=1, threshold=0.5)
+
+
+@pytest.fixture
+def mock_redis_client():
+    redis_client = MagicMock()
+    redis_client.set = AsyncMock()
+    redis_client.get = AsyncMock(return_value=None)
+    redis_client.mget = AsyncMock(side_effect=lambda names: [None for _ in names])
+    redis_client.close = AsyncMock()
+    pipe = redis_client.pipeline.return_value.__aenter__.return_value
+    pipe.set = MagicMock()
+    pipe.execute = AsyncMock()
+
+    with patch("aijson.repos.cache_repo.get_aioredis", return_value=redis_client):
+        yield redis_client
+
+
+async def test_redis_write_behind(log, temp_dir, mock_redis_client):
+    cache_repo = RedisCacheRepo(
+        temp_dir=temp_dir, write_behind=True, write_batch_size=2
+    )
+    pipe = mock_redis_client.pipeline.return_value.__aenter__.return_value
+
+    for i in range(3):
+        await cache_repo.store(log, f"key{i}", f"value{i}", 1)
+    # buffered values are read back without a round trip
+    assert await cache_repo.retrieve(log, "key2", 1) == "value2"
+    assert await cache_repo.retrieve_many(
+        log, [("key2", 1, None), ("missing", 1, None)]
+    ) == ["value2", None]
+    mock_redis_client.get.assert_not_called()
+    assert mock_redis_client.mget.call_args.args == (["global:missing:v1"],)
+
+    await cache_repo.close()
+    mock_redis_client.set.assert_not_called()
+    assert [call.args[0] for call in pipe.set.call_args_list] == [
+        "global:key0:v1",
+        "global:key1:v1",
+        "global:key2:v1",
+    ]
+    assert pipe.execute.call_count == 2
+
+
+async def test_redis_write_behind_delay(log, temp_dir, mock_redis_client):
+    cache_repo = RedisCacheRepo(temp_dir=temp_dir, write_behind=True, write_delay=0.01)
+    pipe = mock_redis_client.pipeline.return_value.__aenter__.return_value
+
+    await cache_repo.store(log, "key", "value", 1)
+    await cache_repo.store(log, "other_key", "value", 1)
+    await asyncio.sleep(0.05)
+    assert pipe.execute.call_count == 1
+    assert pipe.set.call_count == 2
+
+
+async def test_redis_write_buffer_counts_bytes(log):
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value.__aenter__.return_value
+    pipe.set = MagicMock()
+    pipe.execute = AsyncMock()
+    write_buffer = RedisWriteBuffer(redis_client, max_delay=60, max_batch_bytes=100)
+
+    # 40 characters, but 120 bytes once encoded
+    write_buffer.set(log, "key", "€" * 40)
+    await asyncio.sleep(0.01)
+    assert pipe.execute.call_count == 1
+
+
+async def test_redis_flush_key(log, temp_dir, mock_redis_client):
+    cache_repo = RedisCacheRepo(temp_dir=temp_dir, write_behind=True, write_delay=60)
+    pipe = mock_redis_client.pipeline.return_value.__aenter__.return_value
+
+    await cache_repo.flush_key(log, "key", 1)
+    assert pipe.execute.call_count == 0
+
+    await cache_repo.store(log, "key", "value", 1)
+    await cache_repo.flush_key(log, "key", 1)
+    assert pipe.execute.call_count == 1
+    assert "global:key:v1" not in cache_repo.write_buffer
+    await cache_repo.close()
+
+
+async def _wait_for_key_filters(cache_repo: CacheRepo) -> None:
+    await asyncio.gather(*cache_repo._key_filter_tasks.values())
+
+
+async def test_key_filter_skips_backend(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir, key_filter=True)
+    await cache_repo.store(log, "key", "value", version=1)
+
+    with patch.object(cache_repo, "_retrieve", wraps=cache_repo._retrieve) as retrieve:
+        # misses are unknown until the filter is first synced
+        assert await cache_repo.retrieve(log, "missing_key", version=1) is None
+        assert retrieve.call_count == 1
+        await _wait_for_key_filters(cache_repo)
+
+        assert await cache_repo.retrieve(log, "key", version=1) == "value"
+        assert retrieve.call_count == 2
+
+        assert await cache_repo.retrieve(log, "missing_key", version=1) is None
+        assert await cache_repo.retrieve_many(
+            log, [("missing_key", 1, None), ("key", 1, None)]
+        ) == [None, "value"]
+        assert retrieve.call_count == 2
+    await cache_repo.close()
+
+
+async def test_key_filter_sync(log, temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=temp_dir, key_filter=True)
+    other_cache_repo = ShelveCacheRepo(temp_dir=temp_dir)
+
+    assert await cache_repo.retrieve(log, "key", version=1) is None
+    await _wait_for_key_filters(cache_repo)
+    await other_cache_repo.store(log, "key", "value", version=1)
+
+    # keys stored elsewhere are found once the filter is synced again, in the background
+    assert await cache_repo.retrieve(log, "key", version=1) is None
+    cache_repo.key_filter_sync_interval = 0
+    assert await cache_repo.retrieve(log, "key", version=1) is None
+    await _wait_for_key_filters(cache_repo)
+    assert await cache_repo.retrieve(log, "key", version=1) == "value"
+    await cache_repo.close()
+
+
+class _UnlistableCacheRepo(CacheRepo):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = {}
+
+    async def _store(self, log, key, value, namespace, expire):
+        self.values[(namespace, key)] = value
+
+    async def _retrieve(self, log, key, namespace):
+        return self.values.get((namespace, key))
+
+
+async def test_key_filter_unsupported(log, log_history, temp_dir):
+    cache_repo = _UnlistableCacheRepo(temp_dir=temp_dir, key_filter=True)
+    assert not cache_repo.key_filter
+    assert [entry["event"] for entry in log_history] == [
+        "Cache key filter not supported by backend, ignoring `key_filter`"
+    ]
+
+    await cache_repo.store(log, "key", "value", version=1)
+    assert await cache_repo.retrieve(log, "key", version=1) == "value"
+    assert not cache_repo._key_filter_tasks
+    await cache_repo.close()
+
+
+async def test_snapshot_roundtrip(log, temp_dir, compressing_cache_repo):
+    await compressing_cache_repo.store(log, "key", "value" * 1000, version=1)
+    await compressing_cache_repo.store(log, "key", b"bytes", version=2)
+    await compressing_cache_repo.store(
+        log, "other_key", "other", version=1, namespace="other"
+    )
+    path = os.path.join(temp_dir, "snapshot.bin")
+
+    count = await compressing_cache_repo.export_snapshot(log, path)
+    assert count == 3
+
+    imported_cache_repo = ShelveCacheRepo(temp_dir=os.path.join(temp_dir, "imported"))
+    assert await imported_cache_repo.import_snapshot(log, path) == 3
+    assert await imported_cache_repo.retrieve(log, "key", version=1) == "value" * 1000
+    assert await imported_cache_repo.retrieve(log, "key", version=2) == b"bytes"
+    assert (
+        await imported_cache_repo.retrieve(
+            log, "other_key", version=1, namespace="other"
+        )
+        == "other"
+    )
+
+
+async def test_snapshot_filters(log, temp_dir, cache_repo):
+    await cache_repo.store(log, "key", "value", version=1)
+    await cache_repo.store(log, "key", "value_2", version=2)
+    await cache_repo.store(log, "other_key", "other", version=1, namespace="other")
+    path = os.path.join(temp_dir, "snapshot.bin")
+
+    count = await cache_repo.export_snapshot(
+        log, path, namespaces=["global"], versions=[2]
+    )
+    assert count == 1
+
+    imported_cache_repo = ShelveCacheRepo(temp_dir=os.path.join(temp_dir, "imported"))
+    await imported_cache_repo.import_snapshot(log, path)
+    assert await imported_cache_repo.retrieve(log, "key", version=2) == "value_2"
+    assert await imported_cache_repo.retrieve(log, "key", version=1) is None
+    assert (
+        await imported_cache_repo.retrieve(
+            log, "other_key", version=1, namespace="other"
+        )
+        is None
+    )
+
+
+async def test_snapshot_import_batches(log, temp_dir, cache_repo, mock_redis_client):
+    for i in range(3):
+        await cache_repo.store(log, f"key_{i}", "value", version=1)
+        await cache_repo.store(log, f"key_{i}", "other", version=1, namespace="other")
+    path = os.path.join(temp_dir, "snapshot.bin")
+    await cache_repo.export_snapshot(log, path, namespaces=["other", "global"])
+
+    redis_cache_repo = RedisCacheRepo(temp_dir=temp_dir)
+    pipe = mock_redis_client.pipeline.return_value.__aenter__.return_value
+    count = await redis_cache_repo.import_snapshot(
+        log, path, namespaces=["global"], batch_size=2
+    )
+    assert count == 3
+    # one round trip per batch, skipping the batch with only other namespaces
+    assert pipe.execute.call_count == 2
+    assert pipe.set.call_count == 3
+
+
+@pytest.fixture
+def tiered_cache_repo(cache_repo):
+    return TieredCacheRepo(
+        temp_dir=cache_repo.temp_dir,
+        backend=cache_repo,
+        max_bytes=64,
+    )
+
+
+async def test_tiered_write_through(log, cache_repo, tiered_cache_repo):
+    await tiered_cache_repo.store(log, "test-key", "test-value", 1)
+    assert await cache_repo.retrieve(log, "test-key", 1) == "test-value"
+
+    # hits are served from memory
+    with patch.object(cache_repo, "_retrieve") as backend_retrieve:
+        assert await tiered_cache_repo.retrieve(log, "test-key", 1) == "test-value"
+        backend_retrieve.assert_not_called()
+
+
+async def test_tiered_read_through(log, cache_repo, tiered_cache_repo):
+    await cache_repo.store(log, "test-key", "test-value", 1)
+    assert await tiered_cache_repo.retrieve(log, "test-key", 1) == "test-value"
+    assert ("global", "test-key:v1") in tiered_cache_repo.memory
+
+
+async def test_tiered_retrieve_parsed_once(log, cache_repo):
+    # parsed objects count towards the budget too
+    tiered_cache_repo = TieredCacheRepo(
+        temp_dir=cache_repo.temp_dir, backend=cache_repo, max_bytes=1024
+    )
+    await tiered_cache_repo.store(log, "test-key", json.dumps({"a": 1}), 1)
+
+    parse = MagicMock(wraps=json.loads)
+    first = await tiered_cache_repo.retrieve_parsed(log, "test-key", 1, parse)
+    second = await tiered_cache_repo.retrieve_parsed(log, "test-key", 1, parse)
+    assert first == second == {"a": 1}
+    assert parse.call_count == 1
+
+    # hits are copies, so changing one doesn't change the next
+    first["a"] = 2
+    third = await tiered_cache_repo.retrieve_parsed(log, "test-key", 1, parse)
+    assert third == {"a": 1}
+
+
+async def test_tiered_parsed_size_counted(log, cache_repo):
+    tiered_cache_repo = TieredCacheRepo(
+        temp_dir=cache_repo.temp_dir, backend=cache_repo, max_bytes=2048
+    )
+    raw = json.dumps({"values": list(range(5))})
+    await tiered_cache_repo.store(log, "first", raw, 1)
+    await tiered_cache_repo.store(log, "second", raw, 1)
+    raw_bytes = tiered_cache_repo.memory.total_bytes
+
+    await tiered_cache_repo.retrieve_parsed(log, "second", 1, json.loads)
+    assert tiered_cache_repo.memory.total_bytes > raw_bytes
+    assert tiered_cache_repo.memory.total_bytes <= 2048
+
+    # parsed objects that don't fit aren't kept
+    parse = MagicMock(wraps=lambda value: [json.loads(value) for _ in range(100)])
+    await tiered_cache_repo.retrieve_parsed(log, "first", 1, parse)
+    await tiered_cache_repo.retrieve_parsed(log, "first", 1, parse)
+    assert parse.call_count == 2
+    assert tiered_cache_repo.memory.total_bytes <= 2048
+
+
+async def test_tiered_eviction(log, cache_repo, tiered_cache_repo):
+    value = "x" * 40
+    await tiered_cache_repo.store(log, "first", value, 1)
+    await tiered_cache_repo.store(log, "second", value, 1)
+
+    assert ("global", "first:v1") not in tiered_cache_repo.memory
+    assert ("global", "second:v1") in tiered_cache_repo.memory
+    assert tiered_cache_repo.memory.total_bytes <= 64
+    # evicted entries are still in the backend
+    assert await tiered_cache_repo.retrieve(log, "first", 1) == value
+
+
+async def test_tiered_write_behind(log, cache_repo):
+    tiered_cache_repo = TieredCacheRepo(
+        temp_dir=cache_repo.temp_dir,
+        backend=cache_repo,
+        write_mode="write-behind",
+    )
+    await tiered_cache_repo.store(log, "test-key", "test-value", 1)
+    assert await tiered_cache_repo.retrieve(log, "test-key", 1) == "test-value"
+
+    await tiered_cache_repo.flush()
+    assert await cache_repo.retrieve(log, "test-key", 1) == "test-value"
+
+
+async def test_tiered_write_behind_then_delete(log, cache_repo):
+    tiered_cache_repo = TieredCacheRepo(
+        temp_dir=cache_repo.temp_dir,
+        backend=cache_repo,
+        write_mode="write-behind",
+    )
+    await tiered_cache_repo.store(log, "test-key", "first", 1)
+    await tiered_cache_repo.store(log, "test-key", "second", 1)
+    await tiered_cache_repo.delete(log, "test-key", 1)
+
+    await tiered_cache_repo.flush()
+    assert await tiered_cache_repo.retrieve(log, "test-key", 1) is None
+    assert await cache_repo.retrieve(log, "test-key", 1) is None
+
+    # writes to the same key land in order
+    await tiered_cache_repo.store(log, "test-key", "first", 1)
+    await tiered_cache_repo.store(log, "test-key", "second", 1)
+    await tiered_cache_repo.flush()
+    assert await cache_repo.retrieve(log, "test-key", 1) == "second"
+    assert not tiered_cache_repo._key_writes
+
+
+async def test_tiered_expire(log, tiered_cache_repo):
+    await tiered_cache_repo.store(log, "test-key", "test-value", 1, expire=60)
+
+    with (
+        patch("time.monotonic", return_value=time.monotonic() + 61),
+        patch("time.time", return_value=time.time() + 61),
+    ):
+        assert await tiered_cache_repo.retrieve(log, "test-key", 1) is None
+    await tiered_cache_repo.close()
+
+
+async def test_tiered_retrieve_many(log, cache_repo, tiered_cache_repo):
+    await tiered_cache_repo.store(log, "in-memory", "a", 1)
+    await cache_repo.store(log, "in-backend", "b", 1)
+
+    values = await tiered_cache_repo.retrieve_many(
+        log, [("in-memory", 1, None), ("in-backend", 1, None), ("missing", 1, None)]
+    )
+    assert values == ["a", "b", None]
+    assert ("global", "in-backend:v1") in tiered_cache_repo.memory
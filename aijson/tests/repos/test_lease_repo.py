@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from aijson.repos.lease_repo import InMemoryLeaseRepo
+
+
+@pytest.fixture
+def lease_repo():
+    return InMemoryLeaseRepo()
+
+
+async def test_acquire_exclusive(log, lease_repo):
+    token = await lease_repo.acquire(log, "key", ttl=10)
+    assert token is not None
+    assert await lease_repo.acquire(log, "key", ttl=10) is None
+    assert await lease_repo.acquire(log, "other_key", ttl=10) is not None
+
+
+async def test_release(log, lease_repo):
+    token = await lease_repo.acquire(log, "key", ttl=10)
+
+    # releasing with someone else's token does nothing
+    await lease_repo.release(log, "key", "not_the_token")
+    assert await lease_repo.acquire(log, "key", ttl=10) is None
+
+    await lease_repo.release(log, "key", token)
+    assert await lease_repo.acquire(log, "key", ttl=10) is not None
+
+
+async def test_renew(log, lease_repo):
+    token = await lease_repo.acquire(log, "key", ttl=0.05)
+    assert await lease_repo.renew(log, "key", token, ttl=10)
+    await asyncio.sleep(0.1)
+    assert await lease_repo.acquire(log, "key", ttl=10) is None
+
+    # only the holder can renew, and only while it holds the lease
+    assert not await lease_repo.renew(log, "key", "not_the_token", ttl=10)
+    await lease_repo.release(log, "key", token)
+    assert not await lease_repo.renew(log, "key", token, ttl=10)
+
+
+async def test_wait_for_release(log, lease_repo):
+    token = await lease_repo.acquire(log, "key", ttl=10)
+    waiter = asyncio.create_task(lease_repo.wait(log, "key", timeout=10))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    await lease_repo.release(log, "key", token)
+    assert await asyncio.wait_for(waiter, timeout=1) is True
+
+
+async def test_wait_for_expiry(log, lease_repo):
+    await lease_repo.acquire(log, "key", ttl=0.05)
+    assert await lease_repo.wait(log, "key", timeout=1) is True
+    assert await lease_repo.acquire(log, "key", ttl=10) is not None
+
+
+async def test_wait_timeout(log, lease_repo):
+    await lease_repo.acquire(log, "key", ttl=10)
+    assert await lease_repo.wait(log, "key", timeout=0.05) is False
+
+
+async def test_wait_without_lease(log, lease_repo):
+    assert await lease_repo.wait(log, "key", timeout=0) is True
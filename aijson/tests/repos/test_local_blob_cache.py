@@ -0,0 +1,117 @@
+import hashlib
+import os
+import stat
+import time
+
+import pytest
+
+from aijson.repos.local_blob_cache import LocalBlobCache
+
+
+def _get_id(value: bytes) -> str:
+    return hashlib.sha256(value).hexdigest()
+
+
+VALUE = b"value"
+VALUE_ID = _get_id(VALUE)
+
+
+@pytest.fixture
+def local_cache(temp_dir):
+    return LocalBlobCache(cache_dir=os.path.join(temp_dir, "cache"), max_bytes=100)
+
+
+def test_put_get(local_cache):
+    assert local_cache.get(VALUE_ID) is None
+    local_cache.put(VALUE_ID, VALUE)
+    assert local_cache.get(VALUE_ID) == VALUE
+
+    local_cache.remove(VALUE_ID)
+    assert local_cache.get(VALUE_ID) is None
+
+
+def test_link(local_cache, temp_dir):
+    dest = os.path.join(temp_dir, "out", "value.txt")
+    assert not local_cache.link(VALUE_ID, dest)
+
+    local_cache.put(VALUE_ID, VALUE)
+    assert local_cache.link(VALUE_ID, dest)
+    with open(dest, "rb") as f:
+        assert f.read() == VALUE
+    assert os.path.samefile(dest, local_cache.lookup(VALUE_ID))
+
+    # linking again replaces the file
+    assert local_cache.link(VALUE_ID, dest)
+
+
+def test_put_file(local_cache, temp_dir):
+    path = os.path.join(temp_dir, "downloaded")
+    with open(path, "wb") as f:
+        f.write(VALUE)
+    local_cache.put_file(VALUE_ID, path)
+    assert local_cache.get(VALUE_ID) == VALUE
+
+    # the file is copied, so it stays writable
+    assert not os.path.samefile(path, local_cache.lookup(VALUE_ID))
+    assert os.stat(path).st_mode & stat.S_IWUSR
+
+
+def test_contents_verified(local_cache, temp_dir):
+    path = os.path.join(temp_dir, "downloaded")
+    with open(path, "wb") as f:
+        f.write(b"other")
+    with pytest.raises(ValueError):
+        local_cache.put_file(VALUE_ID, path)
+    with pytest.raises(ValueError):
+        local_cache.put(VALUE_ID, b"other")
+    assert local_cache.lookup(VALUE_ID) is None
+
+    # entries that were tampered with are dropped
+    local_cache.put(VALUE_ID, VALUE)
+    cache_path = local_cache.lookup(VALUE_ID)
+    os.chmod(cache_path, 0o644)
+    with open(cache_path, "wb") as f:
+        f.write(b"other")
+    assert not local_cache.link(VALUE_ID, os.path.join(temp_dir, "out", "value.txt"))
+    assert local_cache.lookup(VALUE_ID) is None
+
+    local_cache.put(VALUE_ID, VALUE)
+    cache_path = local_cache.lookup(VALUE_ID)
+    os.chmod(cache_path, 0o644)
+    with open(cache_path, "wb") as f:
+        f.write(b"other")
+    assert local_cache.get(VALUE_ID) is None
+    assert local_cache.lookup(VALUE_ID) is None
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX only")
+def test_default_dir_private(temp_dir, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", temp_dir)
+    monkeypatch.delenv("AIJSON_BLOB_CACHE_DIR", raising=False)
+    local_cache = LocalBlobCache()
+    assert local_cache.cache_dir.startswith(temp_dir)
+    assert stat.S_IMODE(os.stat(local_cache.cache_dir).st_mode) == 0o700
+
+
+def test_evict_least_recently_used(local_cache):
+    now = time.time()
+    values = [bytes([i]) * 30 for i in range(4)]
+    blob_ids = [_get_id(value) for value in values]
+    for i in range(3):
+        local_cache.put(blob_ids[i], values[i])
+        # set explicit times, mtime resolution can be coarse
+        os.utime(local_cache._get_path(blob_ids[i]), (now - 100 + i, now - 100 + i))
+    # using an entry keeps it around
+    os.utime(local_cache._get_path(blob_ids[0]), (now - 10, now - 10))
+
+    local_cache.put(blob_ids[3], values[3])
+    assert local_cache.get_size() <= 90
+    assert local_cache.get(blob_ids[1]) is None
+    for blob_id in [blob_ids[0], blob_ids[2], blob_ids[3]]:
+        assert local_cache.get(blob_id) is not None
+
+
+def test_shared_between_instances(local_cache):
+    local_cache.put(VALUE_ID, VALUE)
+    other_cache = LocalBlobCache(cache_dir=local_cache.cache_dir)
+    assert other_cache.get(VALUE_ID) == VALUE
@@ -1,10 +1,19 @@
 # import before importing action stuff so it gets registered via metaclass
+import asyncio
 import os
 import sys
+import time
 from unittest import mock
 
+import pytest
+
 import aijson.tests.resources.testing_actions  # noqa: F401
-from aijson.tests.resources.testing_actions import AddOutputs
+from aijson.tests.resources.testing_actions import (
+    Add,
+    AddInputs,
+    AddOutputs,
+    DoubleAdd,
+)
 from aijson_ml.utils.prompt_context import (
     RoleElement,
     TextElement,
@@ -12,6 +21,9 @@ from aijson_ml.utils.prompt_context import (
 )
 
 from aijson.models.blob import Blob
+from aijson.repos.cache_repo import TieredCacheRepo
+from aijson.repos.lease_repo import InMemoryLeaseRepo
+from aijson.services.action_service import ActionService
 
 
 def assert_logs(
@@ -76,7 +88,7 @@ def assert_logs(
         assert log_dict["action_id"] == action_id
         assert log_dict["log_level"] == "info"
         assert log_dict["namespace"] == "global"
-        assert "blob" in log_dict
+        assert "blobs" in log_dict
         assert "duration" in log_dict
 
     if cache_hit and not blobs_expired:
@@ -363,6 +375,479 @@ async def test_cache_key(log, in_memory_action_service, log_history):
     assert_logs(log_history, third_action_id, action_name, cache_hit=True)
 
 
+async def test_cache_expire(log, in_memory_action_service, cache_repo):
+    in_memory_action_service.config.action_cache_expire = 60
+
+    with mock.patch.object(cache_repo, "store", wraps=cache_repo.store) as store:
+        await in_memory_action_service.run_action(log=log, action_id="first_sum")
+    assert store.call_args.kwargs["expire"] == 60
+
+    # the action's own expiry takes precedence
+    with (
+        mock.patch.object(Add, "cache_expire", 10),
+        mock.patch.object(cache_repo, "store", wraps=cache_repo.store) as store,
+    ):
+        await in_memory_action_service.run_action(log=log, action_id="second_sum")
+    assert store.call_args.kwargs["expire"] == 10
+
+
+async def test_prefetch_cache(log, in_memory_action_service, cache_repo, log_history):
+    await in_memory_action_service.run_action(log=log, action_id="second_sum")
+    log_history.clear()
+
+    with mock.patch.object(
+        cache_repo, "retrieve_many", wraps=cache_repo.retrieve_many
+    ) as retrieve_many:
+        await in_memory_action_service.prefetch_cache(log, "second_sum")
+    # only `first_sum` has inputs that can be resolved up front
+    assert retrieve_many.call_count == 1
+    assert [namespace for _, _, namespace in retrieve_many.call_args.args[1]] == [
+        "test_add"
+    ]
+
+    with mock.patch.object(
+        cache_repo, "retrieve_parsed", wraps=cache_repo.retrieve_parsed
+    ) as retrieve_parsed:
+        outputs = await in_memory_action_service.run_action(
+            log=log, action_id="first_sum"
+        )
+    assert outputs.result == 3
+    retrieve_parsed.assert_not_called()
+    assert_logs(log_history, "first_sum", "test_add", cache_hit=True)
+
+
+async def test_prefetch_cache_cleared(log, in_memory_action_service):
+    await in_memory_action_service.run_action(log=log, action_id="second_sum")
+
+    keys = await in_memory_action_service.prefetch_cache(log, "second_sum")
+    assert list(in_memory_action_service.prefetched_cache) == keys
+    in_memory_action_service.discard_prefetched(keys)
+    assert not in_memory_action_service.prefetched_cache
+
+    # entries left behind expire when more are fetched
+    in_memory_action_service.prefetched_cache[("test_add", "other", 1)] = (
+        None,
+        time.monotonic() - in_memory_action_service.prefetch_max_age - 1,
+    )
+    keys = await in_memory_action_service.prefetch_cache(log, "second_sum")
+    assert list(in_memory_action_service.prefetched_cache) == keys
+
+
+async def test_approximate_cache(log, in_memory_action_service, cache_repo):
+    with mock.patch.object(Add, "cache_similarity_threshold", 0.9):
+        await in_memory_action_service.run_action(log=log, action_id="first_sum")
+
+        # miss the exact entry, so the approximate one is used
+        with (
+            mock.patch.object(
+                cache_repo, "retrieve_parsed", mock.AsyncMock(return_value=None)
+            ),
+            mock.patch.object(Add, "run", mock.AsyncMock()) as run,
+        ):
+            outputs = await in_memory_action_service.run_action(
+                log=log, action_id="first_sum"
+            )
+        assert outputs.result == 3
+        run.assert_not_called()
+
+
+async def test_stale_while_revalidate(log, in_memory_action_service):
+    run_count = 0
+
+    async def changed_run(self, inputs):
+        nonlocal run_count
+        run_count += 1
+        return AddOutputs(result=100)
+
+    with mock.patch.object(Add, "cache_stale_while_revalidate", True):
+        outputs = await in_memory_action_service.run_action(
+            log=log, action_id="first_sum"
+        )
+        assert outputs.result == 3
+
+        # a new version misses the cache, so the stale result is served and refreshed
+        with (
+            mock.patch.object(Add, "version", 2),
+            mock.patch.object(Add, "run", changed_run),
+        ):
+            outputs = await in_memory_action_service.run_action(
+                log=log, action_id="first_sum"
+            )
+            assert outputs.result == 3
+
+            await asyncio.gather(*in_memory_action_service.revalidation_tasks.values())
+            assert not in_memory_action_service.revalidation_tasks
+
+            outputs = await in_memory_action_service.run_action(
+                log=log, action_id="first_sum"
+            )
+            assert outputs.result == 100
+            assert run_count == 1
+
+
+async def test_checkpoint_replay(
+    log, temp_dir, cache_repo, in_memory_blob_repo, testing_actions, log_history
+):
+    def get_action_service():
+        return ActionService(
+            temp_dir=temp_dir,
+            use_cache=True,
+            cache_repo=cache_repo,
+            blob_repo=in_memory_blob_repo,
+            config=testing_actions,
+        )
+
+    async def interrupted_run(self, inputs):
+        yield AddOutputs(result=1)
+        await asyncio.sleep(10)
+
+    async def resumed_run(self, inputs):
+        yield AddOutputs(result=2)
+
+    with mock.patch.object(DoubleAdd, "cache_checkpoint_interval", 0):
+        action_service = get_action_service()
+        with mock.patch.object(DoubleAdd, "run", interrupted_run):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    action_service.run_action(log=log, action_id="double_add"),
+                    timeout=0.2,
+                )
+        for task in action_service.tasks.values():
+            task.cancel()
+
+        async def retrieve_checkpoint():
+            return await cache_repo.retrieve(
+                log,
+                '{"a":1,"b":2}',
+                version=ActionService._get_cache_version(DoubleAdd),
+                namespace="test_double_add__checkpoint",
+            )
+
+        assert await retrieve_checkpoint() == '{"result":1}'
+
+        # a restarted run replays the checkpoint before the new outputs
+        log_history.clear()
+        with mock.patch.object(DoubleAdd, "run", resumed_run):
+            outputs = [
+                output.result
+                async for output in get_action_service().stream_action(
+                    log=log, action_id="double_add"
+                )
+            ]
+        assert outputs == [1, 2]
+        assert "Replaying checkpoint" in [log["event"] for log in log_history]
+
+        # the checkpoint is dropped once the run finishes
+        assert await retrieve_checkpoint() is None
+
+
+async def test_stream_replay(
+    log, temp_dir, cache_repo, in_memory_blob_repo, testing_actions
+):
+    def get_action_service(stream_replay_speed=None):
+        return ActionService(
+            temp_dir=temp_dir,
+            use_cache=True,
+            cache_repo=cache_repo,
+            blob_repo=in_memory_blob_repo,
+            config=testing_actions,
+            stream_replay_speed=stream_replay_speed,
+        )
+
+    async def streaming_run(self, inputs):
+        yield AddOutputs(result=1)
+        await asyncio.sleep(0.1)
+        yield AddOutputs(result=2)
+
+    async def stream_results(action_service):
+        return [
+            output.result
+            async for output in action_service.stream_action(
+                log=log, action_id="double_add"
+            )
+        ]
+
+    with mock.patch.object(DoubleAdd, "cache_record_stream", True):
+        with mock.patch.object(DoubleAdd, "run", streaming_run):
+            assert await stream_results(get_action_service()) == [1, 2]
+
+        # without a replay speed, only the cached result is yielded
+        assert await stream_results(get_action_service()) == [2]
+
+        start = time.monotonic()
+        assert await stream_results(get_action_service("instant")) == [1, 2]
+        assert time.monotonic() - start < 0.1
+
+        start = time.monotonic()
+        assert await stream_results(get_action_service("original")) == [1, 2]
+        assert time.monotonic() - start >= 0.1
+
+        start = time.monotonic()
+        assert await stream_results(get_action_service(4)) == [1, 2]
+        assert 0.025 <= time.monotonic() - start < 0.1
+
+
+async def test_stream_recording_capped(
+    log, temp_dir, cache_repo, in_memory_blob_repo, testing_actions
+):
+    def get_action_service():
+        return ActionService(
+            temp_dir=temp_dir,
+            use_cache=True,
+            cache_repo=cache_repo,
+            blob_repo=in_memory_blob_repo,
+            config=testing_actions,
+            stream_replay_speed="instant",
+            stream_recording_max_bytes=20,
+        )
+
+    async def streaming_run(self, inputs):
+        for i in range(3):
+            yield AddOutputs(result=i)
+
+    with mock.patch.object(DoubleAdd, "cache_record_stream", True):
+        with mock.patch.object(DoubleAdd, "run", streaming_run):
+            results = [
+                output.result
+                async for output in get_action_service().stream_action(
+                    log=log, action_id="double_add"
+                )
+            ]
+            assert results == [0, 1, 2]
+
+        # the stream outgrew the cap, so only the cached result is replayed
+        results = [
+            output.result
+            async for output in get_action_service().stream_action(
+                log=log, action_id="double_add"
+            )
+        ]
+        assert results == [2]
+
+
+@pytest.mark.parametrize("speed", [0, -1.0, float("nan")])
+def test_stream_replay_speed_validated(
+    speed, temp_dir, cache_repo, in_memory_blob_repo, testing_actions
+):
+    with pytest.raises(ValueError):
+        ActionService(
+            temp_dir=temp_dir,
+            use_cache=True,
+            cache_repo=cache_repo,
+            blob_repo=in_memory_blob_repo,
+            config=testing_actions,
+            stream_replay_speed=speed,
+        )
+
+
+async def test_lease_coalesces_workers(
+    log, temp_dir, cache_repo, in_memory_blob_repo, testing_actions
+):
+    lease_repo = InMemoryLeaseRepo()
+    workers = [
+        ActionService(
+            temp_dir=temp_dir,
+            use_cache=True,
+            cache_repo=cache_repo,
+            blob_repo=in_memory_blob_repo,
+            config=testing_actions,
+            lease_repo=lease_repo,
+        )
+        for _ in range(3)
+    ]
+
+    run_count = 0
+
+    async def slow_run(self, inputs):
+        nonlocal run_count
+        run_count += 1
+        await asyncio.sleep(0.1)
+        return AddOutputs(result=inputs.a + inputs.b)
+
+    with mock.patch.object(Add, "run", slow_run):
+        outputs = await asyncio.gather(
+            *[worker.run_action(log=log, action_id="first_sum") for worker in workers]
+        )
+
+    assert [output.result for output in outputs] == [3, 3, 3]
+    assert run_count == 1
+    assert all(not worker.held_leases for worker in workers)
+
+
+async def test_lease_released_after_write_behind(
+    log, temp_dir, cache_repo, in_memory_blob_repo, testing_actions
+):
+    lease_repo = InMemoryLeaseRepo()
+    # each worker buffers its writes to the shared backend
+    tiered_cache_repos = [
+        TieredCacheRepo(
+            temp_dir=temp_dir, backend=cache_repo, write_mode="write-behind"
+        )
+        for _ in range(3)
+    ]
+    workers = [
+        ActionService(
+            temp_dir=temp_dir,
+            use_cache=True,
+            cache_repo=tiered_cache_repo,
+            blob_repo=in_memory_blob_repo,
+            config=testing_actions,
+            lease_repo=lease_repo,
+        )
+        for tiered_cache_repo in tiered_cache_repos
+    ]
+
+    run_count = 0
+
+    async def slow_run(self, inputs):
+        nonlocal run_count
+        run_count += 1
+        await asyncio.sleep(0.1)
+        return AddOutputs(result=inputs.a + inputs.b)
+
+    store = cache_repo._store
+
+    async def slow_store(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        await store(*args, **kwargs)
+
+    with (
+        mock.patch.object(Add, "run", slow_run),
+        mock.patch.object(cache_repo, "_store", slow_store),
+    ):
+        outputs = await asyncio.gather(
+            *[worker.run_action(log=log, action_id="first_sum") for worker in workers]
+        )
+        for tiered_cache_repo in tiered_cache_repos:
+            await tiered_cache_repo.flush()
+
+    assert [output.result for output in outputs] == [3, 3, 3]
+    # waiting workers found the outputs in the backend instead of recomputing them
+    assert run_count == 1
+
+
+async def test_lease_renewed_while_running(
+    log, temp_dir, cache_repo, in_memory_blob_repo, testing_actions
+):
+    lease_repo = InMemoryLeaseRepo()
+    action_service = ActionService(
+        temp_dir=temp_dir,
+        use_cache=True,
+        cache_repo=cache_repo,
+        blob_repo=in_memory_blob_repo,
+        config=testing_actions,
+        lease_repo=lease_repo,
+        lease_ttl=0.05,
+    )
+    held_after_ttl = None
+
+    async def slow_run(self, inputs):
+        nonlocal held_after_ttl
+        await asyncio.sleep(0.15)
+        ((lease_key, _),) = action_service.lease_renewals
+        held_after_ttl = await lease_repo.acquire(log, lease_key, ttl=10) is None
+        return AddOutputs(result=inputs.a + inputs.b)
+
+    with mock.patch.object(Add, "run", slow_run):
+        await action_service.run_action(log=log, action_id="first_sum")
+    assert held_after_ttl
+    assert not action_service.lease_renewals
+
+    # by default, leases last as long as the action timeout
+    default_service = ActionService(
+        temp_dir=temp_dir,
+        use_cache=True,
+        cache_repo=cache_repo,
+        blob_repo=in_memory_blob_repo,
+        config=testing_actions,
+        lease_repo=lease_repo,
+    )
+    assert default_service.lease_ttl == testing_actions.action_timeout
+
+
+async def test_stale_revalidation_takes_lease(
+    log, temp_dir, cache_repo, in_memory_blob_repo, testing_actions
+):
+    lease_repo = InMemoryLeaseRepo()
+    action_service = ActionService(
+        temp_dir=temp_dir,
+        use_cache=True,
+        cache_repo=cache_repo,
+        blob_repo=in_memory_blob_repo,
+        config=testing_actions,
+        lease_repo=lease_repo,
+        stale_max_age=60,
+    )
+    run_count = 0
+
+    async def changed_run(self, inputs):
+        nonlocal run_count
+        run_count += 1
+        return AddOutputs(result=100)
+
+    with mock.patch.object(Add, "cache_stale_while_revalidate", True):
+        with mock.patch.object(cache_repo, "store", wraps=cache_repo.store) as store:
+            await action_service.run_action(log=log, action_id="first_sum")
+        # stale copies expire too
+        assert store.call_args.kwargs["expire"] == 60
+
+        with (
+            mock.patch.object(Add, "version", 2),
+            mock.patch.object(Add, "run", changed_run),
+        ):
+            # another worker is computing the new version, so it isn't revalidated here
+            cache_key = AddInputs(a=1, b=2).model_dump_json()
+            lease_key = action_service._get_lease_key(
+                "test_add", action_service.get_action_type("test_add"), cache_key
+            )
+            token = await lease_repo.acquire(log, lease_key, ttl=60)
+            assert token is not None
+            outputs = await action_service.run_action(log=log, action_id="first_sum")
+            assert outputs.result == 3
+            await asyncio.gather(*action_service.revalidation_tasks.values())
+            assert run_count == 0
+
+
+async def test_close_cancels_revalidation(
+    log, temp_dir, cache_repo, in_memory_blob_repo, testing_actions
+):
+    lease_repo = InMemoryLeaseRepo()
+    action_service = ActionService(
+        temp_dir=temp_dir,
+        use_cache=True,
+        cache_repo=cache_repo,
+        blob_repo=in_memory_blob_repo,
+        config=testing_actions,
+        lease_repo=lease_repo,
+    )
+
+    async def slow_run(self, inputs):
+        await asyncio.sleep(60)
+        return AddOutputs(result=100)
+
+    with mock.patch.object(Add, "cache_stale_while_revalidate", True):
+        await action_service.run_action(log=log, action_id="first_sum")
+        with (
+            mock.patch.object(Add, "version", 2),
+            mock.patch.object(Add, "run", slow_run),
+        ):
+            outputs = await action_service.run_action(log=log, action_id="first_sum")
+            assert outputs.result == 3
+            (revalidation,) = action_service.revalidation_tasks.values()
+
+            await action_service.close()
+            assert revalidation.cancelled()
+            assert not action_service.revalidation_tasks
+            assert not action_service.lease_renewals
+
+            # the revalidation's lease was released
+            cache_key = AddInputs(a=1, b=2).model_dump_json()
+            lease_key = action_service._get_lease_key(
+                "test_add", action_service.get_action_type("test_add"), cache_key
+            )
+            assert await lease_repo.acquire(log, lease_key, ttl=60) is not None
+
+
 async def test_nested_inputs(log, in_memory_action_service, log_history):
     first_action_id = "first_sum_nested"
     second_action_id = "second_sum_nested"
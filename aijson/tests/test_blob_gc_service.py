@@ -0,0 +1,197 @@
+import json
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from aijson.models.blob import Blob
+from aijson.repos.blob_repo import FilesystemBlobRepo, InMemoryBlobRepo
+from aijson.repos.cache_repo import ShelveCacheRepo
+from aijson.services.blob_gc_service import BlobGarbageCollector, collect_blob_ids
+
+
+@pytest.fixture
+async def gc_repos(temp_dir):
+    cache_repo = ShelveCacheRepo(temp_dir=os.path.join(temp_dir, "cache"))
+    blob_repo = FilesystemBlobRepo(temp_dir=temp_dir, exists_cache_ttl=0)
+    yield cache_repo, blob_repo
+    await cache_repo.close()
+    await blob_repo.close()
+
+
+def test_collect_blob_ids():
+    blob_ids = set()
+    collect_blob_ids(
+        {
+            "model": Blob(id="a"),
+            "outputs": json.dumps({"file": {"id": "b", "file_extension": "txt"}}),
+            # stream recordings nest outputs as JSON strings
+            "recording": json.dumps([[0.1, json.dumps({"files": [{"id": "c"}]})]]),
+            "other": {"id": "not a blob", "name": "x"},
+            "text": "{not json",
+        },
+        blob_ids,
+    )
+    assert blob_ids == {"a", "b", "c"}
+
+
+async def test_collect_orphaned_blobs(log, gc_repos):
+    cache_repo, blob_repo = gc_repos
+    referenced = await blob_repo.save(log, b"referenced", file_extension="txt")
+    recorded = await blob_repo.save(log, b"recorded")
+    orphaned = await blob_repo.save(log, b"orphaned")
+    await cache_repo.store(
+        log, "key", json.dumps({"file": referenced.model_dump()}), 1, "action"
+    )
+    await cache_repo.store(
+        log,
+        "key",
+        json.dumps([[0, json.dumps({"file": recorded.model_dump()})]]),
+        1,
+        "action__stream",
+    )
+
+    collector = BlobGarbageCollector(cache_repo, blob_repo, min_age=0)
+    result = await collector.collect(log, dry_run=True)
+    assert result.cached_values == 2
+    assert result.reachable_blobs == 2
+    assert result.stored_blobs == 3
+    assert result.orphaned_blobs == 1
+    assert result.deleted_blobs == 0
+    assert await blob_repo.exists(log, orphaned)
+
+    result = await collector.collect(log)
+    assert result.deleted_blobs == 1
+    assert await blob_repo.exists_many(log, [referenced, recorded, orphaned]) == [
+        True,
+        True,
+        False,
+    ]
+
+
+async def test_collect_derived_namespaces(log, gc_repos):
+    cache_repo, blob_repo = gc_repos
+    derived_namespaces = ["action__stale", "action__checkpoint", "action__approximate"]
+    blobs = [
+        await blob_repo.save(log, namespace.encode())
+        for namespace in derived_namespaces
+    ]
+    for namespace, blob in zip(derived_namespaces, blobs):
+        await cache_repo.store(
+            log, "key", json.dumps({"file": blob.model_dump()}), 1, namespace
+        )
+    other = await blob_repo.save(log, b"other")
+    await cache_repo.store(
+        log, "key", json.dumps({"file": other.model_dump()}), 1, "other"
+    )
+
+    # only the action's namespace is given, its derived ones are searched too
+    result = await BlobGarbageCollector(cache_repo, blob_repo, min_age=0).collect(
+        log, cache_namespaces=["action"]
+    )
+    assert result.cached_values == 3
+    assert result.deleted_blobs == 1
+    assert await blob_repo.exists_many(log, [*blobs, other]) == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    # namespaces that don't exist aren't created
+    assert "action" not in cache_repo._list_namespaces()
+
+
+async def test_collect_keeps_recent_blobs(log, gc_repos):
+    cache_repo, blob_repo = gc_repos
+    blob = await blob_repo.save(log, b"not cached yet")
+
+    result = await BlobGarbageCollector(cache_repo, blob_repo).collect(log)
+    assert result.orphaned_blobs == 0
+    assert await blob_repo.exists(log, blob)
+
+
+async def test_collect_keeps_blobs_of_unknown_age(log, gc_repos, temp_dir):
+    cache_repo, _ = gc_repos
+    blob_repo = InMemoryBlobRepo(temp_dir=temp_dir)
+    try:
+        recent = await blob_repo.save(log, b"recent", namespace="gc")
+        unknown = await blob_repo.save(log, b"unknown", namespace="gc")
+        blob_repo._store._last_used.pop(("gc", unknown.id))
+
+        result = await BlobGarbageCollector(cache_repo, blob_repo).collect(
+            log, blob_namespaces=["gc"]
+        )
+        assert result.orphaned_blobs == 0
+        assert result.unknown_age_blobs == 1
+        assert await blob_repo.exists_many(log, [recent, unknown], "gc") == [
+            True,
+            True,
+        ]
+    finally:
+        blob_repo._store.clear()
+
+
+async def test_collect_keeps_resaved_blobs(log, gc_repos):
+    cache_repo, blob_repo = gc_repos
+    blob = await blob_repo.save(log, b"regenerated")
+    past = time.time() - 7200
+    os.utime(blob_repo._get_path(blob, blob_repo.default_namespace), (past, past))
+
+    # saving the same contents again reuses the blob, which counts as using it
+    assert await blob_repo.save(log, b"regenerated") == blob
+    result = await BlobGarbageCollector(cache_repo, blob_repo).collect(log)
+    assert result.orphaned_blobs == 0
+    assert await blob_repo.exists(log, blob)
+
+
+async def test_collect_keeps_reused_chunks(log, gc_repos):
+    cache_repo, blob_repo = gc_repos
+    blob_repo.content_chunking = True
+    blob_repo.content_chunk_min_size = 64
+    blob_repo.content_chunk_avg_size = 256
+    blob_repo.content_chunk_max_size = 1024
+    value = os.urandom(10_000)
+    old = await blob_repo.save(log, value)
+    await blob_repo.delete(log, old)
+    past = time.time() - 7200
+    chunk_namespace = blob_repo.get_chunk_namespace(blob_repo.default_namespace)
+    async for chunk_blob, _ in blob_repo.list_blobs(log, chunk_namespace):
+        os.utime(blob_repo._get_path(chunk_blob, chunk_namespace), (past, past))
+
+    # a new version reuses the old, orphaned chunks
+    new_value = value + b"appended"
+    new = await blob_repo.save(log, new_value)
+
+    # as if marking ran before the new version's manifest was written
+    collector = BlobGarbageCollector(cache_repo, blob_repo)
+    with patch.object(collector, "_mark_chunks", AsyncMock(return_value=set())):
+        await collector.collect(log)
+    assert await blob_repo.retrieve(log, new) == new_value
+
+
+async def test_collect_orphaned_chunks(log, gc_repos):
+    cache_repo, blob_repo = gc_repos
+    blob_repo.content_chunking = True
+    blob_repo.content_chunk_min_size = 64
+    blob_repo.content_chunk_avg_size = 256
+    blob_repo.content_chunk_max_size = 1024
+    value = os.urandom(10_000)
+    referenced = await blob_repo.save(log, value)
+    orphaned = await blob_repo.save(log, value[:5_000] + b"edit" + value[5_000:])
+    await cache_repo.store(
+        log, "key", json.dumps({"file": referenced.model_dump()}), 1, "action"
+    )
+
+    result = await BlobGarbageCollector(cache_repo, blob_repo, min_age=0).collect(log)
+    assert result.deleted_blobs > 1
+    assert not await blob_repo.exists(log, orphaned)
+    assert await blob_repo.retrieve(log, referenced) == value
+    chunk_namespace = blob_repo.get_chunk_namespace(blob_repo.default_namespace)
+    chunk_ids = {
+        chunk_blob.id
+        async for chunk_blob, _ in blob_repo.list_blobs(log, chunk_namespace)
+    }
+    assert chunk_ids == {
+        chunk_blob.id for chunk_blob, _ in await blob_repo.get_chunks(log, referenced)
+    }
@@ -0,0 +1,138 @@
+import hashlib
+import inspect
+import io
+import json
+import os
+from unittest.mock import patch
+
+from aijson.tests.resources.testing_actions import Add, AddOutputs
+from aijson.utils.action_utils import get_actions_dict
+from aijson.utils.cache_utils import (
+    BloomFilter,
+    ByteBudgetCache,
+    SnapshotWriter,
+    iter_snapshot_records,
+    get_object_size,
+    get_simhash,
+    get_simhash_similarity,
+    get_source_fingerprint,
+    get_value_size,
+)
+
+
+def test_source_fingerprint_per_class():
+    fingerprint = get_source_fingerprint(Add)
+    assert fingerprint == get_source_fingerprint(Add)
+    assert fingerprint != get_source_fingerprint(AddOutputs)
+
+
+def test_source_fingerprint_memoised():
+    class Fingerprinted:
+        pass
+
+    fingerprint = get_source_fingerprint(Fingerprinted)
+    with patch("inspect.getsource") as getsource:
+        assert get_source_fingerprint(Fingerprinted) == fingerprint
+        getsource.assert_not_called()
+
+
+def test_source_fingerprint_doesnt_walk_tree():
+    class Fingerprinted:
+        pass
+
+    with patch("os.walk") as walk:
+        get_source_fingerprint(Fingerprinted)
+        walk.assert_not_called()
+
+
+def test_source_fingerprint_of_func_action():
+    action_type = get_actions_dict()["bare_adder_func"]
+    func = action_type._aijson__mapped_func  # type: ignore
+
+    hasher = hashlib.sha256()
+    with open(inspect.getsourcefile(func), "rb") as f:  # type: ignore
+        hasher.update(f.read())
+    hasher.update(inspect.getsource(func).encode())
+    assert get_source_fingerprint(action_type) == hasher.hexdigest()[:16]
+
+
+def test_simhash_ignores_whitespace_case_and_numbers():
+    simhash = get_simhash("Summarize the ticket opened at 2024-05-01 12:00")
+    assert simhash == get_simhash("summarize  the ticket\nopened at 2024-06-13 09:41")
+
+
+def test_simhash_similarity():
+    text = "the quick brown fox jumps over the lazy dog " * 5
+    similar_text = text + "and runs away"
+    different_text = "completely unrelated words about cache invalidation strategies"
+
+    simhash = get_simhash(text)
+    assert get_simhash_similarity(simhash, simhash) == 1
+    assert get_simhash_similarity(simhash, get_simhash(similar_text)) > 0.8
+    assert get_simhash_similarity(simhash, get_simhash(different_text)) < 0.8
+
+
+def test_byte_budget_cache_resize():
+    cache = ByteBudgetCache(max_bytes=100, eviction="lru")
+    cache.set("a", 1, 40)
+    cache.set("b", 2, 40)
+    assert cache.resize("missing", 10) == []
+
+    # growing an entry evicts others, without making it more recently used
+    assert cache.resize("b", 70) == [("a", 1)]
+    assert cache.total_bytes == 70
+    assert cache.resize("b", 20) == []
+    assert cache.total_bytes == 20
+
+
+def test_get_object_size():
+    value = {"values": list(range(100))}
+    assert get_object_size(value) > get_value_size(json.dumps(value))
+    # shared objects are only counted once
+    assert get_object_size([value, value]) < 2 * get_object_size(value)
+
+
+def test_byte_budget_cache_lfu():
+    cache: ByteBudgetCache[str, int] = ByteBudgetCache(max_bytes=30, eviction="lfu")
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.set(key, i, size=10)
+    cache.get("a")
+    cache.get("a")
+    cache.get("c")
+
+    # the least frequently used entry goes first
+    assert cache.set("d", 3, size=10) == [("b", 1)]
+    # then, among equally used entries, the least recently used
+    cache.get("d")
+    assert cache.set("a", 0, size=20) == [("c", 2)]
+    assert cache.keys() == ["d", "a"]
+
+    cache.pop("d")
+    assert cache.set("e", 4, size=10) == []
+    assert cache.set("f", 5, size=10) == [("e", 4)]
+    assert cache.keys() == ["a", "f"]
+
+
+def test_bloom_filter():
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom_filter.add(f"key{i}")
+
+    assert all(f"key{i}" in bloom_filter for i in range(1000))
+    false_positives = sum(f"other{i}" in bloom_filter for i in range(10000))
+    assert false_positives < 300
+
+
+def test_snapshot_records_span_chunks():
+    records = [
+        ("namespace", f"key{i}", os.urandom(50_000) if i % 2 else "value" * i)
+        for i in range(10)
+    ]
+    f = io.BytesIO()
+    writer = SnapshotWriter(f)
+    for record in records:
+        writer.write(*record)
+    writer.close()
+
+    f.seek(0)
+    assert list(iter_snapshot_records(f)) == records
@@ -0,0 +1,29 @@
+import os
+
+from aijson.utils.chunking_utils import get_content_chunk_boundaries
+
+
+def _split(data: bytes) -> list[bytes]:
+    boundaries = get_content_chunk_boundaries(data, 256, 1024, 4096)
+    return [data[start:end] for start, end in zip([0] + boundaries[:-1], boundaries)]
+
+
+def test_chunk_sizes():
+    data = os.urandom(200_000)
+    chunks = _split(data)
+    assert b"".join(chunks) == data
+    assert all(256 <= len(chunk) <= 4096 for chunk in chunks[:-1])
+    assert 500 < len(data) / len(chunks) < 4096
+
+
+def test_chunks_survive_edits():
+    data = os.urandom(200_000)
+    edited = data[:100_000] + b"inserted" + data[100_001:]
+    chunks = set(_split(data))
+    edited_chunks = _split(edited)
+    assert sum(chunk not in chunks for chunk in edited_chunks) <= 2
+
+
+def test_small_inputs():
+    assert get_content_chunk_boundaries(b"", 256, 1024, 4096) == []
+    assert get_content_chunk_boundaries(b"small", 256, 1024, 4096) == [5]
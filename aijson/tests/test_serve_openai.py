@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 from unittest.mock import ANY
 
@@ -5,7 +6,11 @@ import openai
 import pytest
 
 from aijson import Flow
-from aijson.scripts.serve_openai import run_server, find_open_port
+from aijson.scripts.serve_openai import (
+    find_open_port,
+    parse_stream_replay_speed,
+    run_server,
+)
 from aijson.utils.static_utils import get_target_outputs
 
 
@@ -142,3 +147,11 @@ async def test_models(client, flow):
 async def test_model(client):
     response = await client.models.retrieve("first_sum.result")
     assert response.id == "first_sum.result"
+
+
+def test_parse_stream_replay_speed():
+    assert parse_stream_replay_speed("instant") == "instant"
+    assert parse_stream_replay_speed("2.5") == 2.5
+    for value in ("0", "-1", "nan", "fast"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_stream_replay_speed(value)
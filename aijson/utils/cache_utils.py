@@ -1,4 +1,32 @@
+import hashlib
+import inspect
+import math
 import os
+import re
+import struct
+import sys
+import types
+import zlib
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, BinaryIO, Generic, Hashable, Iterator, Literal, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+EvictionPolicy = Literal["lru", "lfu", "tinylfu"]
+CompressionCodec = Literal["zlib", "zstd"]
+
+# compressed values are prefixed with a marker, so they can coexist with uncompressed ones;
+# JSON never starts with a null byte
+_COMPRESSION_MARKER_PREFIX = b"\x00aijson:"
+_COMPRESSION_MARKERS: dict[CompressionCodec, bytes] = {
+    "zlib": _COMPRESSION_MARKER_PREFIX + b"zlib:",
+    "zstd": _COMPRESSION_MARKER_PREFIX + b"zstd:",
+}
+# the byte after the marker records whether the original value was `str` or `bytes`
+_STR_FLAG = b"s"
+_BYTES_FLAG = b"b"
 
 
 _latest_modified_timestamp = None
@@ -25,3 +53,506 @@ def _get_latest_modified_timestamp():
 
     _latest_modified_timestamp = latest_timestamp
     return latest_timestamp
+
+
+_source_fingerprints: dict[type, str] = {}
+
+
+def get_source_fingerprint(cls: type) -> str:
+    """
+    Fingerprint the source code of a class: the file of its module, and the class's own source.
+    Classes wrapping a function (like `register_action` actions) are fingerprinted by that function.
+    Falls back to the latest modification time in the working directory if no source is available.
+    """
+    if cls in _source_fingerprints:
+        return _source_fingerprints[cls]
+
+    target = getattr(cls, "_aijson__mapped_func", cls)
+    hasher = hashlib.sha256()
+    found_source = False
+    try:
+        source_file = inspect.getsourcefile(target)
+    except TypeError:
+        source_file = None
+    if source_file is not None and os.path.isfile(source_file):
+        with open(source_file, "rb") as f:
+            hasher.update(f.read())
+        found_source = True
+    try:
+        # also covers sources that aren't files on disk, e.g. in notebooks
+        hasher.update(inspect.getsource(target).encode())
+        found_source = True
+    except (OSError, TypeError):
+        pass
+    if not found_source:
+        hasher.update(str(_get_latest_modified_timestamp()).encode())
+
+    fingerprint = hasher.hexdigest()[:16]
+    _source_fingerprints[cls] = fingerprint
+    return fingerprint
+
+
+def get_expire_seconds(expire: int | float | timedelta | None) -> float | None:
+    if expire is None:
+        return None
+    if isinstance(expire, timedelta):
+        return expire.total_seconds()
+    return float(expire)
+
+
+def get_value_size(value: Any) -> int:
+    """
+    Approximate the number of bytes a cached value occupies.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    return sys.getsizeof(value)
+
+
+def get_object_size(value: Any) -> int:
+    """
+    Approximate the number of bytes an object and everything it refers to occupy
+    (e.g., a model parsed from a cached value).
+    """
+    size = 0
+    seen: set[int] = set()
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(
+            obj, (type, types.ModuleType, types.FunctionType)
+        ):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+    return size
+
+
+class FrequencySketch:
+    """
+    Approximate access counts of many keys in constant memory (a count-min sketch).
+    Counts are halved every `10 * width` accesses, so old popularity fades.
+    """
+
+    _DEPTH = 4
+
+    def __init__(self, width: int = 1 << 16):
+        self.width = width
+        self._rows = [bytearray(width) for _ in range(self._DEPTH)]
+        self._samples = 0
+
+    def _get_indexes(self, key: Hashable) -> list[int]:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+        return [
+            int.from_bytes(digest[i * 4 : i * 4 + 4], "big") % self.width
+            for i in range(self._DEPTH)
+        ]
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self._rows, self._get_indexes(key)):
+            if row[index] < 255:
+                row[index] += 1
+        self._samples += 1
+        if self._samples >= 10 * self.width:
+            self._age()
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._get_indexes(key)))
+
+    def _age(self) -> None:
+        for row in self._rows:
+            for index in range(self.width):
+                row[index] >>= 1
+        self._samples //= 2
+
+
+class ByteBudgetCache(Generic[K, V]):
+    """
+    In-process mapping bounded by the total size (in bytes) of its values.
+
+    Entries are evicted least-recently-used first (`lru`),
+    or least-frequently-used first, ties broken by recency (`lfu`;
+    entries are kept in a bucket per hit count, so finding the victim doesn't scan them all).
+    With `tinylfu`, entries are evicted least-recently-used first,
+    but a new entry is only admitted if it has been accessed more often (hits and misses alike)
+    than the entries it would evict.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        eviction: EvictionPolicy = "lru",
+    ):
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self.total_bytes = 0
+        # ordered from least to most recently used
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self._hits: dict[K, int] = {}
+        # with `lfu`, hit count -> keys with that count, from least to most recently used
+        self._buckets: dict[int, OrderedDict[K, None]] = {}
+        # lowest hit count with a bucket, if known
+        self._min_hits: int | None = None
+        self._sketch = FrequencySketch() if eviction == "tinylfu" else None
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> list[K]:
+        return list(self._entries)
+
+    def peek(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def get(self, key: K) -> V | None:
+        if self._sketch is not None:
+            self._sketch.increment(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self._set_hits(key, self._hits[key] + 1)
+        return entry[0]
+
+    def set(self, key: K, value: V, size: int) -> list[tuple[K, V]]:
+        """
+        Insert `value` under `key`, returning the entries evicted to make room for it.
+        Values larger than the whole budget are not admitted, nor are those rejected by `tinylfu`.
+        """
+        hits = self._hits.get(key, 0)
+        self.pop(key)
+        if size > self.max_bytes:
+            return []
+        if self._sketch is not None:
+            self._sketch.increment(key)
+            if not self._admit(key, size):
+                return []
+        self._entries[key] = (value, size)
+        self._set_hits(key, hits + 1)
+        self.total_bytes += size
+        return self._evict()
+
+    def resize(self, key: K, size: int) -> list[tuple[K, V]]:
+        """
+        Change the size of the entry under `key` (if any) without counting it as a use,
+        returning the entries evicted to make room for it.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return []
+        self.total_bytes += size - entry[1]
+        self._entries[key] = (entry[0], size)
+        return self._evict()
+
+    def pop(self, key: K) -> V | None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._remove_hits(key)
+        value, size = entry
+        self.total_bytes -= size
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._hits.clear()
+        self._buckets.clear()
+        self._min_hits = None
+        self.total_bytes = 0
+
+    def _set_hits(self, key: K, hits: int) -> None:
+        if self.eviction == "lfu":
+            self._remove_from_bucket(key)
+            self._buckets.setdefault(hits, OrderedDict())[key] = None
+            if self._min_hits is not None and hits < self._min_hits:
+                self._min_hits = hits
+        self._hits[key] = hits
+
+    def _remove_hits(self, key: K) -> None:
+        if self.eviction == "lfu":
+            self._remove_from_bucket(key)
+        del self._hits[key]
+
+    def _remove_from_bucket(self, key: K) -> None:
+        hits = self._hits.get(key)
+        if hits is None:
+            return
+        bucket = self._buckets[hits]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[hits]
+            if hits == self._min_hits:
+                # found again on the next eviction
+                self._min_hits = None
+
+    def _admit(self, key: K, size: int) -> bool:
+        assert self._sketch is not None
+        excess = self.total_bytes + size - self.max_bytes
+        if excess <= 0:
+            return True
+        frequency = self._sketch.estimate(key)
+        for victim, (_, victim_size) in self._entries.items():
+            if self._sketch.estimate(victim) >= frequency:
+                return False
+            excess -= victim_size
+            if excess <= 0:
+                break
+        return True
+
+    def _select_victim(self) -> K:
+        if self.eviction == "lfu":
+            if self._min_hits is None:
+                self._min_hits = min(self._buckets)
+            return next(iter(self._buckets[self._min_hits]))
+        return next(iter(self._entries))
+
+    def _evict(self) -> list[tuple[K, V]]:
+        evicted = []
+        while self.total_bytes > self.max_bytes and self._entries:
+            victim = self._select_victim()
+            value, size = self._entries.pop(victim)
+            self._remove_hits(victim)
+            self.total_bytes -= size
+            evicted.append((victim, value))
+        return evicted
+
+
+class BloomFilter:
+    """
+    Set of strings that may report false positives (at about `error_rate`, up to `capacity` items),
+    but never false negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _get_positions(self, item: str) -> list[int]:
+        # double hashing, from two halves of a single digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._get_positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & 1 << (position & 7)
+            for position in self._get_positions(item)
+        )
+
+
+def _compress(data: bytes, codec: CompressionCodec) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data)
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd cache compression requires the `zstandard` package"
+        ) from e
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def _decompress(data: bytes, codec: CompressionCodec) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd cache compression requires the `zstandard` package"
+        ) from e
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def compress_value(
+    value: Any,
+    codec: CompressionCodec,
+    threshold: int,
+) -> Any:
+    """
+    Compress `str` and `bytes` values of at least `threshold` bytes, leaving others as they are.
+    """
+    if isinstance(value, str):
+        flag = _STR_FLAG
+        data = value.encode()
+    elif isinstance(value, bytes):
+        flag = _BYTES_FLAG
+        data = value
+    else:
+        return value
+    if len(data) < threshold:
+        return value
+    compressed = _compress(data, codec)
+    if len(compressed) >= len(data):
+        return value
+    return _COMPRESSION_MARKERS[codec] + flag + compressed
+
+
+def decompress_value(value: Any) -> Any:
+    """
+    Reverse `compress_value`; values without a compression marker are returned as they are.
+    """
+    if not isinstance(value, bytes) or not value.startswith(_COMPRESSION_MARKER_PREFIX):
+        return value
+    for codec, marker in _COMPRESSION_MARKERS.items():
+        if value.startswith(marker):
+            break
+    else:
+        raise ValueError("Unknown cache compression marker")
+    flag = value[len(marker) : len(marker) + 1]
+    data = _decompress(value[len(marker) + 1 :], codec)
+    if flag == _STR_FLAG:
+        return data.decode()
+    return data
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+_DIGITS_PATTERN = re.compile(r"\d+")
+
+
+def normalize_for_similarity(text: str) -> list[str]:
+    """
+    Split text into lowercase words, with numbers (e.g., timestamps and ids) collapsed to `0`.
+    """
+    return _WORD_PATTERN.findall(_DIGITS_PATTERN.sub("0", text.lower()))
+
+
+def get_simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash of the word shingles in `text`;
+    similar texts have hashes that differ in few bits.
+    """
+    words = normalize_for_similarity(text)
+    if len(words) <= shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [
+            " ".join(words[i : i + shingle_size])
+            for i in range(len(words) - shingle_size + 1)
+        ]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        shingle_hash = int.from_bytes(
+            hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big"
+        )
+        for bit in range(64):
+            if shingle_hash >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+# SimHash similarities below this (64-bit hashes differing in more than 6 bits)
+# match unrelated texts too often to be reused as cache hits
+MIN_SIMILARITY_THRESHOLD = 0.9
+
+
+def get_simhash_similarity(a: int, b: int) -> float:
+    """
+    Fraction of bits two SimHashes agree on, between 0 and 1.
+    """
+    return 1 - (a ^ b).bit_count() / 64
+
+
+# cache snapshots are a header, followed by a zlib stream of records,
+# each a namespace, key and value, length-prefixed, with a flag for the value's type
+_SNAPSHOT_HEADER = b"aijson-cache-snapshot:1\n"
+_SNAPSHOT_CHUNK_SIZE = 64 * 1024
+
+
+class SnapshotWriter:
+    """
+    Writes `(namespace, key, value)` records to a cache snapshot file, compressing as it goes.
+    Values must be `str` or `bytes`.
+    """
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self._compressor = zlib.compressobj()
+        self._file.write(_SNAPSHOT_HEADER)
+
+    def _write_field(self, data: bytes) -> None:
+        self._file.write(self._compressor.compress(struct.pack(">I", len(data))))
+        self._file.write(self._compressor.compress(data))
+
+    def write(self, namespace: str, key: str, value: str | bytes) -> None:
+        if isinstance(value, str):
+            flag, data = _STR_FLAG, value.encode()
+        else:
+            flag, data = _BYTES_FLAG, value
+        self._write_field(namespace.encode())
+        self._write_field(key.encode())
+        self._file.write(self._compressor.compress(flag))
+        self._write_field(data)
+
+    def close(self) -> None:
+        self._file.write(self._compressor.flush())
+
+
+def iter_snapshot_records(file: BinaryIO) -> Iterator[tuple[str, str, str | bytes]]:
+    """
+    Read the `(namespace, key, value)` records of a cache snapshot file.
+    """
+    if file.read(len(_SNAPSHOT_HEADER)) != _SNAPSHOT_HEADER:
+        raise ValueError("Not a cache snapshot")
+
+    decompressor = zlib.decompressobj()
+    buffer = bytearray()
+    position = 0
+
+    def _read(size: int) -> bytes | None:
+        nonlocal buffer, position
+        while len(buffer) - position < size:
+            chunk = file.read(_SNAPSHOT_CHUNK_SIZE)
+            if not chunk:
+                return None
+            # drop what was already read before growing the buffer
+            del buffer[:position]
+            position = 0
+            buffer += decompressor.decompress(chunk)
+        data = bytes(buffer[position : position + size])
+        position += size
+        return data
+
+    def _read_field() -> bytes | None:
+        length = _read(4)
+        if length is None:
+            return None
+        return _read(struct.unpack(">I", length)[0])
+
+    while (namespace := _read_field()) is not None:
+        key = _read_field()
+        flag = _read(1)
+        data = _read_field()
+        if key is None or flag is None or data is None:
+            raise ValueError("Truncated cache snapshot")
+        value: str | bytes = data.decode() if flag == _STR_FLAG else data
+        yield namespace.decode(), key.decode(), value
@@ -0,0 +1,94 @@
+import hashlib
+from typing import Any
+
+import numpy as np
+
+# random (but fixed, so boundaries are stable across processes) values for each byte
+_GEAR = np.array(
+    [
+        int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=4).digest(), "big")
+        for i in range(256)
+    ],
+    dtype=np.uint32,
+)
+
+# bytes covered by the rolling hash at each position
+_WINDOW_SIZE = 32
+
+# bytes hashed at once, bounding the memory used on large inputs
+_SEGMENT_SIZE = 16 * 1024 * 1024
+
+
+def _get_gear_hashes(data: np.ndarray) -> np.ndarray:
+    """
+    Compute the gear hash `sum(GEAR[data[i - j]] << j for j < 32)` (mod 2**32) at every position,
+    doubling the window in each step rather than rolling byte by byte.
+    """
+    hashes = _GEAR[data]
+    span = 1
+    while span < _WINDOW_SIZE:
+        hashes[span:] += hashes[:-span] << np.uint32(span)
+        span *= 2
+    return hashes
+
+
+def _find_candidates(data: Any, bits: list[int]) -> list[np.ndarray]:
+    """
+    For each of `bits`, find the offsets after each byte whose hash has that many top bits all zero.
+    """
+    view = np.frombuffer(data, dtype=np.uint8)
+    candidates: list[list[np.ndarray]] = [[] for _ in bits]
+    for start in range(0, len(view), _SEGMENT_SIZE):
+        # include the preceding window, so the hashes are the same as over the whole input
+        window_start = max(start - (_WINDOW_SIZE - 1), 0)
+        hashes = _get_gear_hashes(view[window_start : start + _SEGMENT_SIZE])
+        hashes = hashes[start - window_start :]
+        for bits_candidates, bits_ in zip(candidates, bits):
+            matches = np.flatnonzero(hashes < np.uint32(1 << (32 - bits_)))
+            bits_candidates.append(matches + start + 1)
+    return [
+        np.concatenate(bits_candidates)
+        if bits_candidates
+        else np.zeros(0, dtype=np.int64)
+        for bits_candidates in candidates
+    ]
+
+
+def get_content_chunk_boundaries(
+    data: Any,
+    min_size: int,
+    avg_size: int,
+    max_size: int,
+) -> list[int]:
+    """
+    Split `data` (any buffer) at content-defined boundaries, returning the end offset of each chunk.
+
+    Boundaries depend only on the 32 bytes before them, so an edit only changes the chunks around it.
+    Chunks are between `min_size` and `max_size` bytes (except the last), and about `avg_size` on average:
+    as in FastCDC, cut points are harder to match before `avg_size` and easier after.
+    """
+    size = len(memoryview(data).cast("B"))
+    if size <= min_size:
+        return [size] if size else []
+    bits = max(int(avg_size).bit_length() - 1, 2)
+    strict, loose = _find_candidates(data, [min(bits + 1, 31), bits - 1])
+
+    boundaries = []
+    start = 0
+    while size - start > min_size:
+        end = None
+        for candidates, low, high in [
+            (strict, start + min_size, start + avg_size),
+            (loose, start + max(avg_size, min_size), start + max_size),
+        ]:
+            index = np.searchsorted(candidates, low)
+            if index < len(candidates) and candidates[index] < min(high, size):
+                end = int(candidates[index])
+                break
+        if end is None:
+            end = min(start + max_size, size)
+        boundaries.append(end)
+        start = end
+    if start < size:
+        boundaries.append(size)
+    return boundaries
@@ -1,5 +1,77 @@
+import hashlib
+import os
+import time
 from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 def recursive_defaultdict():
     return defaultdict(recursive_defaultdict)
+
+
+def hash_file(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    """
+    Return the hex SHA-256 of a file's contents, reading it `chunk_size` bytes at a time.
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def lock_file(fd: int, blocking: bool = True) -> bool:
+    """
+    Take an exclusive lock on the open file `fd`, shared across processes
+    (and across file descriptors within one process), returning whether it was acquired.
+    """
+    if fcntl is not None:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            return False
+        return True
+    os.lseek(fd, 0, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.01)
+
+
+def unlock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def try_lock_file(path: str) -> Iterator[bool]:
+    """
+    Try to take an exclusive lock on `path` (created if missing), shared across processes,
+    yielding whether it was acquired. The lock is released on exit.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if not lock_file(fd, blocking=False):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            unlock_file(fd)
+    finally:
+        os.close(fd)
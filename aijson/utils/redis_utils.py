@@ -1,8 +1,13 @@
+import asyncio
+import logging
 import os
 import typing
+from datetime import timedelta
 
 from redis import asyncio as aioredis
 import pydantic
+import structlog
+import tenacity
 
 from aijson.utils.secret_utils import get_secret
 
@@ -67,3 +72,152 @@ async def try_redis():
         return True
     except Exception:
         return False
+
+
+class RedisWriteBuffer:
+    """
+    Buffers Redis `SET`s and writes them in pipelined batches,
+    once `max_batch_size` writes (or `max_batch_bytes` of values, if set) are pending,
+    or `max_delay` seconds after the first of them.
+
+    Buffered values are visible through `get` until they are written.
+    Batches that still fail after retrying are dropped and logged,
+    and the names in them are passed to `on_error`, if given.
+    """
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        max_batch_size: int = 500,
+        max_delay: float = 0.05,
+        max_batch_bytes: int | None = None,
+        on_error: typing.Callable[[list[str]], None] | None = None,
+    ):
+        self.redis_client = redis_client
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_batch_bytes = max_batch_bytes
+        self.on_error = on_error
+        # name -> (value, expiry), in insertion order
+        self._pending: dict[str, tuple[typing.Any, int | timedelta | None]] = {}
+        self._pending_bytes = 0
+        # batches being written, kept readable until they are
+        self._in_flight: list[dict[str, tuple[typing.Any, int | timedelta | None]]] = []
+        self._timer: asyncio.Task | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._pending or any(name in batch for batch in self._in_flight)
+
+    def get(self, name: str) -> typing.Any | None:
+        if name in self._pending:
+            return self._pending[name][0]
+        for batch in reversed(self._in_flight):
+            if name in batch:
+                return batch[name][0]
+        return None
+
+    async def discard(self, log: structlog.stdlib.BoundLogger, name: str) -> None:
+        """
+        Drop a buffered value, waiting for it to be written if it is already in flight
+        (so that a following `DELETE` isn't overtaken by it).
+        """
+        discarded = self._pending.pop(name, None)
+        if discarded is not None:
+            self._pending_bytes -= self._get_size(discarded[0])
+        if any(name in batch for batch in self._in_flight):
+            await self.flush(log)
+
+    @staticmethod
+    def _get_size(value: typing.Any) -> int:
+        if isinstance(value, str):
+            # Redis stores strings UTF-8 encoded
+            return len(value.encode())
+        if isinstance(value, bytes):
+            return len(value)
+        return 0
+
+    def set(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        name: str,
+        value: typing.Any,
+        ex: int | timedelta | None = None,
+    ) -> None:
+        # re-insert, so the latest write goes last
+        replaced = self._pending.pop(name, None)
+        if replaced is not None:
+            self._pending_bytes -= self._get_size(replaced[0])
+        self._pending[name] = (value, ex)
+        self._pending_bytes += self._get_size(value)
+        if len(self._pending) >= self.max_batch_size or (
+            self.max_batch_bytes is not None
+            and self._pending_bytes >= self.max_batch_bytes
+        ):
+            self._start_flush(log)
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(log))
+
+    async def _flush_later(self, log: structlog.stdlib.BoundLogger) -> None:
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        self._start_flush(log)
+
+    def _start_flush(self, log: structlog.stdlib.BoundLogger) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._pending_bytes = 0
+        self._in_flight.append(batch)
+        task = asyncio.create_task(self._write_batch(log, batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write_batch(
+        self,
+        log: structlog.stdlib.BoundLogger,
+        batch: dict[str, tuple[typing.Any, int | timedelta | None]],
+    ) -> None:
+        async def _execute():
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for name, (value, ex) in batch.items():
+                    pipe.set(name, value, ex=ex)
+                await asyncio.wait_for(pipe.execute(), timeout=5)
+
+        try:
+            await tenacity.retry(
+                retry=tenacity.retry_if_exception_type(
+                    (ConnectionError, asyncio.TimeoutError)
+                ),
+                wait=tenacity.wait_random_exponential(multiplier=1, max=5),
+                stop=tenacity.stop_after_attempt(3),
+                before_sleep=tenacity.before_sleep_log(
+                    log,  # type: ignore
+                    logging.WARNING,
+                    exc_info=True,
+                ),
+            )(_execute)()
+            log.debug("Flushed Redis writes", writes=len(batch))
+        except Exception as e:
+            log.warning(
+                "Redis write-behind error",
+                writes=len(batch),
+                exc_info=e,
+            )
+            if self.on_error is not None:
+                self.on_error(list(batch))
+        finally:
+            self._in_flight = [
+                in_flight for in_flight in self._in_flight if in_flight is not batch
+            ]
+
+    async def flush(self, log: structlog.stdlib.BoundLogger) -> None:
+        """
+        Write all buffered values, and wait for the writes in flight.
+        """
+        self._start_flush(log)
+        while self._flushes:
+            await asyncio.gather(*self._flushes)